@@ -0,0 +1,57 @@
+import os
+import json
+import hmac
+import hashlib
+import argparse
+from datetime import datetime, timezone
+import requests
+from dotenv import load_dotenv
+
+# Simula o Jira enviando webhooks para o receptor do main.py (python main.py --webhook),
+# para testar o fluxo localmente sem cadastrar um webhook de verdade no Jira.
+
+load_dotenv()
+WEBHOOK_PORTA = int(os.getenv('WEBHOOK_PORTA', '8765'))
+WEBHOOK_SEGREDO = os.getenv('WEBHOOK_SEGREDO', '')
+
+def build_payload(key, status, summary, event):
+    """Monta um payload no formato enviado pelo Jira (apenas os campos usados pela automação)."""
+    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+    return {
+        'webhookEvent': event,
+        'timestamp': int(datetime.now(timezone.utc).timestamp() * 1000),
+        'issue': {
+            'key': key,
+            'fields': {
+                'summary': summary,
+                'status': {'name': status},
+                'assignee': {'displayName': 'Simulação'},
+                'project': {'name': key.split('-')[0]},
+                'labels': [],
+                'resolutiondate': now if status.upper() in ('DONE', 'CONCLUÍDO') else None,
+                'updated': now
+            }
+        }
+    }
+
+def send_webhook(url, payload):
+    """Envia o payload, assinando o corpo com WEBHOOK_SEGREDO (se configurado) como o Jira faz."""
+    body = json.dumps(payload).encode('utf-8')
+    headers = {'Content-Type': 'application/json'}
+    if WEBHOOK_SEGREDO:
+        headers['X-Hub-Signature'] = 'sha256=' + hmac.new(WEBHOOK_SEGREDO.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    response = requests.post(url, data=body, headers=headers, timeout=10)
+    return response.status_code
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Envia webhooks falsos do Jira para o receptor local.")
+    parser.add_argument('keys', nargs='+', help="Chaves das tarefas (ex: KAN-1 KAN-2).")
+    parser.add_argument('--status', default='Done', help="Status enviado para todas as tarefas.")
+    parser.add_argument('--summary', default='Tarefa de teste', help="Resumo enviado para todas as tarefas.")
+    parser.add_argument('--event', default='jira:issue_updated', choices=['jira:issue_updated', 'jira:issue_created'])
+    parser.add_argument('--url', default=f'http://127.0.0.1:{WEBHOOK_PORTA}/')
+    args = parser.parse_args()
+
+    for key in args.keys:
+        status_code = send_webhook(args.url, build_payload(key, args.status, args.summary, args.event))
+        print(f"{key}: HTTP {status_code}")
@@ -0,0 +1,3305 @@
+# Motor da sincronização Jira → Google Sheets, compartilhado pelos scripts main.py (o da raiz do repositório
+# e o desta pasta). Cada script define só o que é dele: a JQL e o mapeamento de colunas padrão (ver
+# build_default_job) e, se houver, a deduplicação das novas linhas (insert_matcher do job).
+# O .env é carregado pelo script antes de importar este módulo, já que a configuração é lida na importação.
+
+import os
+import re
+import sys
+import json
+import hashlib
+import hmac
+import ipaddress
+import sqlite3
+import argparse
+import random
+import signal
+import time
+import shutil
+import threading
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from requests.adapters import HTTPAdapter
+from googleapiclient.errors import HttpError
+
+# --- Configurações (do arquivo .env, carregado pelo script) ---
+
+# Configurações do Jira (puxadas do arquivo .env)
+JIRA_URL = os.getenv('JIRA_URL')
+JIRA_EMAIL = os.getenv('JIRA_EMAIL')
+JIRA_API_TOKEN = os.getenv('JIRA_API_TOKEN')
+
+# Paginação do Jira: quantas páginas buscar ao mesmo tempo e quantas vezes tentar cada página
+JIRA_MAX_CONCORRENCIA = int(os.getenv('JIRA_MAX_CONCORRENCIA', '8'))
+JIRA_MAX_TENTATIVAS = int(os.getenv('JIRA_MAX_TENTATIVAS', '3'))
+
+# Tipo de paginação da busca: 'token' (/rest/api/3/search/jql com nextPageToken, Jira Cloud; páginas em
+# sequência) ou 'offset' (/rest/api/3/search com startAt, Jira Server/Data Center; páginas em paralelo).
+# JIRA_PAGINA_MAX é o tamanho de página pedido no modo token (o Jira devolve menos se houver muitos campos)
+JIRA_PAGINACAO = os.getenv('JIRA_PAGINACAO', 'token').strip().lower()
+if JIRA_PAGINACAO not in ('token', 'offset'):
+    print(f"Aviso: JIRA_PAGINACAO='{JIRA_PAGINACAO}' não reconhecido. Usando a paginação por token.")
+    JIRA_PAGINACAO = 'token'
+JIRA_PAGINA_MAX = int(os.getenv('JIRA_PAGINA_MAX', '5000'))
+
+# Busca fatiada: divide a JQL em fatias independentes, por janelas de 'updated' ('updated') ou por faixas
+# de id das issues ('id'), buscadas em paralelo (JIRA_FATIAS_CONCORRENCIA ao mesmo tempo). Os limites
+# se ajustam para que cada fatia tenha cerca de JIRA_FATIA_TAMANHO issues. Cada fatia concluída é salva
+# em JIRA_FATIAS_DIRETORIO: se a busca falhar, a execução seguinte busca só as fatias que faltaram
+# (fatias salvas há mais de JIRA_FATIAS_VALIDADE_HORAS são descartadas). Vazio desativa; o modo streaming não fatia
+JIRA_FATIAMENTO = os.getenv('JIRA_FATIAMENTO', '').strip().lower()
+if JIRA_FATIAMENTO not in ('', 'updated', 'id'):
+    print(f"Aviso: JIRA_FATIAMENTO='{JIRA_FATIAMENTO}' não reconhecido. Buscando sem fatiar.")
+    JIRA_FATIAMENTO = ''
+JIRA_FATIA_TAMANHO = int(os.getenv('JIRA_FATIA_TAMANHO', '10000'))
+JIRA_FATIAS_CONCORRENCIA = int(os.getenv('JIRA_FATIAS_CONCORRENCIA', '4'))
+JIRA_FATIAS_DIRETORIO = os.getenv('JIRA_FATIAS_DIRETORIO', 'jira_fatias')
+JIRA_FATIAS_VALIDADE_HORAS = float(os.getenv('JIRA_FATIAS_VALIDADE_HORAS', '6'))
+
+# Verificação das órfãs (--verify-orphans): as chaves que estão na planilha mas não vieram da JQL são
+# buscadas no Jira pela chave, em lotes 'key in (...)' de até JIRA_VERIFICACAO_MAX_CARACTERES caracteres
+# (cabem na URL da busca) buscados em paralelo, e as colunas atualizáveis dessas linhas são corrigidas.
+# Não roda no modo incremental, em que quase toda a planilha fica de fora da JQL
+SYNC_VERIFICAR_ORFAS = os.getenv('SYNC_VERIFICAR_ORFAS', 'false').strip().lower() in ('1', 'true', 'sim')
+JIRA_VERIFICACAO_MAX_CARACTERES = int(os.getenv('JIRA_VERIFICACAO_MAX_CARACTERES', '6000'))
+
+# Conexões HTTP com o Jira: tamanho do pool (keep-alive) e timeouts por requisição, em segundos
+JIRA_POOL_CONEXOES = int(os.getenv('JIRA_POOL_CONEXOES', str(max(10, JIRA_MAX_CONCORRENCIA))))
+JIRA_TIMEOUT_CONEXAO = float(os.getenv('JIRA_TIMEOUT_CONEXAO', '10'))
+JIRA_TIMEOUT_LEITURA = float(os.getenv('JIRA_TIMEOUT_LEITURA', '60'))
+
+# Limites das chamadas externas: requisições por segundo de cada backend (0 = sem limite).
+# A concorrência começa no máximo configurado e é reduzida/aumentada conforme o servidor limita (HTTP 429)
+JIRA_REQ_POR_SEGUNDO = float(os.getenv('JIRA_REQ_POR_SEGUNDO', '10'))
+SHEETS_REQ_POR_SEGUNDO = float(os.getenv('SHEETS_REQ_POR_SEGUNDO', '1'))
+SHEETS_MAX_CONCORRENCIA = int(os.getenv('SHEETS_MAX_CONCORRENCIA', '4'))
+SHEETS_MAX_TENTATIVAS = int(os.getenv('SHEETS_MAX_TENTATIVAS', '5'))
+
+# Escrita na planilha: cada batchUpdate leva no máximo estes bytes e células; o resto vai em outros lotes
+SHEETS_LOTE_MAX_BYTES = int(os.getenv('SHEETS_LOTE_MAX_BYTES', str(1024 * 1024)))
+SHEETS_LOTE_MAX_CELULAS = int(os.getenv('SHEETS_LOTE_MAX_CELULAS', '20000'))
+
+# Diário da sincronização: antes de escrever, o plano da execução (atualizações e novas linhas, já em lotes)
+# é salvo em SYNC_DIARIO_DIRETORIO e cada lote gravado é registrado nele. Se a execução cair no meio da
+# escrita, a próxima retoma os lotes que faltaram sem consultar o Jira (diários com mais de
+# SYNC_DIARIO_VALIDADE_HORAS são descartados e a planilha é comparada de novo). Vazio desativa
+SYNC_DIARIO_DIRETORIO = os.getenv('SYNC_DIARIO_DIRETORIO', 'sync_diario')
+SYNC_DIARIO_VALIDADE_HORAS = float(os.getenv('SYNC_DIARIO_VALIDADE_HORAS', '6'))
+
+# Configurações do Google Sheets (puxadas do arquivo .env)
+GOOGLE_SHEETS_ID = os.getenv('GOOGLE_SHEETS_ID')
+GOOGLE_SHEETS_ABA_NOME = os.getenv('GOOGLE_SHEETS_ABA_NOME')
+GOOGLE_SHEETS_COLUNA_JIRA_KEY = os.getenv('GOOGLE_SHEETS_COLUNA_JIRA_KEY')
+GOOGLE_SHEETS_COLUNA_STATUS = os.getenv('GOOGLE_SHEETS_COLUNA_STATUS')
+
+# Nome do arquivo JSON da conta de serviço Google
+GOOGLE_CREDENTIALS_FILE = 'credentials.json'
+
+# Status do Jira que significam "Concluído" (puxados do arquivo .env, divididos por vírgula)
+# Converte para maiúsculas para comparação case-insensitive
+JIRA_STATUS_CONCLUIDO = [s.strip().upper() for s in os.getenv('JIRA_STATUS_CONCLUIDO_LIST', 'Done').split(',')]
+
+# Sincronização incremental: guarda num arquivo local o maior 'updated' já sincronizado
+# e, nas próximas execuções, busca no Jira apenas o que mudou desde então
+SYNC_INCREMENTAL = os.getenv('SYNC_INCREMENTAL', 'false').strip().lower() in ('1', 'true', 'sim')
+SYNC_ESTADO_ARQUIVO = os.getenv('SYNC_ESTADO_ARQUIVO', 'sync_state.json')
+SYNC_MARGEM_MINUTOS = int(os.getenv('SYNC_MARGEM_MINUTOS', '5'))
+
+# Modo streaming: compara cada página do Jira com a planilha assim que ela chega,
+# sem guardar todas as issues em memória
+SYNC_STREAMING = os.getenv('SYNC_STREAMING', 'false').strip().lower() in ('1', 'true', 'sim')
+
+# Motor da comparação planilha x Jira: 'pandas' (padrão) ou 'dict' (Python puro, sem importar o Pandas;
+# inicia bem mais rápido, bom para execuções curtas via cron e containers pequenos)
+SYNC_MOTOR = os.getenv('SYNC_MOTOR', 'pandas').strip().lower()
+if SYNC_MOTOR not in ('pandas', 'dict'):
+    print(f"Aviso: SYNC_MOTOR='{SYNC_MOTOR}' não reconhecido. Usando o motor pandas.")
+    SYNC_MOTOR = 'pandas'
+
+# Estado local da planilha: guarda em SQLite a linha de cada chave e os valores já gravados,
+# para não reler a planilha inteira a cada execução (só a coluna de chaves, para validar)
+SHEETS_ESTADO_LOCAL = os.getenv('SHEETS_ESTADO_LOCAL', 'false').strip().lower() in ('1', 'true', 'sim')
+SHEETS_ESTADO_ARQUIVO = os.getenv('SHEETS_ESTADO_ARQUIVO', 'sheet_state.db')
+SHEETS_ESTADO_VALIDADE_HORAS = float(os.getenv('SHEETS_ESTADO_VALIDADE_HORAS', '24'))
+
+# Histórico dos status (SQLite): depois de cada sincronização gravada na planilha, as tarefas que mudaram no
+# Jira desde a última versão gravada (inclusive só no status do Jira, sem mudar a planilha) são guardadas com
+# o momento da sincronização, para relatórios de vazão e cycle time sem consultar o Jira.
+# Os campos de CAMPOS_HISTORICO entram no mapeamento de cada job, sem coluna na planilha
+HISTORICO_STATUS = os.getenv('HISTORICO_STATUS', 'false').strip().lower() in ('1', 'true', 'sim')
+HISTORICO_STATUS_ARQUIVO = os.getenv('HISTORICO_STATUS_ARQUIVO', 'status_history.db')
+CAMPOS_HISTORICO = [
+    {'name': 'jira_status', 'field': 'status.name'},
+    {'name': 'resolutiondate', 'field': 'resolutiondate'},
+]
+
+# Modo contínuo (--daemon): intervalo entre sincronizações e variação aleatória aplicada a ele
+DAEMON_INTERVALO_SEGUNDOS = float(os.getenv('DAEMON_INTERVALO_SEGUNDOS', '300'))
+DAEMON_JITTER_SEGUNDOS = float(os.getenv('DAEMON_JITTER_SEGUNDOS', '30'))
+
+# Receptor de webhooks do Jira (--webhook): endereço, janela de agrupamento dos eventos
+# e segredo opcional para validar a assinatura (X-Hub-Signature) enviada pelo Jira
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_PORTA = int(os.getenv('WEBHOOK_PORTA', '8765'))
+WEBHOOK_DEBOUNCE_SEGUNDOS = float(os.getenv('WEBHOOK_DEBOUNCE_SEGUNDOS', '5'))
+WEBHOOK_SEGREDO = os.getenv('WEBHOOK_SEGREDO', '')
+
+# Vários jobs (--jobs): arquivo JSON com as sincronizações (JQL → planilha/aba) e quantas rodam ao mesmo tempo
+SYNC_JOBS_ARQUIVO = os.getenv('SYNC_JOBS_ARQUIVO', '')
+SYNC_JOBS_CONCORRENCIA = int(os.getenv('SYNC_JOBS_CONCORRENCIA', '4'))
+
+# Métricas de cada execução: relatório JSON (vazio desativa) e arquivo para o textfile collector
+# do Prometheus (node_exporter); o relatório do Prometheus só é gravado se o caminho for informado
+METRICAS_RELATORIO_JSON = os.getenv('METRICAS_RELATORIO_JSON', 'sync_report.json')
+METRICAS_PROMETHEUS_ARQUIVO = os.getenv('METRICAS_PROMETHEUS_ARQUIVO', '')
+
+# --- Métricas da Execução (fases, contadores e relatórios) ---
+
+class MetricsHook:
+    """
+    Interface para acoplar um tracer próprio às métricas (registre com register_metrics_hook).
+    Basta sobrescrever os métodos de interesse; erros dentro de um hook são só avisados.
+    """
+
+    def span_started(self, job, name):
+        pass
+
+    def span_finished(self, job, name, seconds):
+        pass
+
+    def counter_incremented(self, job, name, value):
+        pass
+
+    def run_finished(self, report):
+        pass
+
+_metrics_hooks = []
+
+def register_metrics_hook(hook):
+    """Registra um MetricsHook que recebe as fases e contadores de todas as execuções."""
+    _metrics_hooks.append(hook)
+
+def _notify_hooks(method, *args):
+    for hook in _metrics_hooks:
+        try:
+            getattr(hook, method)(*args)
+        except Exception as e:
+            print(f"Aviso: o hook de métricas {type(hook).__name__}.{method} falhou: {e}")
+
+class RunMetrics:
+    """
+    Métricas de uma execução de run_automation: duração de cada fase (span) e contadores
+    (requisições, novas tentativas, páginas, linhas, bytes). É seguro contar de várias threads.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.spans = []
+        self.counters = defaultdict(int)
+        self.status = 'failed'
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name):
+        """Mede a duração do bloco como a fase `name`."""
+        _notify_hooks('span_started', self.job, name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self.spans.append({'name': name, 'seconds': round(seconds, 4)})
+            _notify_hooks('span_finished', self.job, name, seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+        _notify_hooks('counter_incremented', self.job, name, value)
+
+    def report(self):
+        with self._lock:
+            return {
+                'job': self.job,
+                'status': self.status,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'seconds': round(time.perf_counter() - self._started, 4),
+                'spans': list(self.spans),
+                'counters': dict(self.counters),
+            }
+
+class _NoMetrics:
+    """Usado fora de run_automation (ex.: chamadas avulsas de get_jira_issues): não mede nada."""
+
+    status = None
+
+    @contextmanager
+    def span(self, name):
+        yield
+
+    def count(self, name, value=1):
+        pass
+
+_NO_METRICS = _NoMetrics()
+_run_metrics = contextvars.ContextVar('run_metrics', default=_NO_METRICS)
+
+def current_metrics():
+    """Métricas da execução em andamento nesta thread (ou um objeto que ignora tudo)."""
+    return _run_metrics.get()
+
+def submit_with_metrics(executor, fn, *args):
+    """executor.submit que leva as métricas da execução atual para a thread do pool."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+_last_reports = {}
+_reports_lock = threading.Lock()
+
+def _atomic_write(path, content):
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_file, path)
+
+def _prometheus_name(name):
+    return 'jira_sheets_sync_' + re.sub(r'[^a-zA-Z0-9_]', '_', name)
+
+def format_prometheus(reports):
+    """Formata os relatórios (último de cada job) no formato do textfile collector do node_exporter."""
+    lines = [
+        '# HELP jira_sheets_sync_last_run_seconds Duração da última sincronização.',
+        '# TYPE jira_sheets_sync_last_run_seconds gauge',
+    ]
+    lines += [f'jira_sheets_sync_last_run_seconds{{job="{r["job"]}"}} {r["seconds"]}' for r in reports]
+    lines += ['# HELP jira_sheets_sync_last_run_success 1 se a última sincronização terminou sem erros.',
+              '# TYPE jira_sheets_sync_last_run_success gauge']
+    lines += [f'jira_sheets_sync_last_run_success{{job="{r["job"]}"}} {int(r["status"] == "ok")}' for r in reports]
+    lines += ['# HELP jira_sheets_sync_last_run_timestamp_seconds Início da última sincronização (epoch).',
+              '# TYPE jira_sheets_sync_last_run_timestamp_seconds gauge']
+    lines += [f'jira_sheets_sync_last_run_timestamp_seconds{{job="{r["job"]}"}} '
+              f'{datetime.fromisoformat(r["started_at"]).timestamp():.0f}' for r in reports]
+    lines += ['# HELP jira_sheets_sync_phase_seconds Duração de cada fase da última sincronização.',
+              '# TYPE jira_sheets_sync_phase_seconds gauge']
+    for r in reports:
+        phases = defaultdict(float)
+        for span in r['spans']:
+            phases[span['name']] += span['seconds']
+        lines += [f'jira_sheets_sync_phase_seconds{{job="{r["job"]}",phase="{name}"}} {seconds:.4f}' for name, seconds in phases.items()]
+    for name in sorted({name for r in reports for name in r['counters']}):
+        metric = _prometheus_name(name)
+        lines += [f'# TYPE {metric} gauge']
+        lines += [f'{metric}{{job="{r["job"]}"}} {r["counters"][name]}' for r in reports if name in r['counters']]
+    return '\n'.join(lines) + '\n'
+
+def publish_run_report(report):
+    """
+    Guarda o relatório da execução e regrava os arquivos configurados com o último relatório de cada job:
+    METRICAS_RELATORIO_JSON (JSON) e METRICAS_PROMETHEUS_ARQUIVO (textfile do Prometheus).
+    """
+    with _reports_lock:
+        _last_reports[report['job']] = report
+        reports = list(_last_reports.values())
+        try:
+            if METRICAS_RELATORIO_JSON:
+                _atomic_write(METRICAS_RELATORIO_JSON, json.dumps({r['job']: r for r in reports}, ensure_ascii=False, indent=2))
+            if METRICAS_PROMETHEUS_ARQUIVO:
+                _atomic_write(METRICAS_PROMETHEUS_ARQUIVO, format_prometheus(reports))
+        except OSError as e:
+            print(f"Aviso: não foi possível gravar o relatório de métricas: {e}")
+    _notify_hooks('run_finished', report)
+
+# --- Agendador de Requisições (limites de taxa e novas tentativas) ---
+
+def _parse_retry_after(value):
+    """Converte o cabeçalho Retry-After (segundos ou data HTTP) em segundos de espera."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _describe_request_error(error):
+    """
+    Classifica um erro de requisição ao Jira (requests) ou ao Google Sheets (googleapiclient).
+    Retorna (status HTTP ou None, Retry-After em segundos ou None, se vale tentar de novo).
+    """
+    response = getattr(error, 'response', None)
+    if response is not None and hasattr(response, 'status_code'): # requests.HTTPError
+        status = response.status_code
+        retry_after = response.headers.get('Retry-After')
+    elif getattr(error, 'resp', None) is not None: # googleapiclient HttpError
+        status = int(error.resp.status)
+        retry_after = error.resp.get('retry-after')
+    elif isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, ConnectionError, TimeoutError)):
+        return None, None, True
+    else:
+        return None, None, False
+    return status, _parse_retry_after(retry_after), status in RequestScheduler.RETRYABLE_STATUS
+
+class TokenBucket:
+    """Balde de fichas: libera no máximo `rate` requisições por segundo, acumulando até `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloqueia até haver uma ficha disponível e a consome (rate <= 0 desliga o limite)."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class _BackendLimits:
+    """Estado de um backend no agendador: balde de fichas, concorrência adaptativa e pausa."""
+
+    def __init__(self, rate, burst, max_concurrency, max_attempts, base_delay, max_delay):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+
+class RequestScheduler:
+    """
+    Agendador compartilhado por todas as chamadas externas (Jira e Google Sheets).
+
+    Para cada backend: um balde de fichas limita a taxa de requisições e um limite de
+    concorrência adaptativo (AIMD) sobe +1 a cada "janela" de sucessos e cai pela metade
+    quando o backend responde 429/503. Erros 429, 5xx e de conexão são tentados de novo,
+    respeitando o Retry-After (que pausa o backend inteiro) ou, sem ele, com backoff
+    exponencial com jitter.
+    """
+
+    RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+    THROTTLE_STATUS = {429, 503}
+
+    def __init__(self):
+        self._backends = {}
+
+    def configure(self, backend, rate, burst, max_concurrency, max_attempts, base_delay=1.0, max_delay=60.0):
+        """Define (ou redefine) os limites de um backend."""
+        self._backends[backend] = _BackendLimits(rate, burst, max_concurrency, max_attempts, base_delay, max_delay)
+
+    def concurrency_limit(self, backend):
+        """Limite de concorrência atual do backend (ajustado pelo AIMD)."""
+        return int(self._backends[backend].limit)
+
+    def call(self, backend, fn, *args, **kwargs):
+        """
+        Executa fn(*args, **kwargs) dentro dos limites do backend e retorna o resultado.
+        Levanta a última exceção se o erro não for recuperável ou se as tentativas acabarem.
+        """
+        state = self._backends[backend]
+        metrics = current_metrics()
+        for attempt in range(1, state.max_attempts + 1):
+            pause = state.paused_until - time.monotonic()
+            if pause > 0:
+                time.sleep(pause)
+            state.bucket.acquire()
+            self._enter(state)
+            metrics.count(f'{backend}.requests')
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                status, retry_after, retryable = _describe_request_error(e)
+                self._leave(backend, state, throttled=status in self.THROTTLE_STATUS)
+                if status in self.THROTTLE_STATUS:
+                    metrics.count(f'{backend}.throttled')
+                if not retryable or attempt == state.max_attempts:
+                    metrics.count(f'{backend}.errors')
+                    raise
+                metrics.count(f'{backend}.retries')
+                if retry_after is not None:
+                    delay = min(retry_after, state.max_delay)
+                    with state.condition:
+                        state.paused_until = max(state.paused_until, time.monotonic() + delay)
+                else:
+                    # Backoff exponencial com jitter: metade fixa + metade aleatória
+                    backoff = min(state.max_delay, state.base_delay * 2 ** (attempt - 1))
+                    delay = backoff / 2 + random.uniform(0, backoff / 2)
+                print(f"Aviso: {backend} respondeu {status or type(e).__name__}. "
+                      f"Nova tentativa em {delay:.1f}s ({attempt}/{state.max_attempts}).")
+                time.sleep(delay)
+                continue
+            self._leave(backend, state, throttled=False)
+            return result
+
+    def _enter(self, state):
+        with state.condition:
+            while state.in_flight >= max(1, int(state.limit)):
+                state.condition.wait()
+            state.in_flight += 1
+
+    def _leave(self, backend, state, throttled):
+        with state.condition:
+            state.in_flight -= 1
+            if throttled:
+                # Redução multiplicativa: metade da concorrência ao ser limitado pelo servidor
+                previous = int(state.limit)
+                state.limit = max(1.0, state.limit / 2)
+                if int(state.limit) < previous:
+                    print(f"Aviso: {backend} está limitando as requisições. Concorrência reduzida para {int(state.limit)}.")
+            else:
+                # Aumento aditivo: +1 a cada `limit` requisições bem-sucedidas
+                state.limit = min(float(state.max_concurrency), state.limit + 1.0 / state.limit)
+            state.condition.notify_all()
+
+request_scheduler = RequestScheduler()
+request_scheduler.configure('jira', rate=JIRA_REQ_POR_SEGUNDO, burst=JIRA_MAX_CONCORRENCIA,
+                            max_concurrency=JIRA_MAX_CONCORRENCIA, max_attempts=JIRA_MAX_TENTATIVAS)
+request_scheduler.configure('sheets', rate=SHEETS_REQ_POR_SEGUNDO, burst=SHEETS_MAX_CONCORRENCIA,
+                            max_concurrency=SHEETS_MAX_CONCORRENCIA, max_attempts=SHEETS_MAX_TENTATIVAS)
+
+
+_jira_session = None
+_jira_session_lock = threading.Lock()
+
+def get_jira_session():
+    """
+    Retorna a sessão HTTP compartilhada com o Jira, criando-a na primeira chamada.
+    A sessão mantém um pool de conexões (keep-alive), evitando um novo handshake TLS
+    a cada página, e pede respostas comprimidas com gzip.
+    """
+    global _jira_session
+    with _jira_session_lock:
+        if _jira_session is None:
+            session = requests.Session()
+            session.auth = (JIRA_EMAIL, JIRA_API_TOKEN)
+            session.headers.update({
+                "Accept": "application/json",
+                "Accept-Encoding": "gzip, deflate"
+            })
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=JIRA_POOL_CONEXOES)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _jira_session = session
+    return _jira_session
+
+def jira_request(method, path, **kwargs):
+    """
+    Faz uma requisição à API do Jira usando a sessão compartilhada.
+    Aplica os timeouts configurados e levanta um erro para status HTTP 4xx/5xx.
+    """
+    kwargs.setdefault('timeout', (JIRA_TIMEOUT_CONEXAO, JIRA_TIMEOUT_LEITURA))
+    response = get_jira_session().request(method, f"{JIRA_URL}{path}", **kwargs)
+    response.raise_for_status()
+    return response
+
+def _search_jira(path, params, page_label, mapping=None):
+    """
+    Faz uma busca de issues no Jira pelo agendador de requisições
+    (novas tentativas em 429/5xx e erros de conexão, até JIRA_MAX_TENTATIVAS).
+    Retorna o JSON da resposta, com as issues já convertidas em IssueRecord pelo mapping
+    (sem mapping, mantém o JSON das issues), ou None se a página falhar.
+    """
+    metrics = current_metrics()
+
+    def fetch():
+        response = jira_request('GET', path, params=params)
+        metrics.count('jira.bytes_received', len(response.content))
+        page = response.json()
+        if mapping is not None:
+            page['issues'] = mapping.compact(page.get('issues', []))
+        return page
+
+    try:
+        page = request_scheduler.call('jira', fetch)
+    except requests.exceptions.RequestException as e:
+        print(f"Erro ao puxar a página {page_label} do Jira: {e}")
+        return None
+    metrics.count('jira.pages')
+    metrics.count('jira.issues', len(page.get('issues', [])))
+    return page
+
+def _fetch_jira_page(jql_query, start_at, max_results, mapping):
+    """Busca uma página da paginação por offset (/rest/api/3/search com startAt). Retorna o JSON ou None."""
+    params = {
+        "jql": jql_query,
+        "fields": ",".join(mapping.fields),
+        "startAt": start_at,
+        "maxResults": max_results
+    }
+    return _search_jira('/rest/api/3/search', params, f"startAt={start_at}", mapping)
+
+def _fetch_jira_token_page(jql_query, page_token, page_number, mapping):
+    """Busca uma página da paginação por token (/rest/api/3/search/jql). Retorna o JSON ou None."""
+    params = {
+        "jql": jql_query,
+        "fields": ",".join(mapping.fields),
+        "maxResults": JIRA_PAGINA_MAX
+    }
+    if page_token:
+        params["nextPageToken"] = page_token
+    return _search_jira('/rest/api/3/search/jql', params, str(page_number), mapping)
+
+class JiraFetchError(Exception):
+    """Uma página do Jira falhou mesmo após todas as tentativas."""
+
+class JiraFetchCancelled(JiraFetchError):
+    """A busca foi cancelada antes de terminar (ver JiraBackgroundFetch)."""
+
+    def __init__(self):
+        super().__init__("a busca no Jira foi cancelada")
+
+def _check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise JiraFetchCancelled()
+
+def _iter_jira_token_pages(jql_query, mapping, cancel=None):
+    """
+    Paginação por token: cada página traz o nextPageToken da seguinte, então as páginas
+    vêm em sequência; a próxima já é buscada enquanto quem consome processa a atual.
+    """
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = submit_with_metrics(executor, _fetch_jira_token_page, jql_query, None, 1, mapping)
+        fetched_pages = fetched_issues = 0
+        try:
+            while future is not None:
+                _check_cancelled(cancel)
+                data = future.result()
+                fetched_pages += 1
+                if data is None:
+                    future = None
+                    if fetched_pages == 1:
+                        # O /search/jql só existe no Jira Cloud; antes, a busca usava sempre a paginação por offset
+                        raise JiraFetchError("a página 1 do Jira falhou (no Jira Server/Data Center, use JIRA_PAGINACAO=offset)")
+                    raise JiraFetchError(f"a página {fetched_pages} do Jira falhou")
+                next_token = None if data.get('isLast') else data.get('nextPageToken')
+                future = None
+                if next_token:
+                    future = submit_with_metrics(executor, _fetch_jira_token_page, jql_query, next_token, fetched_pages + 1, mapping)
+                issues = data.get('issues', [])
+                del data
+                fetched_issues += len(issues)
+                print(f"Puxadas {fetched_pages} páginas do Jira ({fetched_issues} tarefas)...")
+                yield issues
+        finally:
+            # Em caso de erro (ou se quem consome parar antes), não busca a página seguinte
+            if future is not None:
+                future.cancel()
+
+def iter_jira_pages(jql_query, mapping, cancel=None):
+    """
+    Gera as páginas de issues do Jira (listas de IssueRecord), na ordem da JQL, pedindo só os
+    campos do mapping de colunas (ver ColumnMapping).
+    Com JIRA_PAGINACAO=token, segue o nextPageToken de página em página (ver _iter_jira_token_pages).
+    Com JIRA_PAGINACAO=offset, a primeira página informa o total de issues; as páginas restantes
+    são buscadas em paralelo (no máximo JIRA_MAX_CONCORRENCIA ao mesmo tempo) e entregues assim
+    que chegam, com no máximo 2x JIRA_MAX_CONCORRENCIA páginas em memória.
+    Levanta JiraFetchError se alguma página falhar mesmo após as novas tentativas, e JiraFetchCancelled
+    se cancel (um threading.Event) for acionado: as páginas seguintes não são mais pedidas.
+    """
+    max_results = 100 # Máximo de resultados por requisição à API do Jira (paginação por offset)
+
+    print(f"Buscando tarefas no Jira com JQL: {jql_query}")
+
+    if JIRA_PAGINACAO == 'token':
+        yield from _iter_jira_token_pages(jql_query, mapping, cancel)
+        return
+
+    first_page = _fetch_jira_page(jql_query, 0, max_results, mapping)
+    if first_page is None:
+        raise JiraFetchError("não foi possível puxar a primeira página do Jira")
+
+    total_issues = first_page.get('total', 0)
+    # O Jira pode devolver menos resultados por página do que o pedido; usa o valor efetivo
+    page_size = first_page.get('maxResults') or max_results
+    remaining_offsets = list(range(page_size, total_issues, page_size))
+    yield first_page.get('issues', [])
+    del first_page
+
+    if not remaining_offsets:
+        return
+
+    print(f"Total de {total_issues} issues no Jira. "
+          f"Buscando as {len(remaining_offsets)} páginas restantes em paralelo...")
+    workers = max(1, min(JIRA_MAX_CONCORRENCIA, len(remaining_offsets)))
+    offsets = iter(remaining_offsets)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for offset in offsets:
+                pending.append((offset, submit_with_metrics(executor, _fetch_jira_page, jql_query, offset, page_size, mapping)))
+                if len(pending) >= workers * 2:
+                    break
+            fetched_pages = 1
+            while pending:
+                _check_cancelled(cancel)
+                offset, future = pending.popleft()
+                data = future.result()
+                if data is None:
+                    raise JiraFetchError(f"a página startAt={offset} do Jira falhou")
+                next_offset = next(offsets, None)
+                if next_offset is not None:
+                    pending.append((next_offset, submit_with_metrics(executor, _fetch_jira_page, jql_query, next_offset, page_size, mapping)))
+                fetched_pages += 1
+                print(f"Puxadas {fetched_pages} de {len(remaining_offsets) + 1} páginas do Jira...")
+                yield data.get('issues', [])
+        finally:
+            # Em caso de erro (ou se quem consome parar antes), não busca as páginas que faltam
+            for _, future in pending:
+                future.cancel()
+
+def get_jira_issues(jql_query, mapping, sharding=JIRA_FATIAMENTO, cancel=None):
+    """
+    Busca tarefas no Jira usando JQL, só com os campos do mapping de colunas (ver iter_jira_pages).
+    Retorna uma lista de IssueRecord, na ordem da JQL,
+    ou None se alguma página falhar mesmo após as novas tentativas (ou se cancel for acionado).
+    Com sharding ('updated' ou 'id'), busca a JQL em fatias (ver get_jira_issues_sharded).
+    """
+    if sharding:
+        return get_jira_issues_sharded(jql_query, mapping, sharding, cancel=cancel)
+
+    all_issues = []
+    try:
+        for issues in iter_jira_pages(jql_query, mapping, cancel):
+            all_issues.extend(issues)
+    except JiraFetchCancelled:
+        print("Busca no Jira cancelada.")
+        return None
+    except JiraFetchError as e:
+        print(f"Erro: {e}. Abortando para não sincronizar dados incompletos.")
+        return None
+
+    print(f"Total de {len(all_issues)} tarefas puxadas do Jira.")
+    return all_issues
+
+class JiraBackgroundFetch:
+    """
+    Busca as tarefas do Jira (get_jira_issues) numa thread à parte, para que a conexão com o Google
+    Sheets e a leitura da planilha aconteçam enquanto as páginas chegam: a execução leva o tempo da
+    fase mais lenta, não a soma das duas. result() espera a busca e retorna o mesmo que get_jira_issues;
+    cancel() para de pedir páginas e espera a thread terminar, sem levantar erros.
+    """
+
+    def __init__(self, jql_query, mapping=None):
+        self._cancel = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='jira-fetch')
+        self._future = submit_with_metrics(executor, self._fetch, jql_query, mapping)
+        executor.shutdown(wait=False) # A thread termina sozinha quando a busca acabar
+
+    def _fetch(self, jql_query, mapping):
+        with current_metrics().span('fetch'):
+            return get_jira_issues(jql_query, mapping, cancel=self._cancel)
+
+    def failed(self):
+        """True se a busca já terminou sem resultado (erro ou cancelamento); não espera a busca."""
+        return self._future.done() and (self._future.exception() is not None or self._future.result() is None)
+
+    def result(self):
+        return self._future.result()
+
+    def cancel(self):
+        self._cancel.set()
+        self._future.exception() # Espera a thread; um erro da busca não interessa mais a quem cancelou
+
+class IssueRecord:
+    """
+    Tarefa do Jira só com os campos do mapeamento de colunas, já com os valores que vão para a planilha.
+    As páginas do Jira viram IssueRecord logo depois de lidas (ColumnMapping.compact), e o JSON da
+    resposta é descartado. Cada mapeamento tem a sua subclasse, com um campo em __slots__ por coluna
+    (mais o 'updated' da marca d'água), então cada registro não tem um dict próprio, e os textos que
+    se repetem entre tarefas (status) são internados, ficando uma vez só na memória.
+    Aceita acesso como dicionário (issue['key']), igual às linhas do DataFrame.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values, **named):
+        named.update(zip(self.__slots__, values))
+        for name in self.__slots__:
+            setattr(self, name, named.get(name))
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return isinstance(other, IssueRecord) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"IssueRecord({self.to_dict()!r})"
+
+def _intern(value):
+    """Interna textos repetidos entre as tarefas (status, nomes), para guardar uma única cópia de cada."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _status_transform(job):
+    """Mapeia o status do Jira para "Concluído"/"Não Concluído" ou os rótulos do job (comparação case-insensitive)."""
+    done_statuses, done_label, not_done_label = set(job['done_statuses']), job['done_label'], job['not_done_label']
+    return lambda value: done_label if (value or '').upper() in done_statuses else not_done_label
+
+def _join_transform(job):
+    """Junta uma lista do Jira (labels, componentes, versões...) num texto separado por vírgulas."""
+    def join(value):
+        if not isinstance(value, list):
+            return value
+        return ', '.join(str(item.get('name', item.get('value', ''))) if isinstance(item, dict) else str(item) for item in value)
+    return join
+
+def _date_transform(job):
+    """Mantém só a data (AAAA-MM-DD) de um campo de data/hora do Jira."""
+    return lambda value: value[:10] if isinstance(value, str) else value
+
+# Transformações de COLUNAS_PLANILHA: cada uma recebe o job e devolve a função aplicada a cada valor
+COLUMN_TRANSFORMS = {'status': _status_transform, 'join': _join_transform, 'date': _date_transform}
+
+def _field_getter(path):
+    """
+    Função que lê o campo path de uma issue no JSON do Jira: 'key' e 'id' ficam no topo da issue, os
+    demais dentro de issue['fields'] ('status.name' é fields['status']['name']). Nível ausente ou nulo dá None.
+    """
+    if path in ('key', 'id'):
+        return lambda issue: issue.get(path)
+    first, *rest = path.split('.')
+    if not rest:
+        return lambda issue: issue['fields'].get(first)
+
+    def get(issue):
+        value = issue['fields'].get(first)
+        for part in rest:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return value
+    return get
+
+def _compile_extractor(entry, job):
+    """
+    Compila uma coluna do mapeamento numa função que recebe um lote de issues (JSON do Jira) e devolve
+    os valores da coluna: lê o campo, aplica o valor padrão e a transformação e interna os textos de
+    campos aninhados (status, pessoas, projeto), que se repetem entre as tarefas.
+    """
+    get = _field_getter(entry['field'])
+    steps = []
+    default = entry.get('default')
+    if default is not None:
+        steps.append(lambda value: default if value is None else value)
+    transform = entry.get('transform')
+    if transform:
+        if transform in COLUMN_TRANSFORMS:
+            steps.append(COLUMN_TRANSFORMS[transform](job))
+        else:
+            print(f"Aviso: transformação '{transform}' da coluna '{entry['name']}' não reconhecida. Usando o valor do Jira.")
+    if '.' in entry['field']:
+        steps.append(_intern)
+
+    def extract(issues):
+        values = [get(issue) for issue in issues]
+        for step in steps:
+            values = list(map(step, values))
+        return values
+    return extract
+
+class ColumnMapping:
+    """
+    Mapeamento Jira → planilha (COLUNAS_PLANILHA) compilado uma única vez para um job. O mesmo
+    mapeamento define os campos pedidos ao Jira (fields), os registros das tarefas (compact), o
+    cabeçalho de uma planilha nova (header), as linhas novas (row_builder) e as colunas comparadas
+    e atualizadas nas linhas que já existem (updatable, pares (campo, coluna)).
+    As colunas de 'key' e 'status' são as do job (key_column e status_column); o Resumo só é buscado
+    se o job tiver a coluna de Resumo da deduplicação (summary_column). Com HISTORICO_STATUS, os campos de
+    CAMPOS_HISTORICO que o mapeamento não tiver entram sem coluna (ver StatusHistoryStore). Levanta ValueError se o mapeamento não tiver o campo 'key' ou tiver campos repetidos.
+    """
+
+    def __init__(self, entries, job):
+        names = [entry['name'] for entry in entries]
+        if 'key' not in names:
+            raise ValueError("o mapeamento de colunas precisa do campo 'key'")
+        if len(set(names)) != len(names) or 'updated' in names:
+            raise ValueError("o mapeamento de colunas tem campos repetidos (ou um campo chamado 'updated')")
+        if HISTORICO_STATUS:
+            entries = list(entries) + [entry for entry in CAMPOS_HISTORICO if entry['name'] not in names]
+            names = [entry['name'] for entry in entries]
+        job_columns = {'key': job['key_column'], 'status': job['status_column']}
+        entries = [dict(entry, column=job_columns.get(entry['name'], entry.get('column'))) for entry in entries
+                   if entry['name'] != 'summary' or entry.get('column') or job.get('summary_column')]
+        names = [entry['name'] for entry in entries]
+
+        self.record_class = type('IssueRecord', (IssueRecord,), {'__slots__': tuple(names) + ('updated',)})
+        self.fields = list(dict.fromkeys(
+            [entry['field'].split('.')[0] for entry in entries if entry['field'] not in ('key', 'id')] + ['updated']
+        ))
+        self.columns = {entry['name']: entry['column'] for entry in entries if entry.get('column')}
+        self.header = list(self.columns.values())
+        self.updatable = [(entry['name'], entry['column']) for entry in entries if entry.get('updatable') and entry.get('column')]
+        # Identifica o mapeamento (e o mapeamento de status do job), ex.: para não retomar fatias salvas com outro
+        self.fingerprint = json.dumps(
+            [entries, sorted(job['done_statuses']), job['done_label'], job['not_done_label']], sort_keys=True, default=str
+        )
+        self._extractors = [
+            (getattr(self.record_class, entry['name']).__set__, _compile_extractor(entry, job))
+            for entry in entries + [{'name': 'updated', 'field': 'updated'}]
+        ]
+
+    def compact(self, issues):
+        """Converte um lote de issues do JSON do Jira (busca ou webhook) em IssueRecord, coluna a coluna."""
+        record_class = self.record_class
+        records = [object.__new__(record_class) for _ in issues]
+        for set_value, extract in self._extractors:
+            for record, value in zip(records, extract(issues)):
+                set_value(record, value)
+        return records
+
+    def row_builder(self, header):
+        """
+        Função que monta a linha da planilha de uma tarefa nova, na ordem das colunas de header
+        (o cabeçalho da planilha). Colunas do cabeçalho fora do mapeamento ficam vazias.
+        """
+        positions = [(header.index(column), name) for name, column in self.columns.items() if column in header]
+        width = max((position for position, _ in positions), default=-1) + 1
+
+        def build(issue):
+            row = [''] * width
+            for position, name in positions:
+                value = getattr(issue, name)
+                if value is not None:
+                    row[position] = value
+            return row
+        return build
+
+    def missing_columns(self, header):
+        """Colunas do mapeamento que não estão no cabeçalho da planilha."""
+        return [column for column in self.header if column not in header]
+
+def job_mapping(job):
+    """Mapeamento de colunas compilado do job (ver build_default_job e load_sync_jobs)."""
+    return job['mapping']
+
+def compact_issue(issue, job):
+    """Converte uma issue do JSON do Jira (ex.: recebida por webhook) em IssueRecord, com o mapeamento de colunas do job."""
+    return job_mapping(job).compact([issue])[0]
+
+
+_google_credentials = None
+_sheets_thread_local = threading.local()
+
+def _sheets_http():
+    """
+    Retorna a conexão HTTP autenticada da thread atual para o Google Sheets.
+    O objeto do serviço não é thread-safe, então cada thread usa a sua própria conexão.
+    Retorna None se o serviço não foi criado por get_google_sheets_service.
+    """
+    if _google_credentials is None:
+        return None
+    http = getattr(_sheets_thread_local, 'http', None)
+    if http is None:
+        import google_auth_httplib2
+        import httplib2
+        http = google_auth_httplib2.AuthorizedHttp(_google_credentials, http=httplib2.Http())
+        _sheets_thread_local.http = http
+    return http
+
+def execute_sheets_request(request):
+    """Executa uma requisição da API do Google Sheets pelo agendador, na conexão da thread atual."""
+    metrics = current_metrics()
+    metrics.count('sheets.bytes_sent', len(getattr(request, 'body', None) or ''))
+    http = _sheets_http()
+    if http is None:
+        result = request_scheduler.call('sheets', request.execute)
+    else:
+        result = request_scheduler.call('sheets', request.execute, http=http)
+    metrics.count('sheets.bytes_received', len(json.dumps(result, default=str)))
+    return result
+
+_sheets_service = None
+_sheets_executor = None
+_sheets_service_lock = threading.Lock()
+
+def get_google_sheets_service():
+    """
+    Autentica e retorna o serviço da API do Google Sheets usando o arquivo credentials.json.
+    O serviço é criado uma vez por processo e reaproveitado (as credenciais renovam o token sozinhas).
+    """
+    global _sheets_service
+    with _sheets_service_lock:
+        if _sheets_service is None:
+            _sheets_service = _build_google_sheets_service()
+        return _sheets_service
+
+def _build_google_sheets_service():
+    """Cria o serviço do Google Sheets (chamada uma vez, por get_google_sheets_service)."""
+    global _google_credentials
+    SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+    
+    try:
+        # Importados só aqui: carregar a biblioteca do Google custa tempo na partida do script
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
+        creds = service_account.Credentials.from_service_account_file(
+            GOOGLE_CREDENTIALS_FILE, scopes=SCOPES
+        )
+        service = build('sheets', 'v4', credentials=creds)
+        _google_credentials = creds
+        return service
+    except Exception as e:
+        print(f"Erro na autenticação do Google Sheets: {e}")
+        print(f"Verifique se '{GOOGLE_CREDENTIALS_FILE}' está na pasta correta e se a Conta de Serviço tem permissão.")
+        return None
+
+def column_letter(index):
+    """Converte o índice (0-based) de uma coluna na letra usada na notação A1 (0->A, 25->Z, 26->AA, ...)."""
+    letters = ''
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def read_google_sheet(service, spreadsheet_id, range_name):
+    """Lê dados de uma Planilha Google."""
+    try:
+        result = execute_sheets_request(service.spreadsheets().values().get(
+            spreadsheetId=spreadsheet_id, range=range_name
+        ))
+        values = result.get('values', [])
+        return values
+    except HttpError as e:
+        print(f"Erro ao ler Planilha Google: {e}")
+        print("Verifique se o ID da planilha e o nome da aba estão corretos e se a Conta de Serviço tem permissão de leitura.")
+        return None
+
+def read_sheet_header(service, spreadsheet_id, sheet_name):
+    """Lê só a primeira linha (cabeçalho) da aba. Retorna [] se a aba estiver vazia e None em caso de erro."""
+    values = read_google_sheet(service, spreadsheet_id, f'{sheet_name}!1:1')
+    if values is None:
+        return None
+    return values[0] if values else []
+
+def sheet_is_empty(service, spreadsheet_id, sheet_name):
+    """
+    Confere se a aba inteira está vazia, não só a primeira linha: a carga inicial grava a partir de A1 e
+    sobrescreveria o que estivesse abaixo de um cabeçalho em branco. Retorna True/False, ou None em caso de erro.
+    """
+    values = read_google_sheet(service, spreadsheet_id, sheet_name)
+    if values is None:
+        return None
+    return not any(cell != '' for row in values for cell in row)
+
+class SheetTable:
+    """
+    Colunas lidas da planilha (abaixo do cabeçalho), sem depender do Pandas.
+    Cada linha é uma tupla com os valores em texto, na ordem de `columns`;
+    a posição 0 é a primeira linha de dados (linha 2 da planilha).
+    """
+
+    __slots__ = ('columns', 'rows')
+
+    def __init__(self, columns, rows=()):
+        self.columns = list(columns)
+        self.rows = list(rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def column(self, name):
+        """Valores de uma coluna, na ordem das linhas."""
+        index = self.columns.index(name)
+        return [row[index] for row in self.rows]
+
+    def cell(self, position, name):
+        return self.rows[position][self.columns.index(name)]
+
+    def set_cell(self, position, name, value):
+        row = list(self.rows[position])
+        row[self.columns.index(name)] = value
+        self.rows[position] = tuple(row)
+
+    def to_dataframe(self):
+        """Converte para um DataFrame com o índice padrão (usado pelo motor pandas)."""
+        import pandas as pd
+        return pd.DataFrame(self.rows, columns=self.columns)
+
+def read_sheet_columns(service, spreadsheet_id, sheet_name, sheet_header, column_names):
+    """
+    Lê apenas as colunas indicadas (abaixo do cabeçalho) com um único values().batchGet,
+    em vez da aba inteira. Colunas que não existem no cabeçalho são ignoradas.
+    Retorna uma SheetTable com uma linha por linha de dados da planilha, ou None em caso de erro.
+    """
+    columns = [name for name in dict.fromkeys(column_names) if name in sheet_header]
+    ranges = []
+    for name in columns:
+        letter = column_letter(sheet_header.index(name))
+        ranges.append(f'{sheet_name}!{letter}2:{letter}')
+    try:
+        result = execute_sheets_request(service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id, ranges=ranges,
+            valueRenderOption='UNFORMATTED_VALUE', majorDimension='COLUMNS'
+        )) if ranges else {}
+    except HttpError as e:
+        print(f"Erro ao ler Planilha Google: {e}")
+        print("Verifique se o ID da planilha e o nome da aba estão corretos e se a Conta de Serviço tem permissão de leitura.")
+        return None
+
+    column_values = []
+    for value_range in result.get('valueRanges', []):
+        values = value_range.get('values', [])
+        # UNFORMATTED_VALUE devolve números como números; a comparação com o Jira é feita em texto
+        column_values.append([value if isinstance(value, str) else str(value) for value in (values[0] if values else [])])
+    # A API corta as células vazias do fim de cada coluna; todas precisam ter o mesmo número de linhas
+    row_count = max((len(values) for values in column_values), default=0)
+    padded = [values + [''] * (row_count - len(values)) for values in column_values]
+    return SheetTable(columns, zip(*padded))
+
+def update_google_sheet_batch(service, spreadsheet_id, updates_data):
+    """Atualiza múltiplas células na Planilha Google em lote."""
+    if not updates_data:
+        return
+    body = {
+        'valueInputOption': 'RAW',
+        'data': updates_data
+    }
+    try:
+        result = execute_sheets_request(service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id, body=body
+        ))
+        return result
+    except HttpError as e:
+        print(f"Erro ao atualizar Planilha Google: {e}")
+        print("Verifique se o ID da planilha e os ranges de atualização estão corretos.")
+        return None
+
+def append_google_sheet_rows(service, spreadsheet_id, sheet_name, values_to_append):
+    """Adiciona novas linhas no final de uma aba da Planilha Google."""
+    if not values_to_append:
+        return
+    body = {
+        'values': values_to_append
+    }
+    try:
+        result = execute_sheets_request(service.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range=f'{sheet_name}!A1', # Adiciona a partir da primeira célula da aba
+            valueInputOption='RAW',
+            insertDataOption='INSERT_ROWS',
+            body=body
+        ))
+        return result
+    except HttpError as e:
+        print(f"Erro ao adicionar novas linhas à Planilha Google: {e}")
+        print("Verifique se o ID da planilha e o nome da aba estão corretos e se a Conta de Serviço tem permissão de escrita.")
+        return None
+
+# --- Planejamento da Escrita na Planilha ---
+
+def plan_sheet_writes(cell_updates, column_indexes, sheet_name, max_cells=None):
+    """
+    Junta as células alteradas do change set em intervalos contínuos para o batchUpdate:
+    primeiro células vizinhas na mesma linha, depois linhas consecutivas com o mesmo
+    intervalo de colunas, formando retângulos (com no máximo max_cells células cada).
+    column_indexes mapeia o nome da coluna para o índice (0-based) no cabeçalho.
+    Retorna a lista de value ranges ({'range', 'values'}).
+    """
+    max_cells = max_cells or SHEETS_LOTE_MAX_CELULAS
+    cells = {}
+    for update in cell_updates:
+        cells[(update['row'], column_indexes[update['column']])] = update['new']
+
+    # 1. Células vizinhas na mesma linha viram um segmento [linha, primeira coluna, última coluna, valores]
+    segments = []
+    for row, col in sorted(cells):
+        last = segments[-1] if segments else None
+        if last and last[0] == row and last[2] == col - 1:
+            last[2] = col
+            last[3].append(cells[(row, col)])
+        else:
+            segments.append([row, col, col, [cells[(row, col)]]])
+
+    # 2. Segmentos com as mesmas colunas em linhas consecutivas viram um retângulo
+    segments.sort(key=lambda segment: (segment[1], segment[2], segment[0]))
+    blocks = []
+    for row, first_col, last_col, values in segments:
+        last = blocks[-1] if blocks else None
+        width = last_col - first_col + 1
+        if (last and last['first_col'] == first_col and last['last_col'] == last_col
+                and last['last_row'] == row - 1 and (len(last['values']) + 1) * width <= max_cells):
+            last['last_row'] = row
+            last['values'].append(values)
+        else:
+            blocks.append({'first_row': row, 'last_row': row, 'first_col': first_col, 'last_col': last_col, 'values': [values]})
+
+    value_ranges = []
+    for block in sorted(blocks, key=lambda b: (b['first_row'], b['first_col'])):
+        start = f"{column_letter(block['first_col'])}{block['first_row']}"
+        end = f"{column_letter(block['last_col'])}{block['last_row']}"
+        value_ranges.append({
+            'range': f"{sheet_name}!{start}" if start == end else f"{sheet_name}!{start}:{end}",
+            'values': block['values']
+        })
+    return value_ranges
+
+def chunk_value_ranges(value_ranges, max_bytes=None, max_cells=None):
+    """
+    Divide os value ranges em lotes para batchUpdate, cada um com no máximo max_bytes
+    (tamanho estimado do JSON) e max_cells células, evitando um único pedido gigante.
+    """
+    max_bytes = max_bytes or SHEETS_LOTE_MAX_BYTES
+    max_cells = max_cells or SHEETS_LOTE_MAX_CELULAS
+    chunks, current, current_bytes, current_cells = [], [], 0, 0
+    for value_range in value_ranges:
+        size = len(json.dumps(value_range, ensure_ascii=False).encode('utf-8'))
+        cells = sum(len(row) for row in value_range['values'])
+        if current and (current_bytes + size > max_bytes or current_cells + cells > max_cells):
+            chunks.append(current)
+            current, current_bytes, current_cells = [], 0, 0
+        current.append(value_range)
+        current_bytes += size
+        current_cells += cells
+    if current:
+        chunks.append(current)
+    return chunks
+
+def send_sheet_chunks(service, spreadsheet_id, chunks, on_result=None):
+    """
+    Envia lotes de value ranges já divididos, um batchUpdate por lote, em paralelo dentro da
+    concorrência permitida pelo agendador para o Google Sheets.
+    on_result, se informado, recebe o resultado de cada lote assim que ele (e os anteriores) termina;
+    senão, o andamento é impresso lote a lote.
+    Retorna o resultado de cada lote, na ordem dos lotes: dicts {chunk, ranges, cells, ok, updated_cells}.
+    """
+    if not chunks:
+        return []
+
+    def send(numbered_chunk):
+        number, chunk = numbered_chunk
+        result = update_google_sheet_batch(service, spreadsheet_id, chunk)
+        return {
+            'chunk': number,
+            'ranges': len(chunk),
+            'cells': sum(len(row) for value_range in chunk for row in value_range['values']),
+            'ok': result is not None,
+            'updated_cells': (result or {}).get('totalUpdatedCells', 0)
+        }
+
+    # As threads (e as conexões HTTP de cada uma) ficam abertas entre as execuções;
+    # quantas trabalham ao mesmo tempo é o agendador que limita
+    global _sheets_executor
+    with _sheets_service_lock:
+        if _sheets_executor is None:
+            _sheets_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_CONCORRENCIA, thread_name_prefix='sheets')
+    futures = [submit_with_metrics(_sheets_executor, send, numbered_chunk) for numbered_chunk in enumerate(chunks, start=1)]
+    results = []
+    for future in futures:
+        result = future.result()
+        results.append(result)
+        if on_result is not None:
+            on_result(result)
+        elif len(futures) > 1:
+            status = "OK" if result['ok'] else "FALHOU"
+            print(f"   Lote {result['chunk']}/{len(futures)}: {result['ranges']} intervalos, {result['cells']} células - {status}")
+    return results
+
+def ensure_sheet_grid(service, spreadsheet_id, sheet_name, rows, columns):
+    """
+    Garante que a aba tenha pelo menos rows linhas e columns colunas, com um único spreadsheets.batchUpdate
+    (o values.batchUpdate não escreve fora da grade, que começa com 1000 linhas). A grade nunca diminui.
+    Retorna True se a grade já comporta os dados, ou False em caso de erro.
+    """
+    try:
+        spreadsheet = execute_sheets_request(service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id, fields='sheets.properties(sheetId,title,gridProperties)'
+        ))
+    except HttpError as e:
+        print(f"Erro ao ler as propriedades da Planilha Google: {e}")
+        return False
+    properties = next((sheet['properties'] for sheet in spreadsheet.get('sheets', []) if sheet['properties'].get('title') == sheet_name), None)
+    if properties is None:
+        print(f"Erro: a aba '{sheet_name}' não foi encontrada na Planilha Google.")
+        return False
+    grid = properties.get('gridProperties', {})
+    row_count, column_count = max(rows, grid.get('rowCount', 0)), max(columns, grid.get('columnCount', 0))
+    if (row_count, column_count) == (grid.get('rowCount'), grid.get('columnCount')):
+        return True
+    request = {'updateSheetProperties': {
+        'properties': {'sheetId': properties['sheetId'], 'gridProperties': {'rowCount': row_count, 'columnCount': column_count}},
+        'fields': 'gridProperties(rowCount,columnCount)'
+    }}
+    try:
+        execute_sheets_request(service.spreadsheets().batchUpdate(spreadsheetId=spreadsheet_id, body={'requests': [request]}))
+    except HttpError as e:
+        print(f"Erro ao ajustar o tamanho da aba '{sheet_name}': {e}")
+        return False
+    print(f"Aba '{sheet_name}' ajustada para {row_count} linhas e {column_count} colunas.")
+    return True
+
+class SheetWriteMerger:
+    """
+    Combina as escritas de jobs que rodam ao mesmo tempo na mesma planilha em batchUpdates compartilhados.
+    Cada job em andamento numa planilha chama write() (ou leave(), se terminar sem escrever); quando
+    todos chegaram, os intervalos de todos vão juntos nos mesmos lotes e cada job recebe só a sua parte do
+    resultado: os lotes em que tinha intervalos, com os seus intervalos e células. A falha de um lote só
+    chega aos jobs que tinham intervalos nele.
+    """
+
+    def __init__(self):
+        self._running = defaultdict(set)
+        self._pending = defaultdict(list)
+        self._services = {}
+        self._lock = threading.Lock()
+
+    def enter(self, job_name, spreadsheet_id):
+        with self._lock:
+            self._running[spreadsheet_id].add(job_name)
+
+    def write(self, job_name, service, spreadsheet_id, value_ranges):
+        """Entrega os intervalos do job e espera o envio combinado. Retorna a parte do job no resultado de cada lote."""
+        future = Future()
+        with self._lock:
+            self._pending[spreadsheet_id].append((job_name, value_ranges, future))
+            self._services[spreadsheet_id] = service
+            ready = self._arrive(job_name, spreadsheet_id)
+        if ready:
+            self._send(spreadsheet_id, *ready)
+        return future.result()
+
+    def leave(self, job_name, spreadsheet_id):
+        """Marca o job como terminado; se os demais da planilha já estavam esperando, dispara o envio."""
+        with self._lock:
+            ready = self._arrive(job_name, spreadsheet_id)
+        if ready:
+            self._send(spreadsheet_id, *ready)
+
+    def _arrive(self, job_name, spreadsheet_id):
+        self._running[spreadsheet_id].discard(job_name)
+        if self._running[spreadsheet_id] or not self._pending[spreadsheet_id]:
+            return None
+        return self._services.pop(spreadsheet_id), self._pending.pop(spreadsheet_id)
+
+    def _send(self, spreadsheet_id, service, pending):
+        value_ranges = [value_range for _, job_ranges, _ in pending for value_range in job_ranges]
+        # Dono de cada intervalo, na mesma ordem (os lotes mantêm a ordem dos intervalos)
+        owners = [owner for owner, (_, job_ranges, _) in enumerate(pending) for _ in job_ranges]
+        if len(pending) > 1:
+            names = ', '.join(job_name for job_name, _, _ in pending)
+            print(f"Escrita combinada na planilha {spreadsheet_id}: {len(value_ranges)} intervalos dos jobs {names}.")
+        chunks = chunk_value_ranges(value_ranges)
+        try:
+            results = send_sheet_chunks(service, spreadsheet_id, chunks)
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(e)
+            return
+        job_results = [[] for _ in pending]
+        position = 0
+        for chunk, result in zip(chunks, results):
+            shares = {}
+            for value_range in chunk:
+                share = shares.setdefault(owners[position], {'ranges': 0, 'cells': 0})
+                share['ranges'] += 1
+                share['cells'] += sum(len(row) for row in value_range['values'])
+                position += 1
+            for owner, share in shares.items():
+                # Com valueInputOption RAW, um lote gravado atualiza exatamente as células enviadas
+                job_results[owner].append(dict(result, updated_cells=share['cells'] if result['ok'] else 0, **share))
+        for (_, _, future), own_results in zip(pending, job_results):
+            future.set_result(own_results)
+
+# --- Diário da Sincronização (plano das escritas e retomada) ---
+
+def chunk_sheet_rows(rows, max_bytes=None, max_cells=None):
+    """
+    Divide linhas em lotes com no máximo max_bytes (tamanho estimado do JSON) e max_cells células
+    cada, como chunk_value_ranges faz com os intervalos.
+    """
+    max_bytes = max_bytes or SHEETS_LOTE_MAX_BYTES
+    max_cells = max_cells or SHEETS_LOTE_MAX_CELULAS
+    chunks, current, current_bytes, current_cells = [], [], 0, 0
+    for row in rows:
+        size = len(json.dumps(row, ensure_ascii=False).encode('utf-8'))
+        cells = max(1, len(row))
+        if current and (current_bytes + size > max_bytes or current_cells + cells > max_cells):
+            chunks.append(current)
+            current, current_bytes, current_cells = [], 0, 0
+        current.append(row)
+        current_bytes += size
+        current_cells += cells
+    if current:
+        chunks.append(current)
+    return chunks
+
+def initial_load_ranges(sheet_header, rows, sheet_name):
+    """
+    Value ranges da carga inicial de uma planilha vazia: o cabeçalho na linha 1 e as linhas logo abaixo,
+    em blocos de linhas consecutivas (ver chunk_sheet_rows) com a posição já definida. Diferente do
+    append, os blocos podem ser gravados em paralelo e regravados sem duplicar nada.
+    """
+    last_column = column_letter(max(len(sheet_header), 1) - 1)
+    value_ranges, first_row = [], 1
+    for block in chunk_sheet_rows([list(sheet_header)] + rows):
+        last_row = first_row + len(block) - 1
+        value_ranges.append({'range': f"{sheet_name}!A{first_row}:{last_column}{last_row}", 'values': block})
+        first_row = last_row + 1
+    return value_ranges
+
+def build_sync_plan(job, sheet_header, cell_updates, value_ranges, new_rows, watermark=None, save_watermark=False, initial=False):
+    """
+    Monta o plano das escritas de uma execução, já dividido nos lotes que serão enviados: os value ranges
+    em lotes de batchUpdate (chunk_value_ranges) e as novas linhas em lotes de append (chunk_sheet_rows).
+    Com initial=True (planilha vazia), a aba é redimensionada uma vez e o cabeçalho e as linhas vão em
+    lotes de batchUpdate com posição fixa (ver initial_load_ranges). É este plano que o diário guarda.
+    """
+    if initial:
+        chunks = [{'kind': 'grid', 'rows': len(new_rows) + 1, 'columns': len(sheet_header)}]
+        for number, value_range in enumerate(initial_load_ranges(sheet_header, new_rows, job['sheet_name'])):
+            # 'rows' conta só as linhas de dados do bloco (o primeiro leva também o cabeçalho)
+            chunks.append({'kind': 'update', 'value_ranges': [value_range], 'rows': len(value_range['values']) - (number == 0)})
+    else:
+        chunks = [{'kind': 'update', 'value_ranges': chunk} for chunk in chunk_value_ranges(value_ranges)]
+        chunks.extend({'kind': 'append', 'rows': rows} for rows in chunk_sheet_rows(new_rows))
+    return {
+        'job': job['name'],
+        'spreadsheet_id': job['spreadsheet_id'],
+        'sheet_name': job['sheet_name'],
+        'key_column': job['key_column'],
+        'sheet_header': list(sheet_header),
+        'initial': initial,
+        'updates': cell_updates,
+        'new_rows': len(new_rows),
+        'watermark': watermark,
+        'save_watermark': save_watermark,
+        'chunks': chunks
+    }
+
+def describe_sync_plan(plan):
+    """Resumo do plano em uma linha (células, intervalos, novas linhas e lotes)."""
+    if plan['initial']:
+        return f"carga inicial de {plan['new_rows']} linha(s) em {len(plan['chunks']) - 1} lote(s)"
+    ranges = sum(len(chunk['value_ranges']) for chunk in plan['chunks'] if chunk['kind'] == 'update')
+    return (f"{len(plan['updates'])} célula(s) a atualizar em {ranges} intervalo(s) e {plan['new_rows']} nova(s) linha(s), "
+            f"em {len(plan['chunks'])} lote(s)")
+
+class SyncJournal:
+    """
+    Diário das escritas de um job, salvo em SYNC_DIARIO_DIRETORIO/<hash do job>/: o plano da execução
+    (plano.json, ver build_sync_plan) e o andamento de cada lote (andamento.jsonl, uma linha a cada lote
+    enviado ou concluído). Se a execução morrer no meio da escrita, a próxima retoma o plano sem buscar
+    no Jira nem comparar de novo (ver resume_sync_journal). Com directory vazio, nada é gravado.
+    """
+
+    def __init__(self, job, directory=SYNC_DIARIO_DIRETORIO, max_age_hours=SYNC_DIARIO_VALIDADE_HORAS):
+        self.path = None
+        if directory:
+            digest = hashlib.sha256(json.dumps([job['state_key'], job['spreadsheet_id'], job['sheet_name']]).encode('utf-8')).hexdigest()[:16]
+            self.path = os.path.join(directory, digest)
+        self.max_age_hours = max_age_hours
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def load(self):
+        """
+        Retorna (plano, andamento) de uma escrita que não terminou, ou None se não houver diário válido.
+        andamento mapeia o número do lote para 'sent' (enviado, sem confirmação) ou 'done' (concluído).
+        """
+        if self.path is None:
+            return None
+        try:
+            with open(self._file('plano.json'), 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+            age = datetime.now(timezone.utc) - datetime.fromisoformat(plan['created_at'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Aviso: não foi possível ler o diário da sincronização em '{self.path}' ({e}). Ele foi descartado.")
+            self.clear()
+            return None
+        if age > timedelta(hours=self.max_age_hours):
+            print(f"Diário da sincronização de mais de {self.max_age_hours:g}h descartado. A planilha será comparada de novo com o Jira.")
+            self.clear()
+            return None
+
+        progress = {}
+        try:
+            with open(self._file('andamento.jsonl'), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Linha cortada pela queda da execução
+                    progress[entry['chunk']] = entry['status']
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Aviso: não foi possível ler o andamento do diário em '{self.path}' ({e}). Ele foi descartado.")
+            self.clear()
+            return None
+        return plan, progress
+
+    def save(self, plan):
+        """Grava o plano (e zera o andamento) antes da primeira escrita na planilha."""
+        if self.path is None or not plan['chunks']:
+            return
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            if os.path.exists(self._file('andamento.jsonl')):
+                os.remove(self._file('andamento.jsonl'))
+            content = dict(plan, created_at=datetime.now(timezone.utc).isoformat(timespec='seconds'))
+            _atomic_write(self._file('plano.json'), json.dumps(content, ensure_ascii=False))
+        except OSError as e:
+            print(f"Aviso: não foi possível salvar o diário da sincronização ({e}). As escritas não poderão ser retomadas.")
+            self.clear()
+            self.path = None
+
+    def mark(self, chunk, status):
+        """Registra o andamento de um lote ('sent' antes de um append, 'done' depois de cada lote gravado)."""
+        if self.path is None:
+            return
+        try:
+            with open(self._file('andamento.jsonl'), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'chunk': chunk, 'status': status}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            # Um diário sem o andamento completo poderia repetir um append; melhor não retomar
+            print(f"Aviso: não foi possível registrar o andamento no diário ({e}). As escritas não poderão ser retomadas.")
+            self.clear()
+            self.path = None
+
+    def clear(self):
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+def check_sync_plan(plan, progress, sheet_header, sheet_keys):
+    """
+    Confere um plano pendente contra a planilha atual antes de retomá-lo: o cabeçalho tem que ser o do
+    plano e cada linha a atualizar tem que continuar com a mesma chave. Um append enviado sem confirmação
+    é procurado pelas chaves: se as linhas já estão na planilha, o lote é dado como concluído; senão, só as
+    que faltam são reenviadas. sheet_keys é a coluna de chaves, a partir da segunda linha da planilha.
+    Retorna o andamento ajustado, ou None se a planilha mudou e o plano não vale mais.
+    """
+    key_column = plan['key_column']
+    if sheet_header != plan['sheet_header'] and not (plan['initial'] and not sheet_header):
+        print("O cabeçalho da planilha mudou desde o plano salvo.")
+        return None
+    for update in plan['updates']:
+        position = update['row'] - 2
+        current = sheet_keys[position] if position < len(sheet_keys) else ''
+        # Uma atualização da própria coluna de chaves pode ou não ter sido gravada
+        expected = {update['key'], update['old']} if update['column'] == key_column else {update['key']}
+        if current not in expected:
+            print(f"A linha {update['row']} da planilha não tem mais a chave {update['key']}.")
+            return None
+
+    present = set(sheet_keys)
+    key_index = plan['sheet_header'].index(key_column)
+    for number, chunk in enumerate(plan['chunks']):
+        if chunk['kind'] != 'append' or progress.get(number) != 'sent':
+            continue
+        missing = [row for row in chunk['rows'] if str(row[key_index]) not in present]
+        if not missing:
+            progress[number] = 'done'
+        elif len(missing) < len(chunk['rows']):
+            chunk['rows'] = missing
+    return progress
+
+def apply_sync_plan(service, plan, journal, progress=None, write_merger=None):
+    """
+    Grava o plano na planilha: primeiro a grade da aba (carga inicial, ver ensure_sheet_grid), depois
+    os lotes de batchUpdate (em paralelo, ver send_sheet_chunks) e por fim os de append, em ordem.
+    Cada append é marcado no diário como enviado antes da chamada e como concluído depois dela; os demais
+    lotes só como concluídos (reenviar um deles não duplica nada). Lotes já concluídos em progress são
+    pulados; com write_merger, a escrita é combinada com a dos outros jobs da planilha (ver SheetWriteMerger)
+    e os lotes de batchUpdate só são marcados se todos derem certo.
+    Retorna (ok, appended), onde appended lista (linhas, resposta da API) de cada append feito.
+    """
+    metrics = current_metrics()
+    progress = progress or {}
+    pending = [(number, chunk) for number, chunk in enumerate(plan['chunks']) if progress.get(number) != 'done']
+    grids = [(number, chunk) for number, chunk in pending if chunk['kind'] == 'grid']
+    updates = [(number, chunk) for number, chunk in pending if chunk['kind'] == 'update']
+    appends = [(number, chunk) for number, chunk in pending if chunk['kind'] == 'append']
+    ok = True
+
+    for number, chunk in grids:
+        # Os batchUpdates com posição fixa da carga inicial precisam caber na grade
+        with metrics.span('write'):
+            if not ensure_sheet_grid(service, plan['spreadsheet_id'], plan['sheet_name'], chunk['rows'], chunk['columns']):
+                return False, []
+        journal.mark(number, 'done')
+
+    if updates:
+        total_rows = sum(chunk.get('rows', 0) for _, chunk in updates)
+        loaded_rows = 0
+
+        def on_result(result):
+            nonlocal loaded_rows
+            number, chunk = updates[result['chunk'] - 1]
+            status = "OK" if result['ok'] else "FALHOU"
+            if result['ok']:
+                journal.mark(number, 'done')
+            if plan['initial']:
+                if result['ok']:
+                    loaded_rows += chunk['rows']
+                    metrics.count('rows.appended', chunk['rows'])
+                print(f"   Carga inicial: lote {result['chunk']}/{len(updates)} - {status} "
+                      f"({loaded_rows} de {total_rows} linhas, {loaded_rows * 100 // max(total_rows, 1)}%)")
+            elif len(updates) > 1:
+                print(f"   Lote {result['chunk']}/{len(updates)}: {result['ranges']} intervalos, {result['cells']} células - {status}")
+
+        with metrics.span('write'):
+            if write_merger is not None:
+                value_ranges = [value_range for _, chunk in updates for value_range in chunk['value_ranges']]
+                results = write_merger.write(plan['job'], service, plan['spreadsheet_id'], value_ranges)
+                if all(result['ok'] for result in results):
+                    for number, _ in updates:
+                        journal.mark(number, 'done')
+            else:
+                results = send_sheet_chunks(service, plan['spreadsheet_id'], [chunk['value_ranges'] for _, chunk in updates], on_result)
+        ok = all(result['ok'] for result in results)
+        metrics.count('ranges.written', sum(result['ranges'] for result in results if result['ok']))
+        metrics.count('cells.updated', sum(result['updated_cells'] for result in results))
+
+    appended = []
+    for position, (number, chunk) in enumerate(appends, start=1):
+        journal.mark(number, 'sent')
+        with metrics.span('write'):
+            result = append_google_sheet_rows(service, plan['spreadsheet_id'], plan['sheet_name'], chunk['rows'])
+        if result is None:
+            # As linhas entram na ordem do plano; os lotes seguintes ficam para a próxima execução
+            ok = False
+            break
+        journal.mark(number, 'done')
+        metrics.count('rows.appended', len(chunk['rows']))
+        appended.append((chunk['rows'], result))
+        if len(appends) > 1:
+            print(f"   Lote de novas linhas {position}/{len(appends)}: {len(chunk['rows'])} linhas - OK")
+    return ok, appended
+
+def resume_sync_journal(journal, pending, job, write_merger=None, local_state=False):
+    """
+    Retoma as escritas de um plano que ficou pela metade (ver SyncJournal), sem consultar o Jira: confere
+    o plano contra a planilha (check_sync_plan), grava os lotes que faltaram e, se tudo deu certo, avança
+    a marca d'água guardada no plano e apaga o diário.
+    Retorna True se o plano foi concluído, False se foi descartado (a planilha mudou) ou None se não foi
+    possível concluí-lo; nesse caso o diário fica para a próxima execução.
+    """
+    metrics = current_metrics()
+    plan, progress = pending
+    done = sum(1 for status in progress.values() if status == 'done')
+    print(f"Retomando as escritas de uma execução anterior ({plan['created_at']}): {describe_sync_plan(plan)}; "
+          f"{done} lote(s) já concluído(s).")
+
+    sheets_service = get_google_sheets_service()
+    if not sheets_service:
+        print("Não foi possível conectar ao serviço do Google Sheets. Encerrando.")
+        return None
+    spreadsheet_id, sheet_name, key_column = plan['spreadsheet_id'], plan['sheet_name'], plan['key_column']
+    with metrics.span('read_sheet'):
+        sheet_header = read_sheet_header(sheets_service, spreadsheet_id, sheet_name)
+        sheet_keys = []
+        if sheet_header and key_column in sheet_header:
+            key_table = read_sheet_columns(sheets_service, spreadsheet_id, sheet_name, sheet_header, [key_column])
+            sheet_keys = key_table.column(key_column) if key_table is not None else None
+    if sheet_header is None or sheet_keys is None:
+        print("Não foi possível ler a Planilha Google. As escritas pendentes ficam para a próxima execução.")
+        return None
+
+    progress = check_sync_plan(plan, progress, sheet_header, sheet_keys)
+    if progress is None:
+        print("Plano salvo descartado. A planilha será comparada de novo com o Jira.")
+        metrics.count('journal.discarded')
+        journal.clear()
+        return False
+    metrics.count('journal.resumed')
+    writes_ok, _ = apply_sync_plan(sheets_service, plan, journal, progress, write_merger)
+    if local_state:
+        # O estado local não acompanhou as escritas da execução interrompida; a próxima relê a planilha
+        state_store = SheetStateStore()
+        state_store.invalidate(spreadsheet_id, sheet_name)
+        state_store.close()
+    if not writes_ok:
+        print("Escritas pendentes com erros. O diário fica para a próxima execução.")
+        return None
+    if plan['save_watermark']:
+        save_sync_watermark(job['state_key'], plan['watermark'])
+    journal.clear()
+    print("Escritas pendentes concluídas.")
+    return True
+
+# --- Sincronização Incremental (marca d'água) ---
+
+def _parse_jira_datetime(value):
+    """Converte uma data do Jira (ex: '2024-01-31T17:45:12.345-0300') em datetime com fuso."""
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%f%z')
+
+def load_sync_watermark(jql_query, state_file=SYNC_ESTADO_ARQUIVO):
+    """
+    Lê do arquivo de estado local a marca d'água (maior 'updated' já sincronizado) da JQL informada.
+    Retorna None se não houver estado salvo para essa JQL.
+    """
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Aviso: não foi possível ler o arquivo de estado '{state_file}' ({e}). Fazendo sincronização completa.")
+        return None
+    return state.get(jql_query, {}).get('updated')
+
+_sync_state_lock = threading.Lock()
+
+def save_sync_watermark(jql_query, watermark, state_file=SYNC_ESTADO_ARQUIVO):
+    """Grava a marca d'água da JQL no arquivo de estado local (escrita atômica; seguro entre jobs simultâneos)."""
+    with _sync_state_lock:
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        state[jql_query] = {
+            'updated': watermark,
+            'synced_at': datetime.now(timezone.utc).isoformat(timespec='seconds')
+        }
+        tmp_file = f"{state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, state_file)
+
+def newest_updated(issues, current=None):
+    """Retorna o maior valor de 'updated' entre as issues (e a marca d'água atual, se houver)."""
+    newest = current
+    newest_dt = _parse_jira_datetime(current) if current else None
+    for issue in issues:
+        updated = issue.updated
+        if not updated:
+            continue
+        updated_dt = _parse_jira_datetime(updated)
+        if newest_dt is None or updated_dt > newest_dt:
+            newest, newest_dt = updated, updated_dt
+    return newest
+
+def add_updated_since_clause(jql_query, watermark):
+    """
+    Restringe a JQL às issues atualizadas desde a marca d'água.
+    A cláusula entra antes do ORDER BY; a JQL original fica entre parênteses.
+    O JQL só aceita minutos, então volta SYNC_MARGEM_MINUTOS para não perder
+    issues atualizadas no mesmo minuto (reprocessá-las não altera o resultado).
+    """
+    since = _parse_jira_datetime(watermark) - timedelta(minutes=SYNC_MARGEM_MINUTOS)
+    jql_filter, order_by = split_jql_order_by(jql_query)
+    return join_jql(jql_filter, f'updated >= "{_jql_datetime(since)}"', order_by)
+
+def split_jql_order_by(jql_query):
+    """Separa a JQL em (filtro, ORDER BY); o ORDER BY é None se a JQL não tiver um."""
+    parts = re.split(r'\s+ORDER\s+BY\s+', jql_query, maxsplit=1, flags=re.IGNORECASE)
+    return parts[0], (parts[1] if len(parts) > 1 else None)
+
+def join_jql(jql_filter, clause=None, order_by=None):
+    """Monta a JQL com a cláusula extra (o filtro original fica entre parênteses) e o ORDER BY."""
+    jql = f'({jql_filter}) AND {clause}' if clause else jql_filter
+    if order_by:
+        jql += f' ORDER BY {order_by}'
+    return jql
+
+def _jql_datetime(value):
+    """Formata uma data para o JQL, que só aceita minutos."""
+    return value.strftime("%Y/%m/%d %H:%M")
+
+# --- Busca Fatiada no Jira (janelas de 'updated' ou faixas de id) ---
+
+def count_jira_issues(jql_query):
+    """
+    Conta as issues da JQL: no modo token, pela contagem aproximada do Jira Cloud
+    (/rest/api/3/search/approximate-count); no modo offset, pelo total de uma busca com maxResults=0.
+    Retorna None se a contagem falhar.
+    """
+    if JIRA_PAGINACAO == 'token':
+        def fetch():
+            return jira_request('POST', '/rest/api/3/search/approximate-count', json={"jql": jql_query}).json().get('count', 0)
+    else:
+        def fetch():
+            params = {"jql": jql_query, "fields": "key", "maxResults": 0}
+            return jira_request('GET', '/rest/api/3/search', params=params).json().get('total', 0)
+
+    try:
+        count = request_scheduler.call('jira', fetch)
+    except requests.exceptions.RequestException as e:
+        print(f"Erro ao contar as issues do Jira: {e}")
+        return None
+    current_metrics().count('jira.counts')
+    return count
+
+def _first_jira_issue(jql_query, fields):
+    """Retorna a primeira issue da JQL no JSON do Jira (só com os campos em fields), ou None se não houver nenhuma."""
+    params = {"jql": jql_query, "fields": ",".join(fields), "maxResults": 1}
+    if JIRA_PAGINACAO == 'token':
+        page = _search_jira('/rest/api/3/search/jql', params, '1')
+    else:
+        page = _search_jira('/rest/api/3/search', {**params, "startAt": 0}, 'startAt=0')
+    if page is None:
+        raise JiraFetchError("não foi possível achar os limites das fatias")
+    issues = page.get('issues', [])
+    return issues[0] if issues else None
+
+def _shard_bounds(jql_filter, mode):
+    """
+    Intervalo [início, fim) do eixo de fatiamento entre as issues da JQL, ou None se ela não tiver issues.
+    No modo 'id' os extremos vêm da issue criada primeiro e da criada por último (o JQL não ordena por id);
+    como a primeira e a última fatia ficam abertas, um extremo impreciso só desequilibra as fatias.
+    """
+    sort_field, fields = ('updated', ['updated']) if mode == 'updated' else ('created', ['created'])
+    first = _first_jira_issue(join_jql(jql_filter, order_by=f'{sort_field} ASC'), fields)
+    last = _first_jira_issue(join_jql(jql_filter, order_by=f'{sort_field} DESC'), fields)
+    if first is None or last is None:
+        return None
+    if mode == 'updated':
+        def minute(issue):
+            return _parse_jira_datetime(issue['fields']['updated']).replace(second=0, microsecond=0)
+        start, end = minute(first), minute(last) + timedelta(minutes=1)
+    else:
+        low, high = sorted((int(first['id']), int(last['id'])))
+        start, end = low, high + 1
+    return start, end
+
+def _shard_midpoint(start, end, mode):
+    """Meio do intervalo [start, end), ou None se ele não puder mais ser dividido (1 minuto ou 1 id)."""
+    if mode == 'updated':
+        middle = (start + (end - start) / 2).replace(second=0, microsecond=0)
+    else:
+        middle = (start + end) // 2
+    return middle if middle > start else None
+
+def _shard_clause(mode, start=None, end=None):
+    """Cláusula JQL da fatia [start, end); sem start ou sem end, a fatia fica aberta naquele lado."""
+    clauses = []
+    if mode == 'updated':
+        if start is not None:
+            clauses.append(f'updated >= "{_jql_datetime(start)}"')
+        if end is not None:
+            clauses.append(f'updated < "{_jql_datetime(end)}"')
+    else:
+        if start is not None:
+            clauses.append(f'id >= {start}')
+        if end is not None:
+            clauses.append(f'id < {end}')
+    return ' AND '.join(clauses)
+
+def plan_jira_shards(jql_query, mode=JIRA_FATIAMENTO, shard_size=JIRA_FATIA_TAMANHO):
+    """
+    Divide a JQL em fatias de cerca de shard_size issues pelo eixo mode ('updated' ou 'id').
+    Parte do intervalo entre a primeira e a última issue e divide ao meio, contando as issues da
+    metade da esquerda, toda fatia com mais de shard_size issues; depois junta fatias vizinhas pequenas.
+    A primeira e a última fatia ficam abertas nas pontas, então as fatias cobrem a JQL inteira mesmo
+    que a contagem seja aproximada ou que issues mudem durante a busca.
+    Retorna a lista de JQLs das fatias (só a JQL original, se não valer a pena fatiar), ou None se
+    alguma contagem falhar. Levanta JiraFetchError se não conseguir achar os limites.
+    """
+    jql_filter, order_by = split_jql_order_by(jql_query)
+    total = count_jira_issues(jql_filter)
+    if total is None:
+        return None
+    if total <= shard_size:
+        return [jql_query]
+    bounds = _shard_bounds(jql_filter, mode)
+    if bounds is None:
+        return [jql_query]
+
+    # Divide em profundidade, a metade da esquerda primeiro, para as fatias saírem em ordem
+    pending = [(bounds[0], bounds[1], total)]
+    ranges = []
+    while pending:
+        start, end, count = pending.pop()
+        middle = _shard_midpoint(start, end, mode) if count > shard_size else None
+        if middle is None:
+            ranges.append((start, end, count))
+            continue
+        left = count_jira_issues(join_jql(jql_filter, _shard_clause(mode, start, middle)))
+        if left is None:
+            return None
+        pending.append((middle, end, max(0, count - left)))
+        pending.append((start, middle, left))
+
+    merged = []
+    for start, end, count in ranges:
+        if merged and merged[-1][2] + count <= shard_size:
+            merged[-1] = (merged[-1][0], end, merged[-1][2] + count)
+        else:
+            merged.append((start, end, count))
+
+    last = len(merged) - 1
+    return [join_jql(jql_filter, _shard_clause(mode, start if index > 0 else None, end if index < last else None), order_by)
+            for index, (start, end, _) in enumerate(merged)]
+
+class JiraShardCheckpoint:
+    """
+    Progresso de uma busca fatiada, salvo em JIRA_FATIAS_DIRETORIO/<hash da JQL>/: o plano das fatias
+    (plano.json) e as issues de cada fatia concluída (fatia-N.json). Se a busca falhar, a próxima
+    execução com a mesma JQL e o mesmo mapeamento de colunas reaproveita o plano e as fatias salvas.
+    """
+
+    def __init__(self, jql_query, mapping, mode, directory=JIRA_FATIAS_DIRETORIO, max_age_hours=JIRA_FATIAS_VALIDADE_HORAS):
+        digest = hashlib.sha256(json.dumps([jql_query, mapping.fingerprint, mode]).encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(directory, digest)
+        self.record_class = mapping.record_class
+        self.max_age_hours = max_age_hours
+
+    def _shard_file(self, index):
+        return os.path.join(self.path, f'fatia-{index}.json')
+
+    def load_plan(self):
+        """Retorna as JQLs das fatias de uma busca anterior que não terminou, ou None se não houver plano válido."""
+        try:
+            with open(os.path.join(self.path, 'plano.json'), 'r', encoding='utf-8') as f:
+                plan = json.load(f)
+            age = datetime.now(timezone.utc) - datetime.fromisoformat(plan['created_at'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Aviso: não foi possível ler as fatias salvas em '{self.path}' ({e}). Buscando todas as fatias.")
+            self.clear()
+            return None
+        if age > timedelta(hours=self.max_age_hours):
+            print(f"Fatias salvas há mais de {self.max_age_hours:g}h descartadas. Buscando todas as fatias.")
+            self.clear()
+            return None
+        return plan['shards']
+
+    def save_plan(self, shards):
+        os.makedirs(self.path, exist_ok=True)
+        plan = {'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'shards': shards}
+        _atomic_write(os.path.join(self.path, 'plano.json'), json.dumps(plan, ensure_ascii=False, indent=2))
+
+    def load_shard(self, index):
+        """Issues salvas da fatia index, ou None se ela ainda não foi concluída."""
+        try:
+            with open(self._shard_file(index), 'r', encoding='utf-8') as f:
+                return [self.record_class(**issue) for issue in json.load(f)]
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save_shard(self, index, issues):
+        _atomic_write(self._shard_file(index), json.dumps([issue.to_dict() for issue in issues], ensure_ascii=False))
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+def _fetch_jira_shard(shard_jql, mapping, cancel=None):
+    """Busca todas as páginas de uma fatia. Levanta JiraFetchError se alguma página falhar (ou se cancel for acionado)."""
+    issues = []
+    for page in iter_jira_pages(shard_jql, mapping, cancel):
+        issues.extend(page)
+    return issues
+
+def get_jira_issues_sharded(jql_query, mapping, mode=JIRA_FATIAMENTO, shard_size=JIRA_FATIA_TAMANHO, cancel=None):
+    """
+    Busca a JQL em fatias (ver plan_jira_shards), no máximo JIRA_FATIAS_CONCORRENCIA ao mesmo tempo.
+    Cada fatia concluída é salva (JiraShardCheckpoint); se alguma falhar, as outras continuam e a
+    próxima execução busca só as que faltaram. Ao terminar, as fatias salvas são apagadas.
+    Retorna as issues na ordem das fatias, sem chaves repetidas, ou None se alguma fatia falhar
+    ou se cancel for acionado (as fatias concluídas ficam salvas do mesmo jeito).
+    """
+    metrics = current_metrics()
+    checkpoint = JiraShardCheckpoint(jql_query, mapping, mode)
+    results = {}
+    shards = checkpoint.load_plan()
+    if shards is not None:
+        for index in range(len(shards)):
+            issues = checkpoint.load_shard(index)
+            if issues is not None:
+                results[index] = issues
+        metrics.count('jira.shards_resumed', len(results))
+        print(f"Retomando a busca fatiada: {len(results)} de {len(shards)} fatias já estavam salvas.")
+    else:
+        try:
+            shards = plan_jira_shards(jql_query, mode, shard_size)
+        except JiraFetchError as e:
+            print(f"Aviso: {e}.")
+            shards = None
+        if shards is None:
+            print("Aviso: não foi possível dividir a JQL em fatias. Buscando sem fatiar.")
+            shards = [jql_query]
+        if len(shards) > 1:
+            print(f"JQL dividida em {len(shards)} fatias de cerca de {shard_size} issues (por {mode}).")
+            try:
+                checkpoint.save_plan(shards)
+            except OSError as e:
+                print(f"Aviso: não foi possível salvar o plano das fatias ({e}). A busca não poderá ser retomada.")
+
+    def fetch_shards(indexes):
+        failed = []
+        if not indexes:
+            return failed
+        with ThreadPoolExecutor(max_workers=max(1, min(JIRA_FATIAS_CONCORRENCIA, len(indexes)))) as executor:
+            futures = {submit_with_metrics(executor, _fetch_jira_shard, shards[index], mapping, cancel): index for index in indexes}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except JiraFetchCancelled:
+                    failed.append(index)
+                    continue
+                except JiraFetchError as e:
+                    print(f"Erro: a fatia {index + 1} de {len(shards)} falhou ({e}).")
+                    failed.append(index)
+                    continue
+                metrics.count('jira.shards')
+                print(f"Fatia {index + 1} de {len(shards)} concluída ({len(results[index])} tarefas).")
+                if len(shards) > 1:
+                    try:
+                        checkpoint.save_shard(index, results[index])
+                    except OSError as e:
+                        print(f"Aviso: não foi possível salvar a fatia {index + 1} ({e}).")
+        return failed
+
+    # Nas janelas de 'updated', a última fatia (aberta) é buscada depois das outras: uma issue alterada
+    # durante a busca só pode ir para ela, então nenhuma se perde (as repetidas são descartadas abaixo)
+    missing = [index for index in range(len(shards)) if index not in results]
+    deferred = [missing.pop()] if mode == 'updated' and len(missing) > 1 and missing[-1] == len(shards) - 1 else []
+    failed = fetch_shards(missing)
+    if not failed:
+        failed = fetch_shards(deferred)
+    if cancel is not None and cancel.is_set():
+        print("Busca fatiada no Jira cancelada. As fatias concluídas foram salvas para a próxima execução.")
+        return None
+    if failed:
+        print(f"Erro: {len(failed)} de {len(shards)} fatias falharam. As fatias concluídas foram salvas; "
+              f"a próxima execução busca só as que faltaram. Abortando para não sincronizar dados incompletos.")
+        return None
+
+    # Uma issue repetida (alterada durante a busca ou vinda de uma fatia retomada) fica com a versão mais recente
+    issues_by_key = {}
+    for index in range(len(shards)):
+        for issue in results.pop(index):
+            issues_by_key[issue.key] = issue
+    checkpoint.clear()
+    all_issues = list(issues_by_key.values())
+    print(f"Total de {len(all_issues)} tarefas puxadas do Jira" + (f" em {len(shards)} fatias." if len(shards) > 1 else "."))
+    return all_issues
+
+# --- Verificação das Chaves Só da Planilha (órfãs) ---
+
+# Formato de uma chave do Jira (PROJETO-123); outros valores da coluna de chaves nem são buscados
+JIRA_KEY_PATTERN = re.compile(r'^[A-Za-z][A-Za-z0-9_]*-[0-9]+$')
+
+def chunk_jira_keys(keys, max_chars=JIRA_VERIFICACAO_MAX_CARACTERES):
+    """Divide as chaves em lotes cuja JQL 'key in (...)' tem no máximo max_chars caracteres."""
+    chunks, current, current_chars = [], [], len('key in ()')
+    for key in keys:
+        size = len(key) + 4  # Aspas, vírgula e espaço
+        if current and current_chars + size > max_chars:
+            chunks.append(current)
+            current, current_chars = [], len('key in ()')
+        current.append(key)
+        current_chars += size
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _fetch_jira_keys(keys, mapping):
+    """
+    Busca as issues de um lote de chaves, seguindo a paginação (o lote pode ter mais issues que uma página).
+    No modo offset, validateQuery=warn faz o Jira só avisar sobre chaves que não existem, em vez de recusar
+    a JQL. Retorna a lista de IssueRecord; levanta o erro da requisição se ela falhar.
+    """
+    metrics = current_metrics()
+    jql = "key in ({})".format(', '.join(f'"{key}"' for key in keys))
+    if JIRA_PAGINACAO == 'token':
+        path, params = '/rest/api/3/search/jql', {"jql": jql, "fields": ",".join(mapping.fields), "maxResults": JIRA_PAGINA_MAX}
+    else:
+        path, params = '/rest/api/3/search', {"jql": jql, "fields": ",".join(mapping.fields), "maxResults": 100,
+                                              "startAt": 0, "validateQuery": "warn"}
+
+    def fetch(params):
+        response = jira_request('GET', path, params=params)
+        metrics.count('jira.bytes_received', len(response.content))
+        return response.json()
+
+    issues = []
+    while True:
+        page = request_scheduler.call('jira', fetch, params)
+        page_issues = page.get('issues', [])
+        metrics.count('jira.pages')
+        metrics.count('jira.issues', len(page_issues))
+        issues.extend(mapping.compact(page_issues))
+        if JIRA_PAGINACAO == 'token':
+            next_token = None if page.get('isLast') else page.get('nextPageToken')
+            if not next_token:
+                return issues
+            params = dict(params, nextPageToken=next_token)
+        else:
+            next_start = page.get('startAt', 0) + len(page_issues)
+            if not page_issues or next_start >= page.get('total', 0):
+                return issues
+            params = dict(params, startAt=next_start)
+
+def _verify_key_chunk(keys, mapping):
+    """
+    Busca um lote de chaves. Se o Jira recusar a JQL (HTTP 400, ex.: uma chave que não existe mais no
+    modo token), divide o lote ao meio e busca cada metade; uma chave sozinha recusada é dada como inexistente.
+    Retorna (issues, chaves recusadas). Levanta JiraFetchError em qualquer outra falha.
+    """
+    try:
+        return _fetch_jira_keys(keys, mapping), []
+    except requests.exceptions.RequestException as e:
+        if _describe_request_error(e)[0] != 400:
+            raise JiraFetchError(f"a busca de um lote de {len(keys)} chaves falhou ({e})") from e
+    if len(keys) == 1:
+        return [], keys
+    middle = len(keys) // 2
+    left_issues, left_rejected = _verify_key_chunk(keys[:middle], mapping)
+    right_issues, right_rejected = _verify_key_chunk(keys[middle:], mapping)
+    return left_issues + right_issues, left_rejected + right_rejected
+
+def verify_orphan_keys(keys, mapping):
+    """
+    Busca no Jira, pela chave, as tarefas que estão na planilha mas não vieram da JQL (órfãs), sem filtro
+    de projeto ou data: as chaves vão em lotes 'key in (...)' (ver chunk_jira_keys) buscados em paralelo,
+    no máximo JIRA_MAX_CONCORRENCIA ao mesmo tempo. Valores sem formato de chave não são buscados.
+    Retorna (issues encontradas, chaves que não existem no Jira), ou None se algum lote falhar.
+    """
+    metrics = current_metrics()
+    valid_keys = [key for key in dict.fromkeys(keys) if JIRA_KEY_PATTERN.match(key)]
+    chunks = chunk_jira_keys(valid_keys)
+    if not chunks:
+        return [], []
+    print(f"Verificando {len(valid_keys)} chaves da planilha no Jira em {len(chunks)} lote(s)...")
+    found, rejected = [], []
+    with ThreadPoolExecutor(max_workers=max(1, min(JIRA_MAX_CONCORRENCIA, len(chunks)))) as executor:
+        futures = [submit_with_metrics(executor, _verify_key_chunk, chunk, mapping) for chunk in chunks]
+        try:
+            for future in futures:
+                issues, missing = future.result()
+                found.extend(issues)
+                rejected.extend(missing)
+        except JiraFetchError as e:
+            print(f"Erro: {e}.")
+            for future in futures:
+                future.cancel()
+            return None
+    # O Jira devolve a chave em maiúsculas (e a chave nova, se a tarefa mudou de projeto)
+    found_keys = {issue['key'].upper() for issue in found}
+    missing = [key for key in valid_keys if key.upper() not in found_keys]
+    metrics.count('jira.keys_verified', len(valid_keys))
+    metrics.count('jira.keys_missing', len(missing))
+    if rejected:
+        print(f"O Jira recusou {len(rejected)} chave(s) (não existem ou não estão visíveis): {', '.join(rejected[:10])}"
+              f"{'...' if len(rejected) > 10 else ''}")
+    return found, missing
+
+# --- Estado Local da Planilha (SQLite) ---
+
+def key_column_fingerprint(keys):
+    """
+    Resume a coluna de chaves da planilha em (número de linhas, hash).
+    É a validação barata do estado local: se linhas foram incluídas, removidas ou
+    reordenadas na planilha, o resumo muda.
+    """
+    keys = [str(key).strip() for key in keys]
+    while keys and not keys[-1]:
+        keys.pop()
+    return len(keys), hashlib.sha1('\n'.join(keys).encode('utf-8')).hexdigest()
+
+class SheetStateStore:
+    """
+    Guarda em um banco SQLite local a última versão conhecida das colunas comparadas da planilha:
+    em que linha está cada chave do Jira e o que está escrito nela. Enquanto o estado for válido,
+    a comparação usa essa cópia e a planilha não precisa ser lida por inteiro.
+    """
+
+    def __init__(self, path=SHEETS_ESTADO_ARQUIVO):
+        # Vários jobs podem usar o mesmo arquivo ao mesmo tempo; espera o lock do SQLite em vez de falhar
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS sheet_meta (
+                spreadsheet_id TEXT NOT NULL,
+                sheet_name TEXT NOT NULL,
+                header TEXT NOT NULL,
+                columns TEXT NOT NULL,
+                row_count INTEGER NOT NULL,
+                key_hash TEXT NOT NULL,
+                read_at TEXT NOT NULL,
+                PRIMARY KEY (spreadsheet_id, sheet_name)
+            );
+            CREATE TABLE IF NOT EXISTS sheet_rows (
+                spreadsheet_id TEXT NOT NULL,
+                sheet_name TEXT NOT NULL,
+                sheet_row INTEGER NOT NULL,
+                jira_key TEXT NOT NULL,
+                cells TEXT NOT NULL,
+                PRIMARY KEY (spreadsheet_id, sheet_name, sheet_row)
+            );
+            CREATE INDEX IF NOT EXISTS idx_sheet_rows_key ON sheet_rows (spreadsheet_id, sheet_name, jira_key);
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    def load(self, spreadsheet_id, sheet_name, sheet_header, columns, keys, max_age_hours=SHEETS_ESTADO_VALIDADE_HORAS):
+        """
+        Retorna a SheetTable salva (mesmo formato de read_sheet_columns) se ela ainda corresponde à planilha:
+        mesmo cabeçalho, mesmas colunas, mesma coluna de chaves e dentro da validade. Senão retorna None.
+        """
+        meta = self.connection.execute(
+            "SELECT header, columns, row_count, key_hash, read_at FROM sheet_meta WHERE spreadsheet_id = ? AND sheet_name = ?",
+            (spreadsheet_id, sheet_name)
+        ).fetchone()
+        if meta is None:
+            print("Estado local da planilha não encontrado. Lendo a planilha completa.")
+            return None
+        header, saved_columns, row_count, key_hash, read_at = meta
+        if json.loads(header) != list(sheet_header) or json.loads(saved_columns) != list(columns):
+            print("O cabeçalho da planilha mudou desde o último estado local. Lendo a planilha completa.")
+            return None
+        if (row_count, key_hash) != key_column_fingerprint(keys):
+            print("As linhas da planilha mudaram desde o último estado local. Lendo a planilha completa.")
+            return None
+        if datetime.now(timezone.utc) - datetime.fromisoformat(read_at) > timedelta(hours=max_age_hours):
+            print(f"Estado local com mais de {max_age_hours}h. Lendo a planilha completa.")
+            return None
+
+        rows = self.connection.execute(
+            "SELECT sheet_row, cells FROM sheet_rows WHERE spreadsheet_id = ? AND sheet_name = ? ORDER BY sheet_row",
+            (spreadsheet_id, sheet_name)
+        ).fetchall()
+        data = [('',) * len(columns)] * (rows[-1][0] - 1 if rows else 0)
+        for sheet_row, cells in rows:
+            data[sheet_row - 2] = tuple(json.loads(cells))
+        return SheetTable(columns, data)
+
+    def save(self, spreadsheet_id, sheet_name, sheet_header, sheet_table, key_column):
+        """Substitui o estado salvo pelo conteúdo recém-lido da planilha."""
+        row_count, key_hash = key_column_fingerprint(sheet_table.column(key_column))
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM sheet_rows WHERE spreadsheet_id = ? AND sheet_name = ?", (spreadsheet_id, sheet_name)
+            )
+            self.connection.executemany(
+                "INSERT INTO sheet_rows (spreadsheet_id, sheet_name, sheet_row, jira_key, cells) VALUES (?, ?, ?, ?, ?)",
+                self._rows(spreadsheet_id, sheet_name, sheet_table, key_column, range(len(sheet_table)))
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sheet_meta (spreadsheet_id, sheet_name, header, columns, row_count, key_hash, read_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (spreadsheet_id, sheet_name, json.dumps(list(sheet_header), ensure_ascii=False),
+                 json.dumps(sheet_table.columns, ensure_ascii=False), row_count, key_hash,
+                 datetime.now(timezone.utc).isoformat(timespec='seconds'))
+            )
+
+    def record_writes(self, spreadsheet_id, sheet_name, sheet_header, sheet_table, key_column, cell_updates, new_rows, append_result):
+        """
+        Aplica ao estado salvo o que acabou de ser gravado na planilha (células alteradas e linhas
+        adicionadas), sem precisar relê-la. new_rows são as linhas enviadas ao append, na ordem das
+        colunas da planilha; append_result é a resposta da API, que indica onde elas foram parar.
+        """
+        positions = set()
+        for update in cell_updates:
+            position = update['row'] - 2
+            sheet_table.set_cell(position, update['column'], update['new'])
+            positions.add(position)
+
+        if new_rows:
+            updated_range = ((append_result or {}).get('updates') or {}).get('updatedRange', '')
+            match = re.search(r'![A-Z]+(\d+)', updated_range)
+            if not match:
+                print("Não foi possível saber onde as novas linhas foram adicionadas. O estado local foi descartado.")
+                self.invalidate(spreadsheet_id, sheet_name)
+                return
+            first_position = int(match.group(1)) - 2
+            column_indexes = [sheet_header.index(column) for column in sheet_table.columns]
+            appended = [tuple(row[index] if index < len(row) else '' for index in column_indexes) for row in new_rows]
+            # Linhas que ficaram entre o fim lido e o append (vazias nas colunas comparadas) entram em branco
+            gap = [('',) * len(column_indexes)] * max(0, first_position - len(sheet_table))
+            start = len(sheet_table)
+            sheet_table.rows.extend(gap + appended)
+            positions.update(range(start, len(sheet_table)))
+
+        row_count, key_hash = key_column_fingerprint(sheet_table.column(key_column))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO sheet_rows (spreadsheet_id, sheet_name, sheet_row, jira_key, cells) VALUES (?, ?, ?, ?, ?)",
+                self._rows(spreadsheet_id, sheet_name, sheet_table, key_column, sorted(positions))
+            )
+            self.connection.execute(
+                "UPDATE sheet_meta SET row_count = ?, key_hash = ? WHERE spreadsheet_id = ? AND sheet_name = ?",
+                (row_count, key_hash, spreadsheet_id, sheet_name)
+            )
+
+    def invalidate(self, spreadsheet_id, sheet_name):
+        """Descarta o estado salvo; a próxima execução lê a planilha completa."""
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM sheet_meta WHERE spreadsheet_id = ? AND sheet_name = ?", (spreadsheet_id, sheet_name)
+            )
+            self.connection.execute(
+                "DELETE FROM sheet_rows WHERE spreadsheet_id = ? AND sheet_name = ?", (spreadsheet_id, sheet_name)
+            )
+
+    @staticmethod
+    def _rows(spreadsheet_id, sheet_name, sheet_table, key_column, positions):
+        key_position = sheet_table.columns.index(key_column)
+        values = sheet_table.rows
+        for position in positions:
+            cells = [str(value) for value in values[position]]
+            yield (spreadsheet_id, sheet_name, position + 2, cells[key_position].strip(), json.dumps(cells, ensure_ascii=False))
+
+def read_sheet_with_state(service, spreadsheet_id, sheet_name, sheet_header, columns, key_column, state_store=None):
+    """
+    Lê as colunas comparadas da planilha. Com estado local, lê só a coluna de chaves para validar
+    o estado salvo e usa a cópia local; se a validação falhar, lê todas as colunas e atualiza o estado.
+    Retorna a SheetTable ou None em caso de erro.
+    """
+    columns = [name for name in dict.fromkeys(columns) if name in sheet_header]
+    if state_store is not None:
+        keys_table = read_sheet_columns(service, spreadsheet_id, sheet_name, sheet_header, [key_column])
+        if keys_table is None:
+            return None
+        sheet_table = state_store.load(spreadsheet_id, sheet_name, sheet_header, columns, keys_table.column(key_column))
+        if sheet_table is not None:
+            print("Estado local da planilha válido. Usando a cópia local em vez de ler a planilha completa.")
+            return sheet_table
+
+    sheet_table = read_sheet_columns(service, spreadsheet_id, sheet_name, sheet_header, columns)
+    if sheet_table is not None and state_store is not None:
+        state_store.save(spreadsheet_id, sheet_name, sheet_header, sheet_table, key_column)
+    return sheet_table
+
+# --- Histórico dos Status (SQLite) ---
+
+class StatusHistoryStore:
+    """
+    Histórico das tarefas sincronizadas, num banco SQLite local (HISTORICO_STATUS_ARQUIVO): a cada
+    sincronização, uma linha por tarefa nova ou alterada, com o momento da sincronização, o status do
+    Jira, a data de resolução, o 'updated' e os campos do mapeamento (snapshot, em JSON). Uma tarefa só
+    ganha uma linha nova se o status, a data de resolução ou algum campo do mapeamento mudou desde a
+    última gravada; o 'updated' fica de fora do snapshot, porque muda a cada edição da tarefa, inclusive
+    em campos que a automação não usa (a última versão de cada tarefa fica também em status_latest,
+    lida de uma vez por job). Os índices por (job, chave) e por (job, momento) atendem às
+    consultas key_history e changes_between, sem consultar o Jira.
+    """
+
+    # Snapshot com as chaves em ordem, para que tarefas iguais virem sempre o mesmo texto
+    _encoder = json.JSONEncoder(ensure_ascii=False, sort_keys=True, default=str)
+
+    def __init__(self, path=HISTORICO_STATUS_ARQUIVO):
+        # Vários jobs podem usar o mesmo arquivo ao mesmo tempo; espera o lock do SQLite em vez de falhar
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS status_history (
+                job TEXT NOT NULL,
+                jira_key TEXT NOT NULL,
+                synced_at TEXT NOT NULL,
+                status TEXT,
+                resolutiondate TEXT,
+                jira_updated TEXT,
+                snapshot TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_status_history_key ON status_history (job, jira_key, synced_at);
+            CREATE INDEX IF NOT EXISTS idx_status_history_time ON status_history (job, synced_at);
+            CREATE TABLE IF NOT EXISTS status_latest (
+                job TEXT NOT NULL,
+                jira_key TEXT NOT NULL,
+                snapshot TEXT NOT NULL,
+                PRIMARY KEY (job, jira_key)
+            ) WITHOUT ROWID;
+        """)
+
+    def close(self):
+        self.connection.close()
+
+    def record(self, job_name, issues, synced_at=None):
+        """
+        Grava as tarefas (IssueRecord) com o momento synced_at (padrão: agora, em UTC), pulando as que
+        estão iguais à última versão gravada. Retorna quantas linhas foram gravadas.
+        """
+        synced_at = self._timestamp(synced_at or datetime.now(timezone.utc))
+        snapshots = {}
+        for issue in issues:
+            fields = issue.to_dict()
+            del fields['updated']
+            snapshots[str(issue.key)] = (issue, self._encoder.encode(fields))
+        # Uma consulta só para as últimas versões do job, em vez de uma por tarefa
+        latest = dict(self.connection.execute("SELECT jira_key, snapshot FROM status_latest WHERE job = ?", (job_name,)))
+        rows = []
+        for key, (issue, snapshot) in snapshots.items():
+            if latest.get(key) == snapshot:
+                continue
+            rows.append((job_name, key, synced_at, _history_text(issue.get('jira_status', issue.get('status'))),
+                         _history_text(issue.get('resolutiondate')), _history_text(issue.get('updated')), snapshot))
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO status_history (job, jira_key, synced_at, status, resolutiondate, jira_updated, snapshot) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO status_latest (job, jira_key, snapshot) VALUES (?, ?, ?)",
+                ((job_name, key, snapshot) for _, key, _, _, _, _, snapshot in rows)
+            )
+        return len(rows)
+
+    def key_history(self, job_name, key):
+        """Todas as versões gravadas da tarefa key no job, da mais antiga para a mais recente."""
+        return self._query("WHERE job = ? AND jira_key = ? ORDER BY synced_at, rowid", (job_name, key))
+
+    def changes_between(self, job_name, start, end=None):
+        """
+        Versões gravadas no job a partir de start e antes de end (sem end, até agora), em ordem de gravação.
+        start e end são datetime ou texto ISO em UTC (ex.: '2026-10-01').
+        """
+        if end is None:
+            return self._query("WHERE job = ? AND synced_at >= ? ORDER BY synced_at, jira_key", (job_name, self._timestamp(start)))
+        return self._query("WHERE job = ? AND synced_at >= ? AND synced_at < ? ORDER BY synced_at, jira_key",
+                           (job_name, self._timestamp(start), self._timestamp(end)))
+
+    def _query(self, where, params):
+        rows = self.connection.execute(
+            f"SELECT jira_key, synced_at, status, resolutiondate, jira_updated, snapshot FROM status_history {where}", params
+        ).fetchall()
+        return [{'key': key, 'synced_at': synced_at, 'status': status, 'resolutiondate': resolutiondate,
+                 'updated': updated, 'fields': json.loads(snapshot)}
+                for key, synced_at, status, resolutiondate, updated, snapshot in rows]
+
+    @staticmethod
+    def _timestamp(value):
+        if isinstance(value, datetime):
+            value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+            return value.isoformat(timespec='seconds')
+        return str(value)
+
+def _history_text(value):
+    return None if value is None else str(value)
+
+def record_status_history(job, issues):
+    """
+    Grava no histórico dos status (ver StatusHistoryStore) as tarefas buscadas nesta sincronização, depois
+    que a planilha foi gravada; só entram as que mudaram desde a última versão gravada. Uma falha no
+    histórico só é avisada: a sincronização continua.
+    """
+    if not issues:
+        return
+    try:
+        store = StatusHistoryStore()
+        try:
+            written = store.record(job['name'], issues)
+        finally:
+            store.close()
+    except sqlite3.Error as e:
+        print(f"Aviso: não foi possível gravar o histórico dos status ({e}).")
+        return
+    current_metrics().count('history.rows', written)
+    if written:
+        print(f"Histórico dos status: {written} tarefa(s) registrada(s).")
+
+# --- Comparação entre Planilha e Jira (change set) ---
+
+def issues_to_dataframe(jira_rows, names):
+    """Monta o DataFrame das tarefas (IssueRecord) só com os campos em names, coluna a coluna, sem um dict por tarefa."""
+    import pandas as pd
+    # dtype object mantém None (e os números) como vieram, sem virar NaN
+    return pd.DataFrame({name: [getattr(issue, name) for issue in jira_rows] for name in names}, dtype=object)
+
+def _cell_text(value):
+    """Valor de uma tarefa como texto de célula, para comparar com o que foi lido da planilha."""
+    return '' if value is None else str(value)
+
+def build_sheet_key_index(df_google_sheet, key_column):
+    """
+    Monta, uma única vez, o índice Chave Jira -> posição da linha no DataFrame da planilha.
+    Linhas sem chave ficam de fora; chaves repetidas apontam para a primeira ocorrência.
+    """
+    import pandas as pd
+    keys = df_google_sheet[key_column].fillna('').astype(str).str.strip()
+    keys = keys[(keys != '') & ~keys.duplicated(keep='first')]
+    return pd.Series(keys.index, index=keys.values)
+
+def diff_against_sheet_index(df_google_sheet, sheet_index, jira_rows, compared_columns):
+    """
+    Compara tarefas do Jira (IssueRecord) com a planilha usando um índice Chave -> linha já montado,
+    nas colunas compared_columns (pares (campo, coluna) do mapeamento, ver ColumnMapping.updatable).
+    Retorna (updates, inserts, matched_keys); ver compute_change_set para o formato.
+    """
+    df_jira = issues_to_dataframe(jira_rows, ['key'] + [name for name, _ in compared_columns])
+    jira_keys = df_jira['key'].astype(str)
+    sheet_positions = jira_keys.map(sheet_index)
+    in_sheet = sheet_positions.notna().to_numpy()
+
+    # Tarefas nos dois lados: compara cada coluna atualizável do Jira com o que está na planilha
+    positions = sheet_positions[in_sheet].astype(int).to_numpy()
+    matched_keys = jira_keys.to_numpy()[in_sheet]
+    jira_positions = in_sheet.nonzero()[0]
+    df_matched = df_jira[in_sheet]
+    updates = []
+    for order, (name, column) in enumerate(compared_columns):
+        old_values = df_google_sheet[column].fillna('').astype(str).to_numpy()[positions]
+        # Mesmo texto que _cell_text (None vira ''), mas com operações de coluna em vez de uma chamada por tarefa
+        jira_values = df_matched[name]
+        new_values = jira_values.astype(str).where(jira_values.notna(), '').to_numpy()
+        changed = old_values != new_values
+        updates.extend(
+            (jira_position, order, {'row': int(position) + 2, 'column': column, 'key': key, 'old': old, 'new': new})
+            for jira_position, position, key, old, new in zip(
+                jira_positions[changed], positions[changed], matched_keys[changed], old_values[changed], new_values[changed]
+            )
+        )
+    if len(compared_columns) > 1:
+        # Mesma ordem do motor dict: tarefa a tarefa, e as colunas na ordem do mapeamento
+        updates.sort(key=lambda update: update[:2])
+
+    inserts = [jira_rows[index] for index in (~in_sheet).nonzero()[0]]
+    return [update for _, _, update in updates], inserts, matched_keys
+
+def find_orphans(sheet_index, jira_keys):
+    """Retorna as tarefas da planilha cuja Chave não está entre as Chaves do Jira, dicts {row, key}."""
+    orphan_index = sheet_index[~sheet_index.index.isin(jira_keys)]
+    return [{'row': int(position) + 2, 'key': key} for key, position in orphan_index.items()]
+
+def compute_change_set(df_google_sheet, jira_rows, key_column, compared_columns):
+    """
+    Compara a planilha com as tarefas do Jira (IssueRecord) nas colunas compared_columns
+    (ver diff_against_sheet_index), usando operações de coluna (sem iterrows).
+    df_google_sheet deve ter o índice padrão do Pandas (0 = primeira linha após o cabeçalho).
+    Retorna o change set, um dicionário com:
+      'updates': células a atualizar, dicts {row, column, key, old, new}, onde row é o
+                 número real da linha na Planilha Google (1-based, contando o cabeçalho)
+      'inserts': tarefas do Jira que ainda não estão na planilha (IssueRecord)
+      'orphans': tarefas da planilha que não vieram do Jira, dicts {row, key}
+    """
+    sheet_index = build_sheet_key_index(df_google_sheet, key_column)
+    updates, inserts, _ = diff_against_sheet_index(df_google_sheet, sheet_index, jira_rows, compared_columns)
+    orphans = find_orphans(sheet_index, [str(issue.key) for issue in jira_rows])
+    return {'updates': updates, 'inserts': inserts, 'orphans': orphans}
+
+# --- Comparação sem Pandas (motor dict) ---
+
+def index_sheet_keys(sheet_table, key_column):
+    """
+    Mesmo índice de build_sheet_key_index, num dict: Chave Jira -> posição da linha na planilha.
+    A ordem do dict é a ordem das linhas; chaves repetidas apontam para a primeira ocorrência.
+    """
+    sheet_index = {}
+    for position, key in enumerate(sheet_table.column(key_column)):
+        key = key.strip()
+        if key and key not in sheet_index:
+            sheet_index[key] = position
+    return sheet_index
+
+def diff_rows_against_index(sheet_columns, sheet_index, jira_rows, compared_columns):
+    """
+    Versão de diff_against_sheet_index sem Pandas. sheet_columns dá, para cada coluna comparada,
+    os valores da planilha na ordem das linhas (ver SheetTable.column).
+    Retorna (updates, inserts, matched_keys), no mesmo formato e na mesma ordem do motor pandas.
+    """
+    compared = [(name, column, sheet_columns[column]) for name, column in compared_columns]
+    updates, inserts, matched_keys = [], [], []
+    for issue in jira_rows:
+        key = str(issue.key)
+        position = sheet_index.get(key)
+        if position is None:
+            inserts.append(issue)
+            continue
+        matched_keys.append(key)
+        for name, column, sheet_values in compared:
+            old, new = sheet_values[position], _cell_text(getattr(issue, name))
+            if old != new:
+                updates.append({'row': position + 2, 'column': column, 'key': key, 'old': old, 'new': new})
+    return updates, inserts, matched_keys
+
+def orphans_from_index(sheet_index, jira_keys):
+    """Versão de find_orphans para o índice em dict."""
+    jira_keys = set(jira_keys)
+    return [{'row': position + 2, 'key': key} for key, position in sheet_index.items() if key not in jira_keys]
+
+def compute_change_set_rows(sheet_table, jira_rows, key_column, compared_columns):
+    """Mesmo change set de compute_change_set, comparando a SheetTable com as tarefas (IssueRecord), sem Pandas."""
+    sheet_index = index_sheet_keys(sheet_table, key_column)
+    sheet_columns = {column: sheet_table.column(column) for _, column in compared_columns}
+    updates, inserts, _ = diff_rows_against_index(sheet_columns, sheet_index, jira_rows, compared_columns)
+    orphans = orphans_from_index(sheet_index, (str(issue['key']) for issue in jira_rows))
+    return {'updates': updates, 'inserts': inserts, 'orphans': orphans}
+
+def unique_issues(jira_rows):
+    """
+    Tarefas sem chaves repetidas (ex.: a mesma tarefa em duas páginas da paginação por offset, se ela
+    mudou durante a busca): vale a última versão recebida, na posição da primeira, como no modo streaming.
+    """
+    by_key = {}
+    for issue in jira_rows:
+        by_key[str(issue.key)] = issue
+    return jira_rows if len(by_key) == len(jira_rows) else list(by_key.values())
+
+def reconcile(sheet_table, jira_rows, key_column, compared_columns, engine=SYNC_MOTOR):
+    """
+    Calcula o change set (ver compute_change_set) com o motor escolhido: 'pandas' ou 'dict'.
+    compared_columns são os pares (campo, coluna) comparados (ver ColumnMapping.updatable).
+    Uma chave repetida nas tarefas vale uma vez só, com a última versão (ver unique_issues).
+    """
+    jira_rows = unique_issues(jira_rows)
+    if engine == 'dict':
+        return compute_change_set_rows(sheet_table, jira_rows, key_column, compared_columns)
+    return compute_change_set(sheet_table.to_dataframe(), jira_rows, key_column, compared_columns)
+
+def stream_change_set(jql_query, sheet_table, key_column, compared_columns, job, watermark=None, engine=SYNC_MOTOR, on_page=None):
+    """
+    Modo streaming: consome as páginas do Jira conforme chegam (já nos campos do mapeamento
+    de colunas do job) e compara cada página com o índice da planilha, montado uma única vez.
+    Só as mudanças ficam em memória, então o pico de memória depende do tamanho da página,
+    não do total de issues. on_page, se informado, recebe cada página (ex.: para o histórico dos status).
+    Retorna (change_set, newest_updated). Levanta JiraFetchError se alguma página falhar.
+    """
+    if engine == 'dict':
+        sheet_index = index_sheet_keys(sheet_table, key_column)
+        sheet_columns = {column: sheet_table.column(column) for _, column in compared_columns}
+    else:
+        df_google_sheet = sheet_table.to_dataframe()
+        sheet_index = build_sheet_key_index(df_google_sheet, key_column)
+    # Uma tarefa pode aparecer em duas páginas (paginação por offset, se ela mudou durante a busca): vale a
+    # última versão recebida, na posição da primeira, como em reconcile (ver unique_issues)
+    updates_by_key = {}
+    inserts_by_key = {}
+    matched_keys = set()
+    newest = watermark
+    total = 0
+
+    for jira_rows in iter_jira_pages(jql_query, job_mapping(job)):
+        if not jira_rows:
+            continue
+        newest = newest_updated(jira_rows, newest)
+        if on_page is not None:
+            on_page(jira_rows)
+        jira_rows = unique_issues(jira_rows)
+        if engine == 'dict':
+            updates, inserts, page_matched = diff_rows_against_index(sheet_columns, sheet_index, jira_rows, compared_columns)
+        else:
+            updates, inserts, page_matched = diff_against_sheet_index(df_google_sheet, sheet_index, jira_rows, compared_columns)
+        page_updates = {key: [] for key in page_matched}
+        for update in updates:
+            page_updates[update['key']].append(update)
+        updates_by_key.update(page_updates)
+        for issue in inserts:
+            inserts_by_key[str(issue.key)] = issue
+        matched_keys.update(page_matched)
+        total += len(jira_rows)
+
+    updates = [update for key_updates in updates_by_key.values() for update in key_updates]
+    change_set = {'updates': updates, 'inserts': list(inserts_by_key.values())}
+    if engine == 'dict':
+        change_set['orphans'] = orphans_from_index(sheet_index, matched_keys)
+    else:
+        change_set['orphans'] = find_orphans(sheet_index, list(matched_keys))
+    print(f"Total de {total} tarefas do Jira comparadas em modo streaming.")
+    return change_set, newest
+
+# --- Jobs de Sincronização (vários JQL → planilha/aba) ---
+
+def build_default_job(jql, columns, **options):
+    """
+    Monta o job padrão de um script com as configurações do .env. jql e columns (o mapeamento de colunas,
+    no formato de COLUNAS_PLANILHA) são os padrões do script; options troca ou acrescenta campos do job:
+    summary_column (coluna lida só para a deduplicação) e insert_matcher (função que recebe o job, a tabela
+    da planilha, o change set e as colunas comparadas, transforma em atualizações as tarefas novas que já
+    têm linha na planilha e devolve as que continuam novas). Levanta ValueError se o mapeamento for inválido.
+    """
+    job = {
+        'name': 'padrao',
+        'jql': jql,
+        'spreadsheet_id': GOOGLE_SHEETS_ID,
+        'sheet_name': GOOGLE_SHEETS_ABA_NOME,
+        'key_column': GOOGLE_SHEETS_COLUNA_JIRA_KEY,
+        'status_column': GOOGLE_SHEETS_COLUNA_STATUS,
+        'summary_column': None,
+        'done_statuses': JIRA_STATUS_CONCLUIDO,
+        'done_label': "Concluído",
+        'not_done_label': "Não Concluído",
+        'insert_matcher': None,
+        # A marca d'água do job padrão continua indexada só pela JQL, como antes
+        'state_key': jql,
+        'columns': columns
+    }
+    job.update(options)
+    job['mapping'] = ColumnMapping(columns, job)
+    return job
+
+def load_sync_jobs(path, default_job):
+    """
+    Lê o arquivo JSON de jobs: {"jobs": [{"name", "jql", "spreadsheet_id", "sheet_name",
+    "columns": {"key", "status", "summary"}, "status_mapping": {"done", "done_label", "not_done_label"},
+    "mapping": [colunas no formato de COLUNAS_PLANILHA]}, ...]}.
+    Campos ausentes usam os do job padrão do script (default_job, ver build_default_job).
+    Retorna a lista de jobs ou None se o arquivo for inválido.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao ler o arquivo de jobs '{path}': {e}")
+        return None
+
+    jobs = []
+    for number, entry in enumerate(config.get('jobs', []), start=1):
+        name = entry.get('name') or f"job-{number}"
+        if not entry.get('jql'):
+            print(f"Erro no arquivo de jobs: o job '{name}' não tem 'jql'.")
+            return None
+        if any(job['name'] == name for job in jobs):
+            print(f"Erro no arquivo de jobs: o nome '{name}' está repetido.")
+            return None
+        columns = entry.get('columns', {})
+        status_mapping = entry.get('status_mapping', {})
+        job = dict(default_job)
+        job.update({
+            'name': name,
+            'jql': entry['jql'],
+            'spreadsheet_id': entry.get('spreadsheet_id', GOOGLE_SHEETS_ID),
+            'sheet_name': entry.get('sheet_name', GOOGLE_SHEETS_ABA_NOME),
+            'key_column': columns.get('key', default_job['key_column']),
+            'status_column': columns.get('status', default_job['status_column']),
+            'summary_column': columns.get('summary', default_job['summary_column']),
+            'done_statuses': [s.strip().upper() for s in status_mapping.get('done', default_job['done_statuses'])],
+            'done_label': status_mapping.get('done_label', default_job['done_label']),
+            'not_done_label': status_mapping.get('not_done_label', default_job['not_done_label']),
+            'state_key': f"{name}: {entry['jql']}",
+            'columns': entry.get('mapping', default_job['columns'])
+        })
+        try:
+            job['mapping'] = ColumnMapping(job['columns'], job)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Erro no arquivo de jobs: o mapeamento de colunas do job '{name}' é inválido ({e}).")
+            return None
+        jobs.append(job)
+    if not jobs:
+        print(f"Erro no arquivo de jobs '{path}': nenhum job em 'jobs'.")
+        return None
+    return jobs
+
+def run_jobs(jobs, max_workers=SYNC_JOBS_CONCORRENCIA, **run_options):
+    """
+    Executa vários jobs ao mesmo tempo. Todos compartilham a sessão do Jira, o serviço do Google Sheets
+    e o agendador de requisições (limites de taxa); as escritas de jobs na mesma planilha são
+    combinadas em batchUpdates compartilhados (SheetWriteMerger).
+    """
+    write_merger = SheetWriteMerger()
+
+    def run_job(job):
+        write_merger.enter(job['name'], job['spreadsheet_id'])
+        try:
+            print(f"[{job['name']}] Iniciando job.")
+            run_automation(job=job, write_merger=write_merger, **run_options)
+        except Exception as e:
+            print(f"[{job['name']}] Erro inesperado: {e}")
+        finally:
+            write_merger.leave(job['name'], job['spreadsheet_id'])
+            print(f"[{job['name']}] Job finalizado.")
+
+    print(f"Executando {len(jobs)} job(s), até {max_workers} ao mesmo tempo.")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs))), thread_name_prefix='job') as executor:
+        list(executor.map(run_job, jobs))
+
+# --- Lógica Principal da Automação ---
+def run_automation(job, incremental=SYNC_INCREMENTAL, full_resync=False, streaming=SYNC_STREAMING, local_state=SHEETS_ESTADO_LOCAL, issues=None,
+                   write_merger=None, engine=SYNC_MOTOR, plan_only=False, verify_orphans=SYNC_VERIFICAR_ORFAS):
+    """
+    Sincroniza as tarefas do Jira com a Planilha Google.
+    Com incremental=True, busca apenas as tarefas atualizadas desde a última sincronização
+    bem-sucedida; full_resync=True ignora a marca d'água salva e busca tudo de novo.
+    Com streaming=True, a planilha é lida primeiro e cada página do Jira é comparada assim
+    que chega, sem manter todas as issues em memória.
+    Com issues (ex.: recebidas por webhook), a busca no Jira é pulada e só essas tarefas são
+    comparadas: a marca d'água não muda e nenhuma linha da planilha é tratada como ausente do Jira.
+    job define a JQL, a planilha/aba, as colunas e o mapeamento de status (ver build_default_job e load_sync_jobs);
+    write_merger combina as escritas com outros jobs na mesma planilha (ver run_jobs).
+    engine escolhe o motor da comparação: 'pandas' ou 'dict' (sem Pandas, ver reconcile).
+    As escritas são planejadas antes de começar e o plano fica no diário do job (ver SyncJournal): se a
+    execução anterior parou no meio da escrita, esta só termina o que faltou, sem consultar o Jira.
+    Com plan_only=True, o plano é calculado e mostrado, mas nada é gravado na planilha.
+    Com verify_orphans=True, as linhas da planilha que não vieram da JQL são buscadas no Jira pela chave
+    e também são atualizadas (ver verify_orphan_keys).
+    Ao final, a duração de cada fase e os contadores da execução vão para os relatórios (ver publish_run_report).
+    """
+    metrics = RunMetrics(job['name'])
+    token = _run_metrics.set(metrics)
+    try:
+        _sync_job(incremental, full_resync, streaming, local_state, issues, job, write_merger, engine, plan_only, verify_orphans)
+    except Exception:
+        metrics.status = 'exception'
+        raise
+    finally:
+        _run_metrics.reset(token)
+        publish_run_report(metrics.report())
+
+def _sync_job(incremental, full_resync, streaming, local_state, issues, job, write_merger, engine, plan_only=False, verify_orphans=False):
+    """Corpo de run_automation; as fases e o resultado ficam nas métricas da execução (current_metrics)."""
+    metrics = current_metrics()
+    print("--- Iniciando automação Jira para Google Sheets ---")
+
+    # --- A. Puxar Dados do Jira ---
+    jql_query_jira = job['jql']
+    spreadsheet_id, sheet_name = job['spreadsheet_id'], job['sheet_name']
+    key_column, mapping = job['key_column'], job_mapping(job)
+    summary_column = job['summary_column']
+
+    # Escritas de uma execução anterior que parou no meio são concluídas antes de qualquer busca no Jira
+    journal = SyncJournal(job)
+    pending = journal.load()
+    if pending is not None and plan_only:
+        print("Há escritas pendentes de uma execução anterior; elas serão retomadas na próxima execução sem --plan-only.")
+    elif pending is not None:
+        resumed = resume_sync_journal(journal, pending, job, write_merger, local_state)
+        if resumed is None:
+            metrics.status = 'write_error'
+            return
+        if resumed and issues is None:
+            # A próxima execução compara com o Jira a partir da marca d'água que o plano avançou
+            metrics.status = 'ok'
+            print("--- Automação concluída: escritas pendentes retomadas, sem nova busca no Jira. ---")
+            return
+
+    if issues is not None:
+        # Lote parcial (webhook): a marca d'água fica por conta da varredura periódica
+        incremental = full_resync = streaming = False
+    save_watermark = incremental or full_resync
+    watermark = None
+    if incremental and not full_resync:
+        watermark = load_sync_watermark(job['state_key'])
+    if watermark:
+        print(f"Modo incremental: buscando apenas tarefas atualizadas desde {watermark}.")
+        jql_to_fetch = add_updated_since_clause(jql_query_jira, watermark)
+    else:
+        if full_resync:
+            print("Ressincronização completa solicitada: ignorando a marca d'água salva.")
+        jql_to_fetch = jql_query_jira
+
+    jira_rows = None
+    jira_fetch = None
+    newest = watermark
+
+    def receive_jira_rows(rows):
+        """Confere as tarefas recebidas do Jira; retorna False se a execução deve parar por aqui."""
+        nonlocal jira_rows, newest
+        jira_rows = rows
+        if jira_rows is None:
+            print("Falha ao puxar as tarefas do Jira. Encerrando sem alterar a Planilha Google.")
+            return False
+        if not jira_rows:
+            print("Nenhuma tarefa relevante encontrada no Jira com a JQL especificada. Encerrando.")
+            metrics.status = 'ok'
+            return False
+        newest = newest_updated(jira_rows, watermark)
+        print(f"Total de {len(jira_rows)} tarefas processadas do Jira para a comparação.")
+        return True
+
+    def stop_jira_fetch():
+        # Interrompe a busca no Jira em segundo plano, que não seria mais usada
+        if jira_fetch is not None:
+            jira_fetch.cancel()
+
+    if not streaming:
+        if issues is not None:
+            if not receive_jira_rows(issues):
+                return
+        else:
+            # A busca roda em segundo plano enquanto a planilha é lida (B); o resultado é esperado antes da
+            # comparação. As tarefas já chegam só com os campos do mapeamento do job (ver ColumnMapping)
+            jira_fetch = JiraBackgroundFetch(jql_to_fetch, mapping)
+
+    state_store = None
+    try:
+        # --- B. Puxar Dados da Planilha Google Existente ---
+        sheets_service = get_google_sheets_service()
+        if not sheets_service:
+            print("Não foi possível conectar ao serviço do Google Sheets. Encerrando.")
+            return
+
+        # Primeiro só o cabeçalho, para localizar as colunas usadas na comparação onde estiverem
+        with metrics.span('read_sheet'):
+            sheet_header = read_sheet_header(sheets_service, spreadsheet_id, sheet_name)
+        if sheet_header is None:
+            print("Não foi possível ler a Planilha Google. Encerrando.")
+            return
+
+        if not sheet_header and issues is not None:
+            print("Planilha Google vazia. A carga inicial fica para a próxima varredura completa.")
+            metrics.status = 'ok'
+            return
+
+        if not sheet_header and watermark:
+            # Uma planilha vazia precisa de todas as tarefas, não só das alteradas desde a marca d'água
+            stop_jira_fetch()
+            print("Planilha Google vazia em modo incremental. Buscando todas as tarefas do Jira para a carga inicial.")
+            return _sync_job(incremental, True, streaming, local_state, None, job, write_merger, engine, plan_only, verify_orphans)
+
+        if not sheet_header:
+            # A carga inicial grava em posições fixas a partir da linha 1; só segue se não houver nada na aba
+            with metrics.span('read_sheet'):
+                empty = sheet_is_empty(sheets_service, spreadsheet_id, sheet_name)
+            if empty is None:
+                print("Não foi possível ler a Planilha Google. Encerrando.")
+                return
+            if not empty:
+                print("ERRO: a primeira linha da Planilha Google está vazia, mas há dados abaixo dela. Preencha o cabeçalho "
+                      "(ou limpe a aba) e rode de novo. Encerrando sem alterar a planilha.")
+                return
+            print("Planilha Google vazia ou sem dados iniciais. Adicionando todas as tarefas como novas.")
+            # Cabeçalho inicial com as colunas do mapeamento do job (COLUNAS_PLANILHA do script)
+            header_for_new_sheet = mapping.header
+            build_row = mapping.row_builder(header_for_new_sheet)
+
+            if jira_fetch is not None:
+                if not receive_jira_rows(jira_fetch.result()):
+                    return
+            if jira_rows is not None:
+                initial_data_to_add = [build_row(issue) for issue in jira_rows]
+            else:
+                initial_data_to_add = []
+                # Modo streaming: cada página vira direto linhas da planilha (e, com o histórico, fica para ele)
+                jira_rows = [] if HISTORICO_STATUS else None
+                try:
+                    with metrics.span('fetch'):
+                        for page in iter_jira_pages(jql_to_fetch, mapping):
+                            newest = newest_updated(page, newest)
+                            initial_data_to_add.extend(build_row(issue) for issue in page)
+                            if jira_rows is not None:
+                                jira_rows.extend(page)
+                except JiraFetchError as e:
+                    print(f"Erro: {e}. Encerrando sem alterar a Planilha Google.")
+                    return
+        
+            # A aba é redimensionada uma vez e o cabeçalho + os dados vão em blocos de batchUpdate, registrados no diário
+            plan = build_sync_plan(job, header_for_new_sheet, [], [], initial_data_to_add, newest, save_watermark, initial=True)
+            del initial_data_to_add
+            if plan_only:
+                print(f"Modo --plan-only: {describe_sync_plan(plan)}. Nada foi gravado na planilha.")
+                metrics.status = 'ok'
+                return
+            history_rows = jira_rows if HISTORICO_STATUS else None
+            del jira_rows
+            journal.save(plan)
+            writes_ok, _ = apply_sync_plan(sheets_service, plan, journal)
+            if not writes_ok:
+                print("Falha ao preencher a Planilha Google. Encerrando.")
+                if journal.path is not None:
+                    print("As linhas que faltaram ficam no diário e serão adicionadas na próxima execução.")
+                metrics.status = 'write_error'
+                return
+            journal.clear()
+            if history_rows is not None:
+                record_status_history(job, history_rows)
+            if save_watermark:
+                save_sync_watermark(job['state_key'], newest)
+            metrics.status = 'ok'
+            print("Planilha Google preenchida com as tarefas iniciais. Encerrando por esta execução.")
+            return
+
+        compared_columns = mapping.updatable
+        missing_columns = mapping.missing_columns(sheet_header)
+        for column in [key_column] + [column for _, column in compared_columns]:
+            if column in missing_columns:
+                print(f"ERRO: Coluna '{column}' não encontrada no cabeçalho da Planilha Google. Verifique os nomes no .env!")
+                return
+        if missing_columns:
+            print(f"Aviso: coluna(s) {', '.join(missing_columns)} do mapeamento não estão na planilha e ficarão de fora das novas linhas.")
+        # A chave entra nas colunas graváveis para a deduplicação (insert_matcher), que grava a chave na linha encontrada
+        column_indexes = {column: sheet_header.index(column) for column in [key_column] + [column for _, column in compared_columns]}
+
+        if jira_fetch is not None and jira_fetch.failed():
+            # A busca no Jira já falhou: não adianta ler o resto da planilha
+            receive_jira_rows(None)
+            return
+
+        # Só as colunas usadas na comparação e na deduplicação (summary_column) são lidas (ou vêm do
+        # estado local); os dados começam na segunda linha
+        state_store = SheetStateStore() if local_state else None
+        with metrics.span('read_sheet'):
+            sheet_table = read_sheet_with_state(
+                sheets_service, spreadsheet_id, sheet_name, sheet_header,
+                list(column_indexes) + ([summary_column] if summary_column else []),
+                key_column, state_store
+            )
+        if sheet_table is None:
+            print("Não foi possível ler a Planilha Google. Encerrando.")
+            return
+        metrics.count('sheet.rows_read', len(sheet_table))
+        print(f"Puxadas {len(sheet_table)} linhas da Planilha Google.")
+
+        if jira_fetch is not None and not receive_jira_rows(jira_fetch.result()):
+            return
+
+        # --- C. Comparar e Preparar Atualizações/Novas Inserções ---
+        new_rows_for_sheets_api = []
+
+        print("Iniciando comparação de dados...")
+        if streaming:
+            # Com o histórico, as páginas ficam guardadas até a escrita terminar
+            history_rows = [] if HISTORICO_STATUS else None
+            try:
+                # A busca, a projeção e a comparação acontecem juntas, página a página
+                with metrics.span('fetch_diff'):
+                    change_set, newest = stream_change_set(
+                        jql_to_fetch, sheet_table, key_column, compared_columns, job, watermark, engine,
+                        on_page=history_rows.extend if history_rows is not None else None
+                    )
+            except JiraFetchError as e:
+                print(f"Erro: {e}. Encerrando sem alterar a Planilha Google.")
+                return
+        else:
+            with metrics.span('diff'):
+                change_set = reconcile(sheet_table, jira_rows, key_column, compared_columns, engine)
+            history_rows = jira_rows if HISTORICO_STATUS else None
+            del jira_rows
+            if issues is not None:
+                # Num lote parcial, as demais linhas da planilha simplesmente não vieram; não são órfãs
+                change_set['orphans'] = []
+
+        if verify_orphans and change_set['orphans']:
+            if watermark:
+                print("Verificação das órfãs pulada: no modo incremental, quase toda a planilha fica de fora da JQL.")
+            else:
+                with metrics.span('verify'):
+                    verified = verify_orphan_keys([orphan['key'] for orphan in change_set['orphans']], mapping)
+                if verified is None:
+                    print("Aviso: a verificação das órfãs falhou. Ela fica para a próxima execução.")
+                else:
+                    found, missing = verified
+                    # As tarefas encontradas já têm linha na planilha; só as atualizações interessam
+                    found_updates = reconcile(sheet_table, found, key_column, compared_columns, engine)['updates']
+                    change_set['updates'].extend(found_updates)
+                    if history_rows is not None:
+                        history_rows.extend(found)
+                    found_keys = {issue['key'] for issue in found}
+                    change_set['orphans'] = [orphan for orphan in change_set['orphans'] if orphan['key'] not in found_keys]
+                    print(f"Verificação das órfãs: {len(found_keys)} encontradas no Jira ({len(found_updates)} células desatualizadas), "
+                          f"{len(missing)} não encontradas.")
+
+        for update in change_set['updates']:
+            print(f"    -> UPDATE: Chave {update['key']} ({update['column']}: '{update['old']}'->'{update['new']}')")
+
+        # Tarefas novas pela chave (existem no Jira, mas não na Planilha). O job pode reconhecer algumas
+        # delas em linhas que já existem (ex.: pelo Resumo, ver automacaosheets/main.py), que viram atualizações
+        if job['insert_matcher'] is not None and change_set['inserts']:
+            change_set['inserts'] = job['insert_matcher'](job, sheet_table, change_set, compared_columns)
+        # As novas linhas seguem a ordem das colunas do cabeçalho da planilha
+        build_row = mapping.row_builder(sheet_header)
+        for issue in change_set['inserts']:
+            new_rows_for_sheets_api.append(build_row(issue))
+            print(f"    -> NOVO: Chave {issue['key']} será adicionada (status: '{issue.get('status')}')")
+
+        # Células vizinhas (ex.: Chave e Estado da mesma linha) viram um único intervalo no batchUpdate
+        updates_for_sheets_api = plan_sheet_writes(change_set['updates'], column_indexes, sheet_name)
+
+        # Tarefas que estão na planilha mas não foram encontradas no Jira ficam em change_set['orphans'].
+        # Por padrão, elas são ignoradas, mas você pode adicionar lógica para, por exemplo, marcar como 'Removida'.
+        if change_set['orphans']:
+            print(f"   {len(change_set['orphans'])} tarefa(s) estão na planilha mas não vieram do Jira (ignoradas).")
+
+        plan = build_sync_plan(
+            job, sheet_header, change_set['updates'], updates_for_sheets_api, new_rows_for_sheets_api, newest, save_watermark
+        )
+        if plan_only:
+            print(f"\nModo --plan-only: {describe_sync_plan(plan)}. Nada foi gravado na planilha.")
+            metrics.status = 'ok'
+            return
+
+        # --- D. Executar Atualizações e Inserções na Planilha Google ---
+        print("\nExecutando ações na Planilha Google...")
+        if updates_for_sheets_api:
+            print(f"Enviando {len(change_set['updates'])} atualizações de dados em {len(updates_for_sheets_api)} intervalos...")
+        else:
+            print("Nenhuma atualização de dados necessária.")
+        if new_rows_for_sheets_api:
+            print(f"Adicionando {len(new_rows_for_sheets_api)} novas tarefas...")
+        else:
+            print("Nenhuma nova tarefa para adicionar.")
+        # O plano vai para o diário antes da primeira escrita; cada lote gravado fica registrado nele
+        journal.save(plan)
+        writes_ok, appended = apply_sync_plan(sheets_service, plan, journal, write_merger=write_merger)
+
+        if state_store is not None:
+            # O estado local passa a refletir o que foi gravado; se algo falhou (ou as novas linhas foram em
+            # vários appends), a próxima execução relê a planilha
+            if writes_ok and len(appended) <= 1:
+                rows, append_result = appended[0] if appended else ([], None)
+                state_store.record_writes(
+                    spreadsheet_id, sheet_name, sheet_header, sheet_table, key_column,
+                    change_set['updates'], rows, append_result
+                )
+            else:
+                state_store.invalidate(spreadsheet_id, sheet_name)
+
+        if not writes_ok:
+            print("--- Automação concluída com erros na escrita. A marca d'água não foi avançada. ---")
+            if journal.path is not None:
+                print("Os lotes que faltaram ficam no diário e serão gravados na próxima execução, sem nova busca no Jira.")
+            metrics.status = 'write_error'
+            return
+        journal.clear()
+        metrics.count('rows.updated', len({update['row'] for update in change_set['updates']}))
+        if history_rows is not None:
+            # Todas as tarefas buscadas vão para o histórico, que só grava as que mudaram desde a última versão
+            # (o status do Jira pode mudar sem mudar a célula, ex.: 'To Do' -> 'In Progress' continua 'Não Concluído')
+            record_status_history(job, history_rows)
+
+        # Só avança a marca d'água depois que tudo foi gravado na planilha
+        if save_watermark:
+            save_sync_watermark(job['state_key'], newest)
+
+        metrics.status = 'ok'
+        print("--- Automação concluída com sucesso! ---")
+    finally:
+        # Qualquer saída, inclusive por exceção (ex.: erro de rede na leitura da planilha ou do SQLite do
+        # estado local), interrompe a busca no Jira, que não pode continuar depois da execução, e fecha o
+        # estado local, para não deixar uma conexão SQLite aberta a cada execução do modo contínuo
+        stop_jira_fetch()
+        if state_store is not None:
+            state_store.close()
+
+# --- Modo Contínuo (daemon) ---
+
+def run_daemon(job, interval=DAEMON_INTERVALO_SEGUNDOS, jitter=DAEMON_JITTER_SEGUNDOS, sync_lock=None, jobs=None, **run_options):
+    """
+    Executa run_automation (do job) em intervalos regulares no mesmo processo, reaproveitando a sessão do Jira,
+    as credenciais e o serviço do Google Sheets entre as execuções (em vez de pagar a inicialização
+    a cada chamada do cron). As execuções são sequenciais, então nunca se sobrepõem; se uma demorar
+    mais que o intervalo, a próxima começa logo em seguida.
+    SIGINT/SIGTERM encerram depois da execução em andamento; um segundo sinal encerra na hora.
+    sync_lock, se informado, é mantido durante cada execução (ver run_webhook_server).
+    Com jobs, cada execução roda todos eles (ver run_jobs).
+    """
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        if stop.is_set():
+            raise SystemExit(1)
+        print(f"\nSinal {signal.Signals(signum).name} recebido. Encerrando após a execução atual...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    print(f"Modo contínuo: sincronizando a cada {interval}s (±{jitter}s). Ctrl+C para encerrar.")
+    while not stop.is_set():
+        started = time.monotonic()
+        try:
+            with sync_lock or nullcontext():
+                if jobs:
+                    run_jobs(jobs, **run_options)
+                else:
+                    run_automation(job, **run_options)
+        except Exception as e:
+            # Um erro inesperado numa execução não derruba o processo; a próxima tenta de novo
+            print(f"Erro inesperado na sincronização: {e}")
+        # --full-resync vale só para a primeira execução
+        run_options['full_resync'] = False
+
+        elapsed = time.monotonic() - started
+        wait = max(0.0, interval + random.uniform(-jitter, jitter) - elapsed)
+        if wait == 0:
+            print(f"A sincronização levou {elapsed:.0f}s, mais que o intervalo de {interval}s. Iniciando a próxima.")
+        else:
+            print(f"Próxima sincronização em {wait:.0f}s.")
+        stop.wait(wait)
+
+    if _jira_session is not None:
+        _jira_session.close()
+    print("Modo contínuo encerrado.")
+
+# --- Receptor de Webhooks do Jira ---
+
+class WebhookBatcher:
+    """
+    Junta as tarefas recebidas por webhook durante uma janela curta (debounce) e as envia
+    à planilha de uma vez, como um único lote. Se a mesma tarefa chegar várias vezes na janela,
+    vale a versão mais recente (maior 'updated').
+    """
+
+    def __init__(self, flush_fn, debounce_seconds=WEBHOOK_DEBOUNCE_SEGUNDOS, sync_lock=None):
+        self.flush_fn = flush_fn
+        self.debounce_seconds = debounce_seconds
+        self.sync_lock = sync_lock or threading.Lock()
+        self._pending = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, issue):
+        with self._lock:
+            current = self._pending.get(issue['key'])
+            if current is None or (issue.updated or '') >= (current.updated or ''):
+                self._pending[issue['key']] = issue
+            if self._timer is None:
+                # A janela começa no primeiro evento; os seguintes entram no mesmo lote
+                self._timer = threading.Timer(self.debounce_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Envia o lote pendente (se houver). Nunca roda junto com a varredura periódica."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            issues, self._pending = list(self._pending.values()), {}
+        if not issues:
+            return
+        print(f"\nWebhook: aplicando lote com {len(issues)} tarefa(s) alterada(s).")
+        with self.sync_lock:
+            try:
+                self.flush_fn(issues)
+            except Exception as e:
+                print(f"Erro inesperado ao aplicar o lote do webhook: {e}")
+
+class JiraWebhookHandler(BaseHTTPRequestHandler):
+    """Recebe os webhooks 'jira:issue_created' e 'jira:issue_updated' e repassa a tarefa ao WebhookBatcher do servidor."""
+
+    EVENTS = {'jira:issue_created', 'jira:issue_updated'}
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if WEBHOOK_SEGREDO:
+            # Jira assina o corpo com HMAC-SHA256 quando o webhook tem um segredo configurado
+            expected = 'sha256=' + hmac.new(WEBHOOK_SEGREDO.encode('utf-8'), body, hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, self.headers.get('X-Hub-Signature', '')):
+                self._reply(401)
+                return
+        try:
+            payload = json.loads(body)
+            event = payload.get('webhookEvent')
+            issue = payload.get('issue')
+        except (ValueError, AttributeError):
+            self._reply(400)
+            return
+        if event in self.EVENTS and isinstance(issue, dict) and issue.get('key') and isinstance(issue.get('fields'), dict):
+            self.server.batcher.add(compact_issue(issue, self.server.job))
+        self._reply(204)
+
+    def _reply(self, status):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        # Sem log por requisição; os lotes aplicados já aparecem na saída
+        pass
+
+def _is_loopback(host):
+    """Se o endereço só aceita conexões da própria máquina (127.0.0.1, ::1, localhost)."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def run_webhook_server(job, host=WEBHOOK_HOST, port=WEBHOOK_PORTA, debounce_seconds=WEBHOOK_DEBOUNCE_SEGUNDOS,
+                       interval=DAEMON_INTERVALO_SEGUNDOS, jitter=DAEMON_JITTER_SEGUNDOS, **run_options):
+    """
+    Sobe o receptor de webhooks e mantém a sincronização por JQL (run_daemon) como varredura periódica
+    de consistência. Os lotes do webhook e a varredura nunca rodam ao mesmo tempo.
+    O webhook deve ser cadastrado no Jira com a mesma JQL usada em run_automation, apontando para
+    http://<host>:<porta>/.
+    Sem WEBHOOK_SEGREDO, qualquer um que alcance o receptor pode injetar tarefas na planilha: por isso
+    ele só escuta em um endereço local (ex.: atrás de um proxy que valide as requisições).
+    """
+    if not WEBHOOK_SEGREDO:
+        if not _is_loopback(host):
+            print(f"Erro: o receptor de webhooks não escuta em {host} sem WEBHOOK_SEGREDO. "
+                  "Defina WEBHOOK_SEGREDO no .env (o mesmo segredo do webhook no Jira) ou use WEBHOOK_HOST=127.0.0.1.")
+            return None
+        print("Aviso: WEBHOOK_SEGREDO não definido; as requisições ao receptor de webhooks não são autenticadas.")
+    sync_lock = threading.Lock()
+    local_state = run_options.get('local_state', SHEETS_ESTADO_LOCAL)
+    engine = run_options.get('engine', SYNC_MOTOR)
+    batcher = WebhookBatcher(
+        lambda issues: run_automation(job, local_state=local_state, issues=issues, engine=engine), debounce_seconds, sync_lock
+    )
+    server = ThreadingHTTPServer((host, port), JiraWebhookHandler)
+    server.batcher = batcher
+    server.job = job
+    threading.Thread(target=server.serve_forever, name='webhook', daemon=True).start()
+    print(f"Receptor de webhooks do Jira ouvindo em http://{host}:{server.server_port}/ (lotes a cada {debounce_seconds}s).")
+    try:
+        run_daemon(job, interval, jitter, sync_lock=sync_lock, **run_options)
+    finally:
+        server.shutdown()
+        server.server_close()
+        batcher.flush()  # Não perde o que chegou durante o encerramento
+
+def parse_args():
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description="Sincroniza o status das tarefas do Jira com a Planilha Google.")
+    parser.add_argument('--incremental', action='store_true', default=SYNC_INCREMENTAL,
+                        help="Busca apenas as tarefas atualizadas desde a última sincronização (ou SYNC_INCREMENTAL=true no .env).")
+    parser.add_argument('--full-resync', action='store_true',
+                        help="Ignora a marca d'água salva e sincroniza todas as tarefas da JQL.")
+    parser.add_argument('--streaming', action='store_true', default=SYNC_STREAMING,
+                        help="Compara cada página do Jira assim que chega, sem guardar todas as issues (ou SYNC_STREAMING=true no .env).")
+    parser.add_argument('--local-state', action='store_true', default=SHEETS_ESTADO_LOCAL,
+                        help="Usa a cópia local (SQLite) da planilha quando a coluna de chaves não mudou (ou SHEETS_ESTADO_LOCAL=true no .env).")
+    parser.add_argument('--engine', choices=['pandas', 'dict'], default=SYNC_MOTOR,
+                        help="Motor da comparação: pandas ou dict (sem Pandas, partida mais rápida) (ou SYNC_MOTOR no .env).")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Fica em execução e sincroniza em intervalos regulares, reaproveitando as conexões.")
+    parser.add_argument('--interval', type=float, default=DAEMON_INTERVALO_SEGUNDOS,
+                        help="Segundos entre sincronizações no modo --daemon (ou DAEMON_INTERVALO_SEGUNDOS no .env).")
+    parser.add_argument('--jitter', type=float, default=DAEMON_JITTER_SEGUNDOS,
+                        help="Variação aleatória, em segundos, aplicada ao intervalo (ou DAEMON_JITTER_SEGUNDOS no .env).")
+    parser.add_argument('--webhook', action='store_true',
+                        help="Recebe webhooks do Jira e aplica as mudanças em lotes; a busca por JQL vira uma varredura a cada --interval.")
+    parser.add_argument('--webhook-port', type=int, default=WEBHOOK_PORTA,
+                        help="Porta do receptor de webhooks (ou WEBHOOK_PORTA no .env).")
+    parser.add_argument('--jobs', default=SYNC_JOBS_ARQUIVO or None, metavar='ARQUIVO',
+                        help="Arquivo JSON com vários jobs (JQL → planilha/aba) executados ao mesmo tempo (ou SYNC_JOBS_ARQUIVO no .env).")
+    parser.add_argument('--verify-orphans', action='store_true', default=SYNC_VERIFICAR_ORFAS,
+                        help="Busca no Jira, pela chave, as linhas da planilha que não vieram da JQL e as atualiza (ou SYNC_VERIFICAR_ORFAS=true no .env).")
+    parser.add_argument('--plan-only', action='store_true',
+                        help="Só calcula e mostra as mudanças (atualizações e novas linhas), sem gravar nada na planilha.")
+    return parser.parse_args()
+
+def main(default_job):
+    """Executa a automação pela linha de comando (ver parse_args), com o job padrão do script."""
+    args = parse_args()
+    run_options = dict(incremental=args.incremental, full_resync=args.full_resync, streaming=args.streaming, local_state=args.local_state,
+                       engine=args.engine, plan_only=args.plan_only, verify_orphans=args.verify_orphans)
+    if args.plan_only and (args.daemon or args.webhook):
+        print("O modo --plan-only não pode ser combinado com --daemon ou --webhook.")
+        raise SystemExit(1)
+    jobs = None
+    if args.jobs:
+        jobs = load_sync_jobs(args.jobs, default_job)
+        if jobs is None:
+            raise SystemExit(1)
+    if args.webhook:
+        if jobs:
+            # O webhook não sabe a qual JQL cada evento pertence; ele alimenta só o job padrão do .env
+            print("O modo --webhook não pode ser combinado com --jobs.")
+            raise SystemExit(1)
+        run_webhook_server(default_job, port=args.webhook_port, interval=args.interval, jitter=args.jitter, **run_options)
+    elif args.daemon:
+        run_daemon(default_job, args.interval, args.jitter, jobs=jobs, **run_options)
+    elif jobs:
+        run_jobs(jobs, **run_options)
+    else:
+        run_automation(default_job, **run_options)
@@ -0,0 +1,697 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import tracemalloc
+import subprocess
+import contextlib
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse, parse_qs
+from urllib.request import urlopen
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Benchmark da automação com backends falsos e locais: um servidor HTTP que imita a busca do Jira
+# (/rest/api/3/search, com paginação, latência e HTTP 429 configuráveis) e um Google Sheets em memória.
+# Cada cenário roda num subprocesso separado, para que o pico de memória (RSS) seja só dele,
+# e o Jira falso roda em outro, para não disputar CPU com o script medido.
+#
+#   python benchmark.py                                   # cenários de 1k, 10k e 100k em main.py
+#   python benchmark.py --script automacaosheets/main.py --sizes 1000,10000
+#   python benchmark.py --latency 0.05 --throttle 0.01 --output antes.json
+#   python benchmark.py --env JIRA_FATIAMENTO=updated --env JIRA_FATIA_TAMANHO=20000   # busca fatiada
+#   python benchmark.py --compare antes.json              # mostra a diferença em relação a outra execução
+
+BENCH_PROJECT = 'BENCH'
+BENCH_JQL = f'project = "{BENCH_PROJECT}" ORDER BY updated DESC'
+BENCH_SHEET = 'Aba'
+BENCH_SPREADSHEET = 'benchmark'
+JIRA_MAX_PAGE = 100 # O Jira Cloud limita maxResults a 100 por página em /search (startAt)
+# Em /search/jql (nextPageToken) a página é maior quanto menos campos são pedidos: só a chave, até 5000;
+# até 10 campos, até 1000 (aproximação do Jira falso); mais campos que isso, JIRA_MAX_PAGE
+JIRA_MAX_TOKEN_PAGE = 5000
+JIRA_MAX_TOKEN_PAGE_FIELDS = 1000
+BENCH_FIRST_UPDATED = datetime(2024, 1, 1, tzinfo=timezone.utc) # A issue N foi atualizada N minutos depois disto
+BENCH_FIRST_ID = 10000
+
+# Colunas da planilha de cada script (mesmos nomes passados via variáveis de ambiente)
+SCRIPT_HEADERS = {
+    'main.py': ['Chave', 'Resumo', 'Estado', 'Responsável', 'Projeto'],
+    'automacaosheets/main.py': ['Chave', 'Estado', 'Resumo'],
+}
+
+# --- Dados Sintéticos ---
+
+BENCH_SITE = 'https://benchmark.atlassian.net' # Só aparece nas URLs dos objetos, como no JSON do Jira Cloud
+
+def _fake_avatar_urls(kind, identifier):
+    return {size: f'{BENCH_SITE}/rest/api/3/universal_avatar/view/type/{kind}/avatar/{identifier}?size={size.split("x")[0]}'
+            for size in ('48x48', '24x24', '16x16', '32x32')}
+
+def fake_issue_fields(index):
+    """
+    Campos da issue de número index (determinísticos, para que a planilha possa ser montada igual).
+    status, assignee e project vêm com os mesmos objetos aninhados do Jira Cloud (URLs, avatares,
+    categoria do status), para que a memória das issues lidas seja parecida com a de uma busca real.
+    """
+    updated = BENCH_FIRST_UPDATED + timedelta(minutes=index)
+    done = index % 3 == 0
+    person = index % 50
+    status_id, category = (10002, (3, 'done', 'green', 'Done')) if done else (10001, (4, 'indeterminate', 'yellow', 'In Progress'))
+    return {
+        'summary': f'Tarefa de benchmark {index}',
+        'status': {
+            'self': f'{BENCH_SITE}/rest/api/3/status/{status_id}', 'description': '', 'iconUrl': f'{BENCH_SITE}/',
+            'name': 'Done' if done else 'In Progress', 'id': str(status_id),
+            'statusCategory': {'self': f'{BENCH_SITE}/rest/api/3/statuscategory/{category[0]}', 'id': category[0],
+                               'key': category[1], 'colorName': category[2], 'name': category[3]},
+        },
+        'assignee': {
+            'self': f'{BENCH_SITE}/rest/api/3/user?accountId=5b10ac8d82e05b22cc7d{person:04d}',
+            'accountId': f'5b10ac8d82e05b22cc7d{person:04d}', 'emailAddress': f'pessoa{person}@example.com',
+            'avatarUrls': _fake_avatar_urls('user', f'5b10ac8d82e05b22cc7d{person:04d}'),
+            'displayName': f'Pessoa {person}', 'active': True, 'timeZone': 'America/Sao_Paulo', 'accountType': 'atlassian',
+        },
+        'project': {
+            'self': f'{BENCH_SITE}/rest/api/3/project/10000', 'id': '10000', 'key': BENCH_PROJECT, 'name': BENCH_PROJECT,
+            'projectTypeKey': 'software', 'simplified': False, 'avatarUrls': _fake_avatar_urls('project', 10400),
+        },
+        'labels': ['automacao-status-sheets'],
+        'resolutiondate': updated.strftime('%Y-%m-%dT%H:%M:%S.000+0000') if done else None,
+        'updated': updated.strftime('%Y-%m-%dT%H:%M:%S.000+0000'),
+    }
+
+def build_sheet_rows(size, header):
+    """
+    Planilha correspondente às issues: cerca de 5% das tarefas faltam (viram inserções)
+    e 10% estão com o status desatualizado (viram atualizações).
+    """
+    rows = [list(header)]
+    for index in range(size):
+        if index % 20 == 19:
+            continue
+        fields = fake_issue_fields(index)
+        done = fields['status']['name'] == 'Done'
+        if index % 10 == 0:
+            done = not done
+        values = {
+            'Chave': f'{BENCH_PROJECT}-{index}',
+            'Resumo': fields['summary'],
+            'Estado': 'Concluído' if done else 'Não Concluído',
+            'Responsável': fields['assignee']['displayName'],
+            'Projeto': BENCH_PROJECT,
+        }
+        rows.append([values[column] for column in header])
+    return rows
+
+# --- Jira Falso ---
+
+def _jql_index_range(jql, size):
+    """Faixa [início, fim) dos números das issues que passam pelas cláusulas de updated e de id da JQL."""
+    first, end = 0, size
+    for field, operator, value in re.findall(r'\b(updated|id)\s*(>=|<)\s*("[^"]*"|\d+)', jql):
+        if field == 'updated':
+            moment = datetime.strptime(value.strip('"'), '%Y/%m/%d %H:%M').replace(tzinfo=timezone.utc)
+            index = int((moment - BENCH_FIRST_UPDATED).total_seconds() // 60)
+        else:
+            index = int(value) - BENCH_FIRST_ID
+        if operator == '>=':
+            first = max(first, index)
+        else:
+            end = min(end, index)
+    return first, max(first, end)
+
+class FakeJiraHandler(BaseHTTPRequestHandler):
+    """
+    Responde /rest/api/3/search (paginação por startAt) e /rest/api/3/search/jql (paginação por
+    nextPageToken) com issues sintéticas, paginadas como o Jira, e POST /rest/api/3/search/approximate-count.
+    Da JQL, só entende as cláusulas updated >= / < "aaaa/mm/dd hh:mm", id >= / < N e o sentido do ORDER BY.
+    """
+
+    protocol_version = 'HTTP/1.1' # Mantém as conexões abertas (keep-alive), como o Jira real
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        if url.path == '/__stats':
+            with server.lock:
+                body = json.dumps(server.stats).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if url.path not in ('/rest/api/3/search', '/rest/api/3/search/jql'):
+            self._send(404, b'{}')
+            return
+        if self._throttled():
+            return
+
+        params = parse_qs(url.query)
+        requested = params.get('fields', [''])[0]
+        wanted = [field for field in requested.split(',') if field and field not in ('key', 'id')]
+        token_paging = url.path.endswith('/jql')
+        if token_paging:
+            # O token é opaco para quem chama; aqui ele só carrega o offset da próxima página
+            token = params.get('nextPageToken', [''])[0]
+            start_at = int(token[len('offset-'):]) if token.startswith('offset-') else 0
+            if not wanted:
+                page_cap = JIRA_MAX_TOKEN_PAGE
+            else:
+                page_cap = JIRA_MAX_TOKEN_PAGE_FIELDS if len(wanted) <= 10 else JIRA_MAX_PAGE
+        else:
+            start_at = int(params.get('startAt', ['0'])[0])
+            page_cap = JIRA_MAX_PAGE
+        max_results = min(int(params.get('maxResults', ['50'])[0]), page_cap)
+        first, end = _jql_index_range(params.get('jql', [''])[0], server.size)
+        descending = re.search(r'ORDER\s+BY\s+\w+\s+DESC', params.get('jql', [''])[0], re.IGNORECASE) is not None
+        total = end - first
+        issues = []
+        for position in range(start_at, min(start_at + max_results, total)):
+            index = end - 1 - position if descending else first + position
+            fields = fake_issue_fields(index)
+            if wanted:
+                fields = {name: fields.get(name) for name in wanted}
+            issue_id = str(BENCH_FIRST_ID + index)
+            issues.append({'expand': 'operations,versionedRepresentations,editmeta,changelog,renderedFields', 'id': issue_id,
+                           'self': f'{BENCH_SITE}/rest/api/3/issue/{issue_id}', 'key': f'{BENCH_PROJECT}-{index}', 'fields': fields})
+        if token_paging:
+            next_offset = start_at + max_results
+            page = {'issues': issues, 'isLast': next_offset >= total}
+            if not page['isLast']:
+                page['nextPageToken'] = f'offset-{next_offset}'
+        else:
+            page = {'startAt': start_at, 'maxResults': max_results, 'total': total, 'issues': issues}
+        body = json.dumps(page).encode('utf-8')
+        self._send(200, body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if urlparse(self.path).path != '/rest/api/3/search/approximate-count':
+            self._send(404, b'{}')
+            return
+        if self._throttled():
+            return
+        first, end = _jql_index_range(json.loads(body or b'{}').get('jql', ''), self.server.size)
+        self._send(200, json.dumps({'count': end - first}).encode('utf-8'))
+
+    def _throttled(self):
+        """Aplica a latência e, na fração configurada das requisições, responde HTTP 429."""
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.stats['calls'] += 1
+            throttled = server.random.random() < server.throttle
+        if throttled:
+            with server.lock:
+                server.stats['throttled'] += 1
+            self._send(429, b'{"errorMessages": ["Rate limit exceeded"]}', {'Retry-After': str(server.retry_after)})
+        return throttled
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.server.lock:
+            self.server.stats['bytes'] += len(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_fake_jira(size, latency=0.0, throttle=0.0, retry_after=1, seed=42):
+    """Sobe o Jira falso numa porta livre e retorna o servidor (estatísticas em server.stats)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeJiraHandler)
+    server.daemon_threads = True
+    server.size = size
+    server.latency = latency
+    server.throttle = throttle
+    server.retry_after = retry_after
+    server.random = random.Random(seed)
+    server.lock = threading.Lock()
+    server.stats = {'calls': 0, 'throttled': 0, 'bytes': 0}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class FakeJiraProcess:
+    """
+    Roda o Jira falso num subprocesso (python benchmark.py --serve-jira), para que a CPU e a memória
+    gastas gerando as respostas não se misturem com as do script medido.
+    """
+
+    def __init__(self, size, latency=0.0, throttle=0.0, retry_after=1):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve-jira', '--size', str(size), '--latency', str(latency),
+             '--throttle', str(throttle), '--retry-after', str(retry_after)],
+            # O stderr do Jira falso não é lido por ninguém; num pipe, ele poderia encher e travar o servidor.
+            # O stdin fica aberto só para o Jira falso perceber quando este processo morre (ver --serve-jira)
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        )
+        port = int(self.process.stdout.readline())
+        self.url = f'http://127.0.0.1:{port}'
+
+    def stats(self):
+        with urlopen(f'{self.url}/__stats') as response:
+            return json.load(response)
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait()
+
+# --- Google Sheets Falso (em memória) ---
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+def _parse_a1(a1_range):
+    """'Aba!B2:C10' -> (coluna inicial, linha inicial, coluna final, linha final), 0-based; None = sem limite."""
+    if '!' not in a1_range:
+        # Só o nome da aba: a aba inteira
+        return None, None, None, None
+    cells = a1_range.split('!')[-1].split(':')
+    bounds = []
+    for cell in cells:
+        match = re.match(r'^([A-Z]*)(\d*)$', cell)
+        bounds.append((_column_index(match.group(1)) if match.group(1) else None,
+                       int(match.group(2)) - 1 if match.group(2) else None))
+    start = bounds[0]
+    end = bounds[1] if len(bounds) > 1 else bounds[0]
+    return start[0], start[1], end[0], end[1]
+
+class FakeRequest:
+    """Imita o objeto retornado pelos métodos do googleapiclient: o trabalho acontece em execute()."""
+
+    def __init__(self, sheets, method, body, run):
+        self.sheets, self.method, self.body, self.run = sheets, method, body, run
+
+    def execute(self, **kwargs):
+        if self.sheets.latency:
+            time.sleep(self.sheets.latency)
+        response = self.run()
+        with self.sheets.lock:
+            self.sheets.stats['calls'][self.method] = self.sheets.stats['calls'].get(self.method, 0) + 1
+            self.sheets.stats['bytes'] += len(json.dumps(self.body)) + len(json.dumps(response))
+        return response
+
+class FakeSheetsService:
+    """
+    Implementa service.spreadsheets().values().get/batchGet/batchUpdate/append sobre uma grade em memória,
+    e service.spreadsheets().get/batchUpdate para o tamanho da aba (gridProperties).
+    """
+
+    def __init__(self, rows, latency=0.0):
+        self.rows = rows
+        self.latency = latency
+        self.grid = {'rowCount': max(1000, len(rows)), 'columnCount': 26}
+        self.lock = threading.Lock()
+        self.stats = {'calls': {}, 'bytes': 0}
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, a1_range, major_dimension='ROWS'):
+        first_col, first_row, last_col, last_row = _parse_a1(a1_range)
+        first_row = first_row or 0
+        last_row = len(self.rows) - 1 if last_row is None else min(last_row, len(self.rows) - 1)
+        first_col = first_col or 0
+        selected = []
+        for row in self.rows[first_row:last_row + 1]:
+            end = len(row) if last_col is None else last_col + 1
+            selected.append(row[first_col:end])
+        if major_dimension == 'COLUMNS':
+            width = max((len(row) for row in selected), default=0)
+            values = [[row[i] if i < len(row) else '' for row in selected] for i in range(width)]
+        else:
+            values = selected
+        # A API omite as células vazias do final de cada linha/coluna e as linhas/colunas vazias do final
+        values = [list(line) for line in values]
+        for line in values:
+            while line and line[-1] == '':
+                line.pop()
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _write(self, a1_range, values):
+        first_col, first_row, _, _ = _parse_a1(a1_range)
+        for offset, line in enumerate(values):
+            row_index = first_row + offset
+            while len(self.rows) <= row_index:
+                self.rows.append([])
+            row = self.rows[row_index]
+            if len(row) < first_col + len(line):
+                row.extend([''] * (first_col + len(line) - len(row)))
+            row[first_col:first_col + len(line)] = line
+
+    def get(self, spreadsheetId=None, range=None, **kwargs):
+        if range is None:
+            # spreadsheets().get: só as propriedades da aba
+            def properties():
+                return {'sheets': [{'properties': {'sheetId': 0, 'title': BENCH_SHEET, 'gridProperties': dict(self.grid)}}]}
+            return FakeRequest(self, 'properties', {}, properties)
+
+        def run():
+            values = self._read(range)
+            return {'range': range, 'values': values} if values else {'range': range}
+        return FakeRequest(self, 'get', {'range': range}, run)
+
+    def batchGet(self, spreadsheetId=None, ranges=(), majorDimension='ROWS', **kwargs):
+        def run():
+            return {'valueRanges': [{'range': a1_range, 'values': self._read(a1_range, majorDimension)} for a1_range in ranges]}
+        return FakeRequest(self, 'batchGet', {'ranges': list(ranges)}, run)
+
+    def batchUpdate(self, spreadsheetId=None, body=None, **kwargs):
+        def run():
+            with self.lock:
+                for value_range in body.get('data', []):
+                    self._write(value_range['range'], value_range['values'])
+                # spreadsheets().batchUpdate: só o redimensionamento da aba
+                for request in body.get('requests', []):
+                    self.grid.update(request['updateSheetProperties']['properties']['gridProperties'])
+            cells = sum(len(line) for value_range in body.get('data', []) for line in value_range['values'])
+            return {'totalUpdatedCells': cells, 'totalUpdatedRanges': len(body.get('data', []))}
+        return FakeRequest(self, 'batchUpdate', body, run)
+
+    def append(self, spreadsheetId=None, range=None, body=None, **kwargs):
+        def run():
+            with self.lock:
+                last = len(self.rows)
+                while last and not any(value != '' for value in self.rows[last - 1]):
+                    last -= 1
+                sheet_name = range.split('!')[0]
+                values = body['values']
+                self._write(f'{sheet_name}!A{last + 1}', values)
+                width = max((len(line) for line in values), default=1)
+                end_column = ''
+                number = width
+                while number > 0:
+                    number, remainder = divmod(number - 1, 26)
+                    end_column = chr(ord('A') + remainder) + end_column
+            return {'updates': {'updatedRange': f'{sheet_name}!A{last + 1}:{end_column}{last + len(values)}',
+                                'updatedRows': len(values)}}
+        return FakeRequest(self, 'append', body, run)
+
+# --- Execução de um Cenário (subprocesso) ---
+
+def _peak_rss_kb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak # macOS informa em bytes, Linux em KB
+
+def _same_change_set(pandas_change_set, dict_change_set):
+    """Compara os change sets dos dois motores; o Pandas devolve NaN onde o motor dict mantém None."""
+    def normalize(change_set):
+        inserts = [{name: (None if value != value else value) for name, value in getattr(issue, 'to_dict', lambda: issue)().items()}
+                   for issue in change_set['inserts']]
+        return {**change_set, 'inserts': inserts}
+    return normalize(pandas_change_set) == normalize(dict_change_set)
+
+def run_scenario(script, size, latency, throttle, retry_after, sheets_latency, extra_env):
+    """Roda um cenário neste processo e retorna as métricas (chamado pelo subprocesso --worker)."""
+    jira = FakeJiraProcess(size, latency, throttle, retry_after)
+    try:
+        return _measure_scenario(jira, script, size, sheets_latency, extra_env)
+    finally:
+        # Mesmo se o script medido falhar, o Jira falso não pode ficar rodando depois do worker
+        jira.stop()
+
+def _measure_scenario(jira, script, size, sheets_latency, extra_env):
+    """Corpo de run_scenario, com o Jira falso já no ar."""
+    state_dir = tempfile.mkdtemp(prefix='benchmark-')
+    os.environ.update({
+        'JIRA_URL': jira.url,
+        'JIRA_EMAIL': 'benchmark@example.com',
+        'JIRA_API_TOKEN': 'benchmark',
+        'JIRA_JQL': BENCH_JQL,
+        'JIRA_STATUS_CONCLUIDO_LIST': 'Done',
+        'GOOGLE_SHEETS_ID': BENCH_SPREADSHEET,
+        'GOOGLE_SHEETS_ABA_NOME': BENCH_SHEET,
+        'GOOGLE_SHEETS_COLUNA_JIRA_KEY': 'Chave',
+        'GOOGLE_SHEETS_COLUNA_STATUS': 'Estado',
+        'GOOGLE_SHEETS_COLUNA_NOME_TAREFA': 'Resumo',
+        'SYNC_ESTADO_ARQUIVO': os.path.join(state_dir, 'sync_state.json'),
+        'SHEETS_ESTADO_ARQUIVO': os.path.join(state_dir, 'sheet_state.db'),
+        'HISTORICO_STATUS_ARQUIVO': os.path.join(state_dir, 'status_history.db'),
+        'JIRA_FATIAS_DIRETORIO': os.path.join(state_dir, 'jira_fatias'),
+        'SYNC_DIARIO_DIRETORIO': os.path.join(state_dir, 'sync_diario'),
+        'METRICAS_RELATORIO_JSON': os.path.join(state_dir, 'sync_report.json'),
+        'JIRA_REQ_POR_SEGUNDO': '0',
+        'SHEETS_REQ_POR_SEGUNDO': '0',
+    })
+    os.environ.update(extra_env)
+
+    started = time.perf_counter()
+    spec = importlib.util.spec_from_file_location('automation_under_test', script)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    import_seconds = time.perf_counter() - started
+    rss_after_import_kb = _peak_rss_kb()
+    # O script só define o job padrão; a sincronização fica no motor compartilhado (sync_engine), onde o
+    # serviço do Sheets é trocado pelo falso. Versões antigas tinham tudo no próprio script
+    engine = sys.modules.get('sync_engine', module)
+    job = module.DEFAULT_JOB
+
+    header = SCRIPT_HEADERS.get(os.path.relpath(os.path.abspath(script), os.path.dirname(os.path.abspath(__file__))).replace(os.sep, '/'),
+                                SCRIPT_HEADERS['main.py'])
+    sheets = FakeSheetsService(build_sheet_rows(size, header), sheets_latency)
+    engine.get_google_sheets_service = lambda: sheets
+    expected_rows = len(sheets.rows) + sum(1 for index in range(size) if index % 20 == 19)
+
+    # Fase 1: só a busca no Jira
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        issues = engine.get_jira_issues(BENCH_JQL, mapping=job['mapping'])
+        fetch_seconds = time.perf_counter() - started
+    fetched = len(issues or [])
+
+    del issues
+    fetch_stats = jira.stats()
+
+    # Fase 2: a sincronização completa (busca + leitura da planilha + comparação + escrita)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        engine.run_automation(job=job)
+        sync_seconds = time.perf_counter() - started
+    total_stats = jira.stats()
+    sync_jira = {name: total_stats[name] - fetch_stats[name] for name in total_stats}
+    peak_rss_kb = _peak_rss_kb()
+
+    # Duração de cada fase, do relatório gravado pelo próprio script (versões sem métricas não o geram)
+    phases = {}
+    try:
+        with open(os.path.join(state_dir, 'sync_report.json'), encoding='utf-8') as f:
+            for span in next(iter(json.load(f).values()))['spans']:
+                phases[span['name']] = round(phases.get(span['name'], 0) + span['seconds'], 3)
+    except (OSError, ValueError, StopIteration, KeyError):
+        pass
+
+    # Fase 3: carga inicial numa planilha vazia (todas as issues viram linhas novas)
+    empty_sheets = FakeSheetsService([], sheets_latency)
+    engine.get_google_sheets_service = lambda: empty_sheets
+    for name in ('SYNC_ESTADO_ARQUIVO', 'SHEETS_ESTADO_ARQUIVO'):
+        try:
+            os.remove(os.environ[name])
+        except OSError:
+            pass
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        started = time.perf_counter()
+        engine.run_automation(job=job)
+        initial_seconds = time.perf_counter() - started
+
+    # Memória Python ocupada pelas tarefas buscadas (as IssueRecord que a sincronização compara), pelo
+    # tracemalloc. Roda depois das medições, porque o tracemalloc deixa tudo bem mais lento
+    tracemalloc.start()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        jira_rows = engine.get_jira_issues(BENCH_JQL, mapping=job['mapping']) or []
+    issues_bytes, fetch_peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Os dois motores de comparação (pandas e dict) precisam chegar ao mesmo change set;
+    # versões do script sem o motor dict não são verificadas. Roda depois das medições,
+    # para que importar o Pandas aqui não conte no pico de memória do motor dict
+    engines_match = None
+    if hasattr(engine, 'reconcile'):
+        compared = job['mapping'].updatable if 'mapping' in job else job['status_column']
+        compared_names = [column for _, column in compared] if 'mapping' in job else [compared]
+        table = engine.read_sheet_columns(FakeSheetsService(build_sheet_rows(size, header)), BENCH_SPREADSHEET, BENCH_SHEET,
+                                          header, [job['key_column']] + compared_names)
+        engines_match = _same_change_set(
+            engine.reconcile(table, jira_rows, job['key_column'], compared, 'pandas'),
+            engine.reconcile(table, jira_rows, job['key_column'], compared, 'dict')
+        )
+        del table
+    del jira_rows
+
+    return {
+        'size': size,
+        'engine': getattr(engine, 'SYNC_MOTOR', 'pandas'),
+        'import_seconds': round(import_seconds, 3),
+        'fetch': {
+            'seconds': round(fetch_seconds, 3),
+            'issues': fetched,
+            'jira_calls': fetch_stats['calls'],
+            'jira_throttled': fetch_stats['throttled'],
+            'jira_bytes': fetch_stats['bytes'],
+        },
+        'sync': {
+            'seconds': round(sync_seconds, 3),
+            'jira_calls': sync_jira['calls'],
+            'jira_throttled': sync_jira['throttled'],
+            'jira_bytes': sync_jira['bytes'],
+            'sheets_calls': sheets.stats['calls'],
+            'sheets_bytes': sheets.stats['bytes'],
+            'sheet_rows_ok': len(sheets.rows) == expected_rows,
+            'phases': phases,
+            'engines_match': engines_match,
+        },
+        'initial_load': {
+            'seconds': round(initial_seconds, 3),
+            'sheets_calls': empty_sheets.stats['calls'],
+            'sheets_bytes': empty_sheets.stats['bytes'],
+            'sheet_rows_ok': len(empty_sheets.rows) == size + 1,
+        },
+        'memory': {
+            'issues_bytes': issues_bytes,
+            'fetch_peak_bytes': fetch_peak_bytes,
+        },
+        'rss_after_import_kb': rss_after_import_kb,
+        'peak_rss_kb': peak_rss_kb,
+    }
+
+# --- Orquestração ---
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_results(results, baseline=None):
+    """Mostra uma tabela por cenário e, se houver, a variação em relação a outra execução."""
+    previous = {item['size']: item for item in (baseline or {}).get('scenarios', [])}
+    print(f"\n{'tamanho':>8} {'import (s)':>10} {'busca (s)':>10} {'sync (s)':>9} {'jira':>6} {'sheets':>7} {'MB jira':>8} {'MB sheets':>10} {'pico RSS MB':>12}")
+    for item in results['scenarios']:
+        if 'error' in item:
+            print(f"{item['size']:>8} ERRO: {item['error']}")
+            continue
+        line = (f"{item['size']:>8} {item['import_seconds']:>10.2f} {item['fetch']['seconds']:>10.2f} {item['sync']['seconds']:>9.2f} "
+                f"{item['sync']['jira_calls']:>6} {sum(item['sync']['sheets_calls'].values()):>7} "
+                f"{item['sync']['jira_bytes'] / 1e6:>8.1f} {item['sync']['sheets_bytes'] / 1e6:>10.1f} "
+                f"{item['peak_rss_kb'] / 1024:>12.0f}")
+        old = previous.get(item['size'])
+        if old and 'error' not in old:
+            def delta(new, before):
+                return f"{(new - before) / before * 100:+.0f}%" if before else "n/a"
+            line += (f"   vs {baseline.get('commit') or 'anterior'}: sync {delta(item['sync']['seconds'], old['sync']['seconds'])},"
+                     f" RSS {delta(item['peak_rss_kb'], old['peak_rss_kb'])}")
+        print(line)
+        if item['sync'].get('engines_match') is False:
+            print(f"{'':>8} ATENÇÃO: os motores pandas e dict geraram change sets diferentes.")
+        if item['sync'].get('phases'):
+            print(f"{'':>8} fases: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in item['sync']['phases'].items()))
+        if item.get('initial_load'):
+            initial = item['initial_load']
+            line = (f"{'':>8} carga inicial: {initial['seconds']:.2f}s, {sum(initial['sheets_calls'].values())} chamadas ao Sheets,"
+                    f" {initial['sheets_bytes'] / 1e6:.1f} MB" + ("" if initial['sheet_rows_ok'] else " (ATENÇÃO: linhas faltando)"))
+            if old and old.get('initial_load'):
+                line += f" (vs {delta(initial['seconds'], old['initial_load']['seconds'])})"
+            print(line)
+        if item.get('memory'):
+            memory = item['memory']
+            line = f"{'':>8} memória: issues {memory['issues_bytes'] / 1e6:.1f} MB, pico da busca {memory['fetch_peak_bytes'] / 1e6:.1f} MB"
+            if old and old.get('memory'):
+                line += f" (issues {delta(memory['issues_bytes'], old['memory']['issues_bytes'])})"
+            print(line)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark da automação Jira → Google Sheets com backends falsos.")
+    parser.add_argument('--script', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py'),
+                        help="Script a medir (main.py ou automacaosheets/main.py); por padrão, o main.py ao lado deste arquivo.")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="Quantidade de issues (e linhas da planilha) por cenário.")
+    parser.add_argument('--latency', type=float, default=0.01, help="Latência, em segundos, de cada requisição ao Jira falso.")
+    parser.add_argument('--sheets-latency', type=float, default=0.0, help="Latência, em segundos, de cada chamada ao Sheets falso.")
+    parser.add_argument('--throttle', type=float, default=0.0, help="Fração das requisições ao Jira respondidas com HTTP 429.")
+    parser.add_argument('--retry-after', type=int, default=1, help="Valor do cabeçalho Retry-After nas respostas 429.")
+    parser.add_argument('--env', action='append', default=[], metavar='NOME=VALOR',
+                        help="Variável de ambiente extra para o script (ex: --env SYNC_STREAMING=true). Pode repetir.")
+    parser.add_argument('--output', default='benchmark_results.json', help="Arquivo JSON onde os resultados são salvos.")
+    parser.add_argument('--compare', help="Arquivo JSON de uma execução anterior para comparar.")
+    parser.add_argument('--timeout', type=float, default=1800,
+                        help="Tempo máximo, em segundos, de cada cenário; o cenário que passar disso é registrado como erro.")
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--serve-jira', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    extra_env = dict(item.split('=', 1) for item in args.env)
+
+    if args.serve_jira:
+        server = start_fake_jira(args.size, args.latency, args.throttle, args.retry_after)
+        print(server.server_port, flush=True)
+        # Roda até o worker fechar o stdin: no stop() ou quando ele morre (ex.: morto pelo --timeout)
+        sys.stdin.read()
+        sys.exit(0)
+
+    if args.worker:
+        result = run_scenario(args.script, args.size, args.latency, args.throttle, args.retry_after, args.sheets_latency, extra_env)
+        print(json.dumps(result))
+        sys.exit(0)
+
+    results = {
+        'commit': git_commit(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'script': args.script,
+        'settings': {'latency': args.latency, 'sheets_latency': args.sheets_latency, 'throttle': args.throttle,
+                     'retry_after': args.retry_after, 'env': extra_env},
+        'scenarios': [],
+    }
+    for size in [int(value) for value in args.sizes.split(',') if value]:
+        print(f"Rodando cenário com {size} issues...")
+        command = [sys.executable, os.path.abspath(__file__), '--worker', '--size', str(size), '--script', args.script,
+                   '--latency', str(args.latency), '--sheets-latency', str(args.sheets_latency),
+                   '--throttle', str(args.throttle), '--retry-after', str(args.retry_after)]
+        for item in args.env:
+            command += ['--env', item]
+        try:
+            process = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout)
+        except subprocess.TimeoutExpired:
+            # O worker é morto pelo subprocess.run; o Jira falso dele sai junto (ver --serve-jira)
+            results['scenarios'].append({'size': size, 'error': [f'excedeu o tempo máximo de {args.timeout:.0f}s']})
+            continue
+        if process.returncode != 0:
+            results['scenarios'].append({'size': size, 'error': process.stderr.strip().splitlines()[-1:] or ['falhou']})
+            continue
+        results['scenarios'].append(json.loads(process.stdout.strip().splitlines()[-1]))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em {args.output}")
+
+    # Motores que divergem são um erro, não só um aviso: o código de saída acusa para quem roda em CI
+    if any(item.get('sync', {}).get('engines_match') is False for item in results['scenarios']):
+        print("ERRO: os motores pandas e dict geraram change sets diferentes.")
+        sys.exit(1)
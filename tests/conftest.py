@@ -0,0 +1,103 @@
+import os
+import re
+import sys
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+# O motor da sincronização (automacaosheets/sync_engine.py) é importado direto pelos testes, como os scripts fazem
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'automacaosheets'))
+
+def _cell_position(cell):
+    """'B3' -> (linha 2, coluna 1), 0-based; 'B' -> (None, 1)."""
+    letters, digits = re.fullmatch(r'([A-Z]+)(\d*)', cell).groups()
+    column = 0
+    for letter in letters:
+        column = column * 26 + ord(letter) - ord('A') + 1
+    return (int(digits) - 1 if digits else None), column - 1
+
+class FakeRequest:
+    def __init__(self, fn):
+        self.fn = fn
+
+    def execute(self, http=None):
+        return self.fn()
+
+class FakeSheetsService:
+    """
+    Planilha falsa em memória (uma aba, linhas como listas de textos), com as chamadas da API usadas pelo
+    motor. calls guarda (método, argumentos) de cada escrita; fail_ranges faz o batchUpdate que contiver
+    um desses intervalos responder HTTP 400.
+    """
+
+    def __init__(self, rows=()):
+        self.rows = [list(row) for row in rows]
+        self.calls = []
+        self.fail_ranges = set()
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def get(self, spreadsheetId, range=None, fields=None):
+        if fields is not None:  # spreadsheets().get: propriedades da aba
+            grid = {'rowCount': max(len(self.rows), 1000), 'columnCount': 26}
+            return FakeRequest(lambda: {'sheets': [{'properties': {'sheetId': 0, 'title': 'Aba', 'gridProperties': grid}}]})
+        if range.endswith('!1:1'):
+            return FakeRequest(lambda: {'values': self.rows[:1]})
+        return FakeRequest(lambda: {'values': [list(row) for row in self.rows]})
+
+    def batchGet(self, spreadsheetId, ranges, valueRenderOption=None, majorDimension=None):
+        def columns():
+            value_ranges = []
+            for value_range in ranges:
+                _, column = _cell_position(value_range.split('!')[1].split(':')[0])
+                values = [row[column] if column < len(row) else '' for row in self.rows[1:]]
+                while values and values[-1] == '':
+                    values.pop()
+                value_ranges.append({'values': [values]} if values else {})
+            return {'valueRanges': value_ranges}
+        return FakeRequest(columns)
+
+    def batchUpdate(self, spreadsheetId, body):
+        if 'requests' in body:  # spreadsheets().batchUpdate: ajuste da grade
+            return FakeRequest(lambda: {})
+
+        def write():
+            self.calls.append(('batchUpdate', [value_range['range'] for value_range in body['data']]))
+            if any(value_range['range'] in self.fail_ranges for value_range in body['data']):
+                raise HttpError(httplib2.Response({'status': 400}), b'{"error": {"message": "Intervalo recusado"}}')
+            cells = 0
+            for value_range in body['data']:
+                start = value_range['range'].split('!')[1].split(':')[0]
+                first_row, first_column = _cell_position(start)
+                for row_offset, values in enumerate(value_range['values']):
+                    row = first_row + row_offset
+                    while len(self.rows) <= row:
+                        self.rows.append([])
+                    for column_offset, value in enumerate(values):
+                        column = first_column + column_offset
+                        self.rows[row].extend([''] * (column + 1 - len(self.rows[row])))
+                        self.rows[row][column] = value
+                        cells += 1
+            return {'totalUpdatedCells': cells}
+        return FakeRequest(write)
+
+    def append(self, spreadsheetId, range, valueInputOption, insertDataOption, body):
+        def append_rows():
+            self.calls.append(('append', [list(row) for row in body['values']]))
+            first_row = len(self.rows) + 1
+            self.rows.extend(list(row) for row in body['values'])
+            return {'updates': {'updatedRange': f"Aba!A{first_row}:Z{len(self.rows)}", 'updatedRows': len(body['values'])}}
+        return FakeRequest(append_rows)
+
+@pytest.fixture
+def fake_sheets(monkeypatch):
+    """A classe da planilha falsa, com o agendador do Google Sheets sem limite de taxa e sem novas tentativas."""
+    import sync_engine
+    monkeypatch.setitem(sync_engine.request_scheduler._backends, 'sheets',
+                        sync_engine._BackendLimits(rate=0, burst=1, max_concurrency=4, max_attempts=1, base_delay=0, max_delay=0))
+    return FakeSheetsService
@@ -0,0 +1,75 @@
+import re
+
+import pytest
+
+import sync_engine
+
+JQL = 'project = TESTE ORDER BY key ASC'
+IDS = list(range(1000, 1100)) + list(range(5000, 5037))  # ids com um buraco no meio
+
+def shard_range(jql):
+    """[início, fim) da fatia por id; None no lado aberto."""
+    start = re.search(r'id >= (\d+)', jql)
+    end = re.search(r'id < (\d+)', jql)
+    return (int(start.group(1)) if start else None), (int(end.group(1)) if end else None)
+
+def issues_in(jql):
+    start, end = shard_range(jql)
+    return [issue_id for issue_id in IDS if (start is None or issue_id >= start) and (end is None or issue_id < end)]
+
+@pytest.fixture
+def fake_jira(monkeypatch):
+    """Jira falso por id: contagens e buscas pelas cláusulas 'id >= N AND id < M' das fatias."""
+    fetched = []
+    monkeypatch.setattr(sync_engine, 'count_jira_issues', lambda jql: len(issues_in(jql)))
+    monkeypatch.setattr(sync_engine, '_shard_bounds', lambda jql_filter, mode: (min(IDS), max(IDS) + 1))
+
+    def fetch_shard(shard_jql, mapping, cancel=None):
+        fetched.append(shard_jql)
+        issues = [{'key': f'K-{issue_id}', 'fields': {'updated': '2024-01-01T00:00:00.000+0000'}} for issue_id in issues_in(shard_jql)]
+        return mapping.compact(issues)
+    monkeypatch.setattr(sync_engine, '_fetch_jira_shard', fetch_shard)
+    return fetched
+
+@pytest.fixture
+def mapping():
+    return sync_engine.build_default_job(JQL, [{'name': 'key', 'field': 'key'}], key_column='Chave', status_column='Estado')['mapping']
+
+def test_shards_cover_the_range_without_gaps_or_overlaps(fake_jira):
+    shards = sync_engine.plan_jira_shards(JQL, mode='id', shard_size=20)
+
+    ranges = [shard_range(shard) for shard in shards]
+    assert len(shards) > 1
+    assert ranges[0][0] is None and ranges[-1][1] is None
+    assert all(previous[1] == following[0] for previous, following in zip(ranges, ranges[1:]))
+    assert sorted(issue_id for shard in shards for issue_id in issues_in(shard)) == IDS
+    assert all(len(issues_in(shard)) <= 20 for shard in shards)
+    assert all(shard.endswith(' ORDER BY key ASC') for shard in shards)
+
+def test_small_jql_is_not_sharded(fake_jira):
+    assert sync_engine.plan_jira_shards(JQL, mode='id', shard_size=len(IDS)) == [JQL]
+
+def test_resume_fetches_only_missing_shards(monkeypatch, tmp_path, fake_jira, mapping):
+    monkeypatch.chdir(tmp_path)
+    fetch_shard = sync_engine._fetch_jira_shard
+    failing = {}
+
+    def flaky_fetch(shard_jql, mapping, cancel=None):
+        if shard_jql == failing.get('jql'):
+            fake_jira.append(shard_jql)
+            raise sync_engine.JiraFetchError('página recusada')
+        return fetch_shard(shard_jql, mapping, cancel)
+    monkeypatch.setattr(sync_engine, '_fetch_jira_shard', flaky_fetch)
+
+    shards = sync_engine.plan_jira_shards(JQL, mode='id', shard_size=20)
+    failing['jql'] = shards[2]
+    assert sync_engine.get_jira_issues_sharded(JQL, mapping, mode='id', shard_size=20) is None
+    assert sorted(fake_jira) == sorted(shards)
+
+    fake_jira.clear()
+    failing.clear()
+    issues = sync_engine.get_jira_issues_sharded(JQL, mapping, mode='id', shard_size=20)
+
+    assert fake_jira == [shards[2]]
+    assert sorted(int(issue.key.split('-')[1]) for issue in issues) == IDS
+    assert not list(tmp_path.joinpath(sync_engine.JIRA_FATIAS_DIRETORIO).iterdir())
@@ -0,0 +1,89 @@
+import math
+
+import sync_engine
+
+# Os motores de comparação (pandas e dict, ver reconcile) precisam gerar o mesmo change set também
+# nos casos que os dados sintéticos do benchmark não cobrem: chaves repetidas, vazias, com espaços
+# ou com cara de número, e valores que o Pandas poderia converter (None, números, 'nan').
+
+SHEET_HEADER = ['Chave', 'Estado', 'Pontos']
+SHEET_ROWS = [
+    ('K-1', 'Concluído', '3'),
+    ('K-1', 'Não Concluído', '3.0'),  # chave repetida
+    ('', 'Concluído', ''),
+    ('   ', '', '1'),
+    (' K-2 ', 'Concluído', ''),
+    ('10', 'Não Concluído', '10'),
+    ('010', 'Concluído', ''),
+    ('1e3', '', 'nan'),
+    ('10.0', 'x', 'None'),
+    ('nan', 'Concluído', ''),
+    ('None', '', '0'),
+    ('K-3', 'Concluído', '3'),
+]
+
+# (chave, status, pontos) de cada tarefa do Jira
+JIRA_ISSUES = [
+    ('K-1', 'Done', 3),
+    ('K-2', 'Done', None),
+    ('10', 'Done', 10.0),
+    ('1e3', 'To Do', 'nan'),
+    ('K-4', None, None),
+    ('K-4', 'Done', 1),  # a mesma tarefa em duas páginas
+    ('010', None, 0),
+    ('nan', 'To Do', None),
+    ('None', 'Done', 0),
+    (' K-5', 'Done', '3'),
+    ('1000', 'Done', 3.5),
+]
+
+def build_mapping():
+    entries = [
+        {'name': 'key', 'field': 'key'},
+        {'name': 'status', 'field': 'status.name', 'transform': 'status', 'updatable': True},
+        {'name': 'points', 'field': 'customfield_10016', 'column': 'Pontos', 'updatable': True},
+    ]
+    return sync_engine.build_default_job('project = TESTE', entries, key_column='Chave', status_column='Estado')['mapping']
+
+def jira_issue(key, status, points):
+    fields = {'status': None if status is None else {'name': status}, 'customfield_10016': points, 'updated': '2024-01-01T00:00:00.000+0000'}
+    return {'key': key, 'fields': fields}
+
+def normalize(change_set):
+    """Tarefas viram dicts (o Pandas pode devolver NaN onde o motor dict mantém None)."""
+    def plain(issue):
+        return {name: (None if isinstance(value, float) and math.isnan(value) else value) for name, value in issue.to_dict().items()}
+    return {name: ([plain(issue) for issue in items] if name == 'inserts' else items)
+            for name, items in change_set.items()}
+
+def test_engines_match_on_edge_cases():
+    mapping = build_mapping()
+    table = sync_engine.SheetTable(SHEET_HEADER, SHEET_ROWS)
+    jira_rows = mapping.compact([jira_issue(*issue) for issue in JIRA_ISSUES])
+
+    pandas_change_set = sync_engine.reconcile(table, jira_rows, 'Chave', mapping.updatable, 'pandas')
+    dict_change_set = sync_engine.reconcile(table, jira_rows, 'Chave', mapping.updatable, 'dict')
+
+    assert normalize(pandas_change_set) == normalize(dict_change_set)
+    # Os casos acima precisam de fato gerar atualizações, inserções e órfãs
+    assert pandas_change_set['updates'] and pandas_change_set['inserts'] and pandas_change_set['orphans']
+
+def test_duplicate_jira_keys_keep_last_version(monkeypatch):
+    mapping = build_mapping()
+    table = sync_engine.SheetTable(SHEET_HEADER, [('K-1', 'Não Concluído', '3'), ('K-2', 'Concluído', '1')])
+    # K-1 e K-9 mudaram entre a primeira e a segunda página
+    pages = [
+        [jira_issue('K-1', 'Done', 5), jira_issue('K-9', 'To Do', 1), jira_issue('K-2', 'Done', 1)],
+        [jira_issue('K-9', 'Done', 2), jira_issue('K-1', 'Done', 3)],
+    ]
+    jira_rows = mapping.compact([issue for page in pages for issue in page])
+    monkeypatch.setattr(sync_engine, 'iter_jira_pages', lambda jql, mapping: iter(mapping.compact(page) for page in pages))
+    job = {'mapping': mapping}
+
+    change_sets = [sync_engine.reconcile(table, jira_rows, 'Chave', mapping.updatable, engine) for engine in ('pandas', 'dict')]
+    change_sets += [sync_engine.stream_change_set('', table, 'Chave', mapping.updatable, job, engine=engine)[0]
+                    for engine in ('pandas', 'dict')]
+
+    for change_set in change_sets:
+        assert change_set['updates'] == [{'row': 2, 'column': 'Estado', 'key': 'K-1', 'old': 'Não Concluído', 'new': 'Concluído'}]
+        assert [(issue.key, issue.points) for issue in change_set['inserts']] == [('K-9', 2)]
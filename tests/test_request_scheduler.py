@@ -0,0 +1,76 @@
+import pytest
+import requests
+
+import sync_engine
+
+class FakeClock:
+    """Relógio falso: sleep() só avança o tempo e guarda quanto foi pedido."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+def http_error(status, retry_after=None):
+    response = requests.Response()
+    response.status_code = status
+    if retry_after is not None:
+        response.headers['Retry-After'] = retry_after
+    return requests.HTTPError(response=response)
+
+def responses(*outcomes):
+    """fn para o agendador que devolve (ou levanta, se for exceção) cada resultado em ordem."""
+    outcomes = iter(outcomes)
+
+    def fn():
+        outcome = next(outcomes)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+    return fn
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sync_engine, 'time', clock)
+    return clock
+
+@pytest.fixture
+def scheduler(clock):
+    scheduler = sync_engine.RequestScheduler()
+    scheduler.configure('jira', rate=0, burst=1, max_concurrency=8, max_attempts=3)
+    return scheduler
+
+def test_throttled_with_retry_after_halves_concurrency_and_waits(clock, scheduler):
+    result = scheduler.call('jira', responses(http_error(429, '7'), 'ok'))
+
+    assert result == 'ok'
+    assert clock.sleeps == [7.0]
+    assert scheduler.concurrency_limit('jira') == 4
+
+def test_successes_grow_concurrency_back(clock, scheduler):
+    scheduler.call('jira', responses(http_error(429, '1'), http_error(429, '1'), 'ok'))
+    assert scheduler.concurrency_limit('jira') == 2
+
+    limits = []
+    for _ in range(40):
+        scheduler.call('jira', responses('ok'))
+        limits.append(scheduler.concurrency_limit('jira'))
+
+    # +1 a cada `limite` sucessos, sem passar do máximo configurado
+    assert limits == sorted(limits)
+    assert limits[1] == 3 and limits[-1] == 8
+    assert clock.sleeps == [1.0, 1.0]
+
+def test_gives_up_after_max_attempts(clock, scheduler):
+    with pytest.raises(requests.HTTPError):
+        scheduler.call('jira', responses(*[http_error(503, '2')] * 3))
+
+    assert clock.sleeps == [2.0, 2.0]
+    assert scheduler.concurrency_limit('jira') == 1
@@ -0,0 +1,55 @@
+import pytest
+
+import sync_engine
+
+HEADER = ['Chave', 'Resumo', 'Estado']
+COLUMNS = ['Chave', 'Estado']
+
+@pytest.fixture
+def sheet_store(tmp_path):
+    store = sync_engine.SheetStateStore(str(tmp_path / 'estado.db'))
+    yield store
+    store.close()
+
+def saved_table(store):
+    table = sync_engine.SheetTable(COLUMNS, [('K-1', 'Concluído'), ('K-2', 'Não Concluído')])
+    store.save('planilha', 'Aba', HEADER, table, 'Chave')
+    return table
+
+def test_sheet_state_is_reused_while_key_column_is_unchanged(sheet_store):
+    table = saved_table(sheet_store)
+
+    loaded = sheet_store.load('planilha', 'Aba', HEADER, COLUMNS, ['K-1', 'K-2', ''])
+
+    assert loaded is not None and loaded.rows == table.rows
+
+@pytest.mark.parametrize('header, keys', [
+    (HEADER, ['K-2', 'K-1']),                 # linhas reordenadas: muda o hash
+    (HEADER, ['K-1', 'K-2', 'K-3']),          # linha incluída: muda o número de linhas
+    (HEADER, ['K-1']),                        # linha removida
+    (['Chave', 'Estado'], ['K-1', 'K-2']),    # cabeçalho diferente
+])
+def test_sheet_state_is_refreshed_when_sheet_changed(sheet_store, header, keys):
+    saved_table(sheet_store)
+
+    assert sheet_store.load('planilha', 'Aba', header, COLUMNS, keys) is None
+
+def test_record_writes_patches_the_saved_state(sheet_store):
+    table = saved_table(sheet_store)
+    updates = [{'row': 3, 'column': 'Estado', 'key': 'K-2', 'old': 'Não Concluído', 'new': 'Concluído'}]
+    new_rows = [['K-3', 'Tarefa 3', 'Não Concluído']]
+    # O append foi parar na linha 5: a linha 4 ficou vazia entre o fim lido e as novas linhas
+    append_result = {'updates': {'updatedRange': 'Aba!A5:C5'}}
+
+    sheet_store.record_writes('planilha', 'Aba', HEADER, table, 'Chave', updates, new_rows, append_result)
+    loaded = sheet_store.load('planilha', 'Aba', HEADER, COLUMNS, ['K-1', 'K-2', '', 'K-3'])
+
+    assert loaded is not None
+    assert loaded.rows == [('K-1', 'Concluído'), ('K-2', 'Concluído'), ('', ''), ('K-3', 'Não Concluído')]
+
+def test_record_writes_without_append_position_invalidates(sheet_store):
+    table = saved_table(sheet_store)
+
+    sheet_store.record_writes('planilha', 'Aba', HEADER, table, 'Chave', [], [['K-3', '', '']], {})
+
+    assert sheet_store.load('planilha', 'Aba', HEADER, COLUMNS, ['K-1', 'K-2']) is None
@@ -0,0 +1,37 @@
+import threading
+
+import sync_engine
+
+def value_range(cell):
+    return {'range': f'Aba!{cell}', 'values': [['Concluído']]}
+
+def test_results_are_split_per_job_and_failures_stay_with_their_chunk(monkeypatch, fake_sheets):
+    monkeypatch.setattr(sync_engine, 'SHEETS_LOTE_MAX_CELULAS', 3)
+    service = fake_sheets([['Chave', 'Estado', 'Pontos'], ['K-1', '', ''], ['K-2', '', '']])
+    service.fail_ranges = {'Aba!C3'}
+    merger = sync_engine.SheetWriteMerger()
+    for job_name in ('a', 'b', 'c'):
+        merger.enter(job_name, 'planilha')
+
+    writes = {'a': [value_range('B2'), value_range('B3')], 'b': [value_range('C2'), value_range('C3')]}
+    results = {}
+
+    def write(job_name):
+        results[job_name] = merger.write(job_name, service, 'planilha', writes[job_name])
+
+    threads = [threading.Thread(target=write, args=(job_name,)) for job_name in writes]
+    for thread in threads:
+        thread.start()
+    merger.leave('c', 'planilha')  # terminou sem escrever; libera o envio combinado
+    for thread in threads:
+        thread.join(timeout=5)
+
+    # Lotes: [B2, B3, C2] e [C3]; só o segundo falha
+    assert sorted(service.calls) == [('batchUpdate', ['Aba!B2', 'Aba!B3', 'Aba!C2']), ('batchUpdate', ['Aba!C3'])]
+    assert [(result['chunk'], result['ranges'], result['cells'], result['ok'], result['updated_cells']) for result in results['a']] == [
+        (1, 2, 2, True, 2),
+    ]
+    assert [(result['chunk'], result['ranges'], result['cells'], result['ok'], result['updated_cells']) for result in results['b']] == [
+        (1, 1, 1, True, 1),
+        (2, 1, 1, False, 0),
+    ]
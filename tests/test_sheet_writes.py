@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import sync_engine
+
+COLUMNS = {'Chave': 0, 'Estado': 1, 'Pontos': 2, 'Responsável': 3}
+
+def update(row, column, new):
+    return {'row': row, 'column': column, 'key': f'K-{row}', 'old': '', 'new': new}
+
+def test_adjacent_cells_and_rows_are_coalesced():
+    updates = [update(row, column, f'{column}{row}') for row in (2, 3, 4) for column in ('Estado', 'Pontos')]
+
+    assert sync_engine.plan_sheet_writes(updates, COLUMNS, 'Aba') == [
+        {'range': 'Aba!B2:C4', 'values': [['Estado2', 'Pontos2'], ['Estado3', 'Pontos3'], ['Estado4', 'Pontos4']]},
+    ]
+
+def test_gaps_are_not_merged():
+    updates = [
+        update(2, 'Estado', 'a'), update(4, 'Estado', 'b'),       # linha 3 fica de fora
+        update(6, 'Estado', 'c'), update(6, 'Responsável', 'd'),  # coluna C fica de fora
+        update(7, 'Estado', 'e'), update(7, 'Pontos', 'f'),       # colunas diferentes da linha 6
+    ]
+
+    assert [value_range['range'] for value_range in sync_engine.plan_sheet_writes(updates, COLUMNS, 'Aba')] == [
+        'Aba!B2', 'Aba!B4', 'Aba!B6', 'Aba!D6', 'Aba!B7:C7',
+    ]
+
+def test_blocks_respect_max_cells():
+    updates = [update(row, 'Estado', 'x') for row in range(2, 12)]
+
+    value_ranges = sync_engine.plan_sheet_writes(updates, COLUMNS, 'Aba', max_cells=4)
+
+    assert [value_range['range'] for value_range in value_ranges] == ['Aba!B2:B5', 'Aba!B6:B9', 'Aba!B10:B11']
+
+@pytest.mark.parametrize('max_bytes, max_cells', [(200, 10_000), (10_000, 5)])
+def test_chunks_respect_byte_and_cell_limits(monkeypatch, max_bytes, max_cells):
+    monkeypatch.setattr(sync_engine, 'SHEETS_LOTE_MAX_BYTES', max_bytes)
+    monkeypatch.setattr(sync_engine, 'SHEETS_LOTE_MAX_CELULAS', max_cells)
+    value_ranges = [{'range': f'Aba!B{row}:C{row}', 'values': [['Concluído', str(row)]]} for row in range(2, 22)]
+
+    chunks = sync_engine.chunk_value_ranges(value_ranges)
+
+    assert len(chunks) > 1
+    assert [value_range for chunk in chunks for value_range in chunk] == value_ranges
+    for chunk in chunks:
+        assert sum(len(json.dumps(value_range, ensure_ascii=False).encode('utf-8')) for value_range in chunk) <= max_bytes
+        assert sum(len(row) for value_range in chunk for row in value_range['values']) <= max_cells
+
+def test_oversized_range_gets_its_own_chunk():
+    small = {'range': 'Aba!B2', 'values': [['a']]}
+    large = {'range': 'Aba!B3:B12', 'values': [['b']] * 10}
+
+    assert sync_engine.chunk_value_ranges([small, large, small], max_cells=5) == [[small], [large], [small]]
+
+@pytest.mark.parametrize('index, letter', [(0, 'A'), (25, 'Z'), (26, 'AA'), (51, 'AZ'), (701, 'ZZ'), (702, 'AAA'), (16383, 'XFD')])
+def test_column_letter(index, letter):
+    assert sync_engine.column_letter(index) == letter
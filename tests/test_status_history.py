@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import sync_engine
+
+@pytest.fixture
+def history_store(tmp_path):
+    store = sync_engine.StatusHistoryStore(str(tmp_path / 'historico.db'))
+    yield store
+    store.close()
+
+def issues(*versions):
+    entries = [
+        {'name': 'key', 'field': 'key'},
+        {'name': 'status', 'field': 'status.name', 'transform': 'status', 'updatable': True},
+    ]
+    mapping = sync_engine.build_default_job('project = TESTE', entries, key_column='Chave', status_column='Estado')['mapping']
+    return mapping.compact([{'key': key, 'fields': {'status': {'name': status}, 'updated': updated}}
+                            for key, status, updated in versions])
+
+def test_history_skips_unchanged_snapshots(history_store):
+    first = datetime(2026, 10, 1, 12, tzinfo=timezone.utc)
+    assert history_store.record('job', issues(('K-1', 'To Do', '2026-10-01T09:00:00.000+0000'),
+                                              ('K-2', 'To Do', '2026-10-01T09:00:00.000+0000')), first) == 2
+
+    # K-1 só mudou o 'updated' (ex.: um comentário); K-2 foi concluída
+    second = datetime(2026, 10, 2, 12, tzinfo=timezone.utc)
+    assert history_store.record('job', issues(('K-1', 'To Do', '2026-10-02T09:00:00.000+0000'),
+                                              ('K-2', 'Done', '2026-10-02T09:00:00.000+0000')), second) == 1
+
+    assert [entry['status'] for entry in history_store.key_history('job', 'K-1')] == ['Não Concluído']
+    assert [entry['status'] for entry in history_store.key_history('job', 'K-2')] == ['Não Concluído', 'Concluído']
+    # Cada job tem o seu histórico
+    assert history_store.record('outro', issues(('K-1', 'To Do', '2026-10-02T09:00:00.000+0000')), second) == 1
+
+def test_changes_between(history_store):
+    for day, status in ((1, 'To Do'), (2, 'Done'), (3, 'To Do')):  # concluída e reaberta
+        history_store.record('job', issues(('K-1', status, f'2026-10-0{day}T09:00:00.000+0000')),
+                             datetime(2026, 10, day, 12, tzinfo=timezone.utc))
+
+    between = history_store.changes_between('job', '2026-10-02', datetime(2026, 10, 3, tzinfo=timezone.utc))
+    since = history_store.changes_between('job', datetime(2026, 10, 2, 12, tzinfo=timezone.utc))
+
+    assert [(entry['synced_at'], entry['updated']) for entry in between] == [
+        ('2026-10-02T12:00:00+00:00', '2026-10-02T09:00:00.000+0000'),
+    ]
+    assert [entry['status'] for entry in since] == ['Concluído', 'Não Concluído']
+    assert since[-1]['fields'] == {'key': 'K-1', 'status': 'Não Concluído'}
@@ -0,0 +1,67 @@
+import importlib.util
+import os
+
+import pytest
+
+import sync_engine
+
+# automacaosheets/main.py tem o mesmo nome do main.py da raiz; é carregado pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    'automacaosheets_main', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'automacaosheets', 'main.py')
+)
+script = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(script)
+
+COLUMNS = ['Chave', 'Resumo', 'Estado']
+
+def table(*rows):
+    return sync_engine.SheetTable(COLUMNS, rows)
+
+def test_exact_match_ignores_case_and_outer_spaces():
+    index = script.SummaryIndex(table(('', '  Revisar Contrato ', '')), 'Chave', 'Resumo')
+
+    assert index.match('revisar contrato') == 0
+    assert index.match('REVISAR CONTRATO') is None  # a linha já foi usada
+
+def test_rows_without_key_come_first_and_protected_keys_are_skipped():
+    sheet = table(
+        ('K-1', 'Relatório', ''),   # chave que veio do Jira: já tem dona
+        ('K-9', 'Relatório', ''),   # chave órfã: candidata, depois das linhas sem chave
+        ('', 'Relatório', ''),
+    )
+    index = script.SummaryIndex(sheet, 'Chave', 'Resumo', protected_keys=['K-1'])
+
+    assert [index.match('Relatório') for _ in range(3)] == [2, 1, None]
+
+@pytest.mark.parametrize('fuzzy, min_ratio, expected', [
+    (False, 0.9, None),   # sem a deduplicação aproximada, só Resumos idênticos casam
+    (True, 0.9, 0),       # 'CONTRATOS' x 'CONTRATO': similaridade ~0.98
+    (True, 0.99, None),   # abaixo do mínimo pedido
+])
+def test_fuzzy_match_respects_min_ratio(fuzzy, min_ratio, expected):
+    index = script.SummaryIndex(table(('', 'Revisar contratos do cliente', '')), 'Chave', 'Resumo',
+                                fuzzy=fuzzy, min_ratio=min_ratio)
+
+    assert index.match('Revisar contrato do cliente') == expected
+
+def test_fuzzy_match_needs_a_shared_word_prefix():
+    index = script.SummaryIndex(table(('', 'ABCD', '')), 'Chave', 'Resumo', fuzzy=True, min_ratio=0.5)
+
+    # Muito parecido, mas sem nenhum bloco (palavra de 3+ letras com o mesmo prefixo) em comum
+    assert index.match('ABCE') is None
+
+def test_insert_matched_by_summary_becomes_an_update():
+    job = sync_engine.build_default_job('project = TESTE', script.COLUNAS_PLANILHA, key_column='Chave', status_column='Estado',
+                                        summary_column='Resumo', insert_matcher=script.match_inserts_by_summary)
+    mapping = job['mapping']
+    issue = mapping.compact([{'key': 'K-2', 'fields': {'status': {'name': 'Done'}, 'summary': 'Relatório',
+                                                      'updated': '2024-01-01T00:00:00.000+0000'}}])[0]
+    change_set = {'updates': [], 'inserts': [issue], 'orphans': []}
+
+    remaining = job['insert_matcher'](job, table(('', 'relatório', 'Não Concluído')), change_set, mapping.updatable)
+
+    assert remaining == []
+    assert change_set['updates'] == [
+        {'row': 2, 'column': 'Chave', 'key': 'K-2', 'old': '', 'new': 'K-2'},
+        {'row': 2, 'column': 'Estado', 'key': 'K-2', 'old': 'Não Concluído', 'new': 'Concluído'},
+    ]
@@ -0,0 +1,66 @@
+import pytest
+
+import sync_engine
+
+HEADER = ['Chave', 'Estado']
+
+@pytest.fixture
+def job():
+    entries = [
+        {'name': 'key', 'field': 'key'},
+        {'name': 'status', 'field': 'status.name', 'transform': 'status', 'updatable': True},
+    ]
+    return sync_engine.build_default_job('project = TESTE', entries, spreadsheet_id='planilha', sheet_name='Aba',
+                                         key_column='Chave', status_column='Estado')
+
+def update(row, key, old, new):
+    return {'row': row, 'column': 'Estado', 'key': key, 'old': old, 'new': new}
+
+def resume(monkeypatch, tmp_path, job, service, plan, progress):
+    monkeypatch.setattr(sync_engine, 'get_google_sheets_service', lambda: service)
+    monkeypatch.setattr(sync_engine, 'save_sync_watermark', lambda *args: None)
+    journal = sync_engine.SyncJournal(job, directory=str(tmp_path))
+    journal.save(plan)
+    for chunk, status in progress.items():
+        journal.mark(chunk, status)
+    result = sync_engine.resume_sync_journal(journal, journal.load(), job)
+    return result, journal
+
+def test_resume_skips_done_chunks(monkeypatch, tmp_path, job, fake_sheets):
+    service = fake_sheets([HEADER, ['K-1', 'Não Concluído'], ['K-2', 'Não Concluído']])
+    updates = [update(2, 'K-1', 'Não Concluído', 'Concluído'), update(3, 'K-2', 'Não Concluído', 'Concluído')]
+    value_ranges = [{'range': 'Aba!B2', 'values': [['Concluído']]}, {'range': 'Aba!B3', 'values': [['Concluído']]}]
+    plan = sync_engine.build_sync_plan(job, HEADER, updates, value_ranges, [])
+    plan['chunks'] = [{'kind': 'update', 'value_ranges': [value_range]} for value_range in value_ranges]
+
+    result, journal = resume(monkeypatch, tmp_path, job, service, plan, {0: 'done'})
+
+    assert result is True
+    assert service.calls == [('batchUpdate', ['Aba!B3'])]
+    assert journal.load() is None
+
+@pytest.mark.parametrize('sheet_rows, resent', [
+    ([['K-3', 'Concluído'], ['K-4', 'Não Concluído']], []),  # o append chegou à planilha
+    ([['K-3', 'Concluído']], [['K-4', 'Não Concluído']]),   # só parte das linhas chegou
+])
+def test_unconfirmed_append_only_resends_missing_rows(monkeypatch, tmp_path, job, fake_sheets, sheet_rows, resent):
+    service = fake_sheets([HEADER, ['K-1', 'Concluído']] + sheet_rows)
+    new_rows = [['K-3', 'Concluído'], ['K-4', 'Não Concluído']]
+    plan = sync_engine.build_sync_plan(job, HEADER, [], [], new_rows)
+
+    result, _ = resume(monkeypatch, tmp_path, job, service, plan, {0: 'sent'})
+
+    assert result is True
+    assert service.calls == ([('append', resent)] if resent else [])
+    assert [row[0] for row in service.rows[1:]] == ['K-1', 'K-3', 'K-4']
+
+def test_plan_is_discarded_when_header_changed(monkeypatch, tmp_path, job, fake_sheets):
+    service = fake_sheets([['Chave', 'Situação', 'Estado'], ['K-1', '', 'Não Concluído']])
+    updates = [update(2, 'K-1', 'Não Concluído', 'Concluído')]
+    plan = sync_engine.build_sync_plan(job, HEADER, updates, [{'range': 'Aba!B2', 'values': [['Concluído']]}], [])
+
+    result, journal = resume(monkeypatch, tmp_path, job, service, plan, {})
+
+    assert result is False
+    assert service.calls == []
+    assert journal.load() is None
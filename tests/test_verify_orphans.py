@@ -0,0 +1,41 @@
+import requests
+
+import sync_engine
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+def test_rejected_key_is_isolated_by_splitting_the_chunk(monkeypatch):
+    mapping = sync_engine.build_default_job('project = TESTE', [{'name': 'key', 'field': 'key'}],
+                                            key_column='Chave', status_column='Estado')['mapping']
+    requested = []
+
+    def fetch_keys(keys, mapping):
+        # O Jira recusa a JQL inteira por causa de uma única chave que não existe mais
+        requested.append(list(keys))
+        if 'K-3' in keys:
+            raise http_error(400)
+        return mapping.compact([{'key': key, 'fields': {'updated': '2024-01-01T00:00:00.000+0000'}} for key in keys])
+    monkeypatch.setattr(sync_engine, '_fetch_jira_keys', fetch_keys)
+
+    keys = [f'K-{number}' for number in range(1, 9)] + ['não é chave']
+    found, missing = sync_engine.verify_orphan_keys(keys, mapping)
+
+    assert sorted(issue.key for issue in found) == sorted(f'K-{number}' for number in range(1, 9) if number != 3)
+    assert missing == ['K-3']
+    assert requested[0] == [f'K-{number}' for number in range(1, 9)]
+    assert ['K-3'] in requested
+    # Divide só o caminho da chave recusada: 8 -> 4 -> 2 -> 1, com as metades boas buscadas uma vez
+    assert len(requested) == 7
+
+def test_other_errors_fail_the_verification(monkeypatch):
+    mapping = sync_engine.build_default_job('project = TESTE', [{'name': 'key', 'field': 'key'}],
+                                            key_column='Chave', status_column='Estado')['mapping']
+
+    def fetch_keys(keys, mapping):
+        raise http_error(500)
+    monkeypatch.setattr(sync_engine, '_fetch_jira_keys', fetch_keys)
+
+    assert sync_engine.verify_orphan_keys(['K-1', 'K-2'], mapping) is None
@@ -0,0 +1,82 @@
+import hashlib
+import hmac
+import json
+import threading
+
+import pytest
+import requests
+
+import sync_engine
+
+SECRET = 'segredo-de-teste'
+
+def build_job():
+    entries = [
+        {'name': 'key', 'field': 'key'},
+        {'name': 'status', 'field': 'status.name', 'transform': 'status', 'updatable': True},
+    ]
+    return sync_engine.build_default_job('project = TESTE', entries, key_column='Chave', status_column='Estado')
+
+def jira_issue(key, status, updated):
+    return {'key': key, 'fields': {'status': {'name': status}, 'updated': updated}}
+
+class FakeBatcher:
+    def __init__(self):
+        self.issues = []
+
+    def add(self, issue):
+        self.issues.append(issue)
+
+@pytest.fixture
+def server():
+    server = sync_engine.ThreadingHTTPServer(('127.0.0.1', 0), sync_engine.JiraWebhookHandler)
+    server.batcher = FakeBatcher()
+    server.job = build_job()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def post(server, body, signature=None):
+    headers = {'Content-Type': 'application/json'}
+    if signature is not None:
+        headers['X-Hub-Signature'] = signature
+    return requests.post(f'http://127.0.0.1:{server.server_port}/', data=body, headers=headers, timeout=5)
+
+def sign(body, secret=SECRET):
+    return 'sha256=' + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+
+EVENT = json.dumps({'webhookEvent': 'jira:issue_updated', 'issue': jira_issue('K-1', 'Done', '2024-01-01T10:00:00.000+0000')}).encode('utf-8')
+
+@pytest.mark.parametrize('signature, status, accepted', [
+    (sign(EVENT), 204, 1),
+    (sign(EVENT, 'outro-segredo'), 401, 0),
+    (None, 401, 0),
+])
+def test_signature_is_checked_when_secret_is_set(monkeypatch, server, signature, status, accepted):
+    monkeypatch.setattr(sync_engine, 'WEBHOOK_SEGREDO', SECRET)
+
+    assert post(server, EVENT, signature).status_code == status
+    assert len(server.batcher.issues) == accepted
+
+def test_batcher_keeps_newest_version_of_each_key():
+    mapping = build_job()['mapping']
+    flushed = []
+    batcher = sync_engine.WebhookBatcher(flushed.append, debounce_seconds=60)
+    for issue in mapping.compact([
+        jira_issue('K-1', 'To Do', '2024-01-01T10:00:00.000+0000'),
+        jira_issue('K-2', 'To Do', '2024-01-01T10:00:00.000+0000'),
+        jira_issue('K-1', 'Done', '2024-01-01T12:00:00.000+0000'),
+        jira_issue('K-1', 'In Progress', '2024-01-01T11:00:00.000+0000'),  # chegou atrasado
+    ]):
+        batcher.add(issue)
+    batcher.flush()
+
+    assert len(flushed) == 1
+    assert {issue.key: issue.status for issue in flushed[0]} == {'K-1': 'Concluído', 'K-2': 'Não Concluído'}
+
+def test_refuses_external_host_without_secret(monkeypatch):
+    monkeypatch.setattr(sync_engine, 'WEBHOOK_SEGREDO', '')
+    monkeypatch.setattr(sync_engine, 'run_daemon', lambda *args, **kwargs: pytest.fail('não devia sincronizar'))
+
+    assert sync_engine.run_webhook_server(build_job(), host='0.0.0.0', port=0) is None